@@ -0,0 +1,127 @@
+"""Link extraction benchmark on a large specialty index page
+
+Times AdvancedMedscapeScraper.extract_article_links against the previous
+three-strategy extractor (kept below for reference) on generated index
+pages: the stand-in site's topic-section layout and a layout of nested
+plain divs that forces the old any-div fallback. Parsing is timed
+separately since both share it. Usage:
+
+    python benchmarks/bench_links.py --articles 5000 --depth 8 --json links.json
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from urllib.parse import urljoin
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from standin_server import FIRST_ARTICLE_ID, StandInSite
+import medscape_engine
+
+def legacy_extract_article_links(soup, base_url):
+    """The extractor before the single-pass rewrite"""
+    article_links = []
+    extraction_methods = [
+        lambda: soup.find_all('div', class_='topic-section'),
+        lambda: soup.find_all('div', class_=re.compile(r'article|item|card')),
+        lambda: [div for div in soup.find_all('div') if div.find('a', href=re.compile(r'/article/\d+'))]
+    ]
+    for method in extraction_methods:
+        for section in method():
+            category = "Unknown"
+            category_elem = section.find(['h2', 'h3', 'div'], class_=re.compile(r'title|head|category'))
+            if category_elem:
+                category = category_elem.get_text(strip=True)
+            for link in section.find_all('a', href=re.compile(r'/article/\d+')):
+                href = link.get('href')
+                title = link.get_text(strip=True)
+                if href and title and len(title) > 10:
+                    article_links.append({'url': urljoin(base_url, href), 'title': title, 'category': category})
+        if article_links:
+            break
+
+    seen_urls = set()
+    unique_links = []
+    for article in article_links:
+        if article['url'] not in seen_urls:
+            seen_urls.add(article['url'])
+            unique_links.append(article)
+    return unique_links
+
+def nested_index_page(articles, depth, per_group=25):
+    """Index page whose groups sit `depth` plain divs deep, with no topic-section markup"""
+    groups = []
+    for start in range(0, articles, per_group):
+        links = "".join(
+            f'<li><a href="/article/{FIRST_ARTICLE_ID + i}-overview">Nested condition number {i} overview</a></li>'
+            for i in range(start, min(start + per_group, articles))
+        )
+        groups.append(
+            '<div class="wrap">' * depth
+            + f'<div class="group-title">Group {start // per_group + 1}</div><ul>{links}</ul>'
+            + '</div>' * depth
+        )
+    return (
+        '<html><head><title>Nested index</title></head><body>'
+        + '<div class="page"><div class="body">' + "".join(groups) + '</div></div></body></html>'
+    )
+
+def best_of(repeat, function):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def run_benchmark(args):
+    scraper = medscape_engine.AdvancedMedscapeScraper(use_cache=False, parser=args.parser)
+    pages = {
+        'topic-sections': StandInSite(articles=args.articles).index_page('pulmonology'),
+        'nested-divs': nested_index_page(args.articles, args.depth)
+    }
+    results = {}
+    for layout, html in pages.items():
+        parse_seconds, soup = best_of(args.repeat, lambda: scraper.parse_html(html))
+        legacy_seconds, legacy = best_of(args.repeat, lambda: legacy_extract_article_links(soup, scraper.base_url))
+        current_seconds, current = best_of(args.repeat, lambda: scraper.extract_article_links(html, soup=soup))
+        results[layout] = {
+            'page_kb': len(html) / 1024,
+            'links': len(current),
+            'same_urls': [link['url'] for link in legacy] == [link['url'] for link in current],
+            'parse_ms': parse_seconds * 1000,
+            'legacy_ms': legacy_seconds * 1000,
+            'single_pass_ms': current_seconds * 1000,
+            'speedup': legacy_seconds / current_seconds if current_seconds else 0
+        }
+    return results
+
+def print_report(results):
+    print(f"{'layout':<16} {'page KB':>8} {'links':>6} {'parse ms':>9} {'legacy ms':>10} {'1-pass ms':>10} {'speedup':>8}  same URLs")
+    for layout, row in results.items():
+        print(f"{layout:<16} {row['page_kb']:>8.0f} {row['links']:>6} {row['parse_ms']:>9.1f} {row['legacy_ms']:>10.1f} "
+              f"{row['single_pass_ms']:>10.1f} {row['speedup']:>7.1f}x  {row['same_urls']}")
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--articles', type=int, default=3000, help="article links on the index page")
+    parser.add_argument('--depth', type=int, default=6, help="plain div nesting around each group in the nested layout")
+    parser.add_argument('--parser', default='auto', help="BeautifulSoup backend (auto, lxml, html.parser)")
+    parser.add_argument('--repeat', type=int, default=3, help="best of this many runs")
+    parser.add_argument('--json', metavar='PATH', help="also write the results to this file")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    results = run_benchmark(args)
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(results, python=sys.version.split()[0], arguments=vars(args)), f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""PDF rendering benchmark on a large generated article
+
+Builds the story for a synthetic article of headings, paragraphs,
+bulleted/numbered lists (with repeated items) and long drug-dosing and
+differential tables, sized to roughly --pages pages, then reports flowable
+count, story and layout time, page count and peak Python memory for
+build_article_pdf against the previous story builder (kept below for
+reference). The previous builder dropped tables, so both builders are
+compared on the article with its tables removed; the current builder is
+then timed on the full article, and a tables-only article isolates table
+layout. --combined N also renders N articles and
+times combining them into one PDF: create_combined_pdf against the previous
+in-memory PdfMerger merge. Usage:
+
+    python benchmarks/bench_pdf.py --pages 200 --table-rows 30 --combined 50 --json pdf.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from standin_server import SECTION_NAMES, WORDS
+import medscape_engine
+
+# Paragraphs per letter page, counting the lists that follow every fifth one
+PARAGRAPHS_PER_PAGE = 3
+
+def legacy_split_paragraph(text, max_chars=500):
+    if len(text) <= max_chars:
+        return [text]
+    sentences = [s.strip() for s in re.split(r'[.!?]+', text) if s.strip()]
+    paragraphs = []
+    current_para = ""
+    for sentence in sentences:
+        if len(current_para) + len(sentence) < max_chars:
+            current_para += sentence + '. '
+        else:
+            if current_para:
+                paragraphs.append(current_para.strip())
+            current_para = sentence + '. '
+    if current_para:
+        paragraphs.append(current_para.strip())
+    return paragraphs if paragraphs else [text]
+
+def legacy_styles(styles):
+    """The shared styles with the spacing they had while Spacers added the rest"""
+    from reportlab.lib.styles import ParagraphStyle
+    return SimpleNamespace(
+        section_title_style=ParagraphStyle('LegacySectionTitle', parent=styles.section_title_style, spaceAfter=8),
+        subsection_style=ParagraphStyle('LegacySubsection', parent=styles.subsection_style, spaceAfter=6),
+        normal_style=ParagraphStyle('LegacyNormal', parent=styles.normal_style, spaceAfter=6)
+    )
+
+def legacy_build_story(article_data, styles):
+    """The section-content loop before the rewrite (title pages omitted)"""
+    from reportlab.platypus import Paragraph, Spacer, PageBreak
+    story = []
+    for section_name, section_content in article_data['sections'].items():
+        if section_content:
+            story.append(Paragraph(section_name, styles.section_title_style))
+            story.append(Spacer(1, 12))
+            for content_block in section_content:
+                if content_block['heading'] and content_block['heading'] != section_name:
+                    story.append(Paragraph(content_block['heading'], styles.subsection_style))
+                    story.append(Spacer(1, 8))
+                for item in content_block['content']:
+                    if item['type'] == 'paragraph':
+                        for para in legacy_split_paragraph(item['text']):
+                            story.append(Paragraph(para, styles.normal_style))
+                            story.append(Spacer(1, 6))
+                    elif item['type'] == 'list':
+                        for list_item in item['items']:
+                            bullet = "•" if item['style'] == 'unordered' else f"{item['items'].index(list_item) + 1}."
+                            story.append(Paragraph(f"{bullet} {list_item}", styles.normal_style))
+                            story.append(Spacer(1, 3))
+                        story.append(Spacer(1, 8))
+            story.append(Spacer(1, 15))
+            if section_name in ['Overview', 'Presentation', 'Treatment', 'Medication', 'References']:
+                story.append(PageBreak())
+    return story
+
+def legacy_combine(pdf_paths):
+    """The Single PDF download before the streaming merger"""
+    from PyPDF2 import PdfMerger
+    merger = PdfMerger()
+    for pdf_path in pdf_paths:
+        merger.append(pdf_path)
+    combined_buffer = BytesIO()
+    merger.write(combined_buffer)
+    merger.close()
+    return combined_buffer.getvalue()
+
+BUILDERS = {
+    'legacy': (legacy_build_story, legacy_styles),
+    'current': (medscape_engine.build_article_story, lambda styles: styles)
+}
+
+def sentence(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+def dosing_table(rng, rows):
+    header = ["Drug", "Dose", "Route", "Frequency", "Renal adjustment and notes"]
+    return [header] + [
+        [sentence(rng, 2), f"{rng.randint(1, 500)} mg", rng.choice(["PO", "IV", "IM", "SC"]),
+         rng.choice(["Daily", "BID", "TID", "q6h", "q8h PRN"]), " ".join(sentence(rng, 10) for _ in range(rng.randint(0, 3)))]
+        for _ in range(rows)
+    ]
+
+def differential_table(rng, rows):
+    header = ["Condition", "Distinguishing features", "Workup"]
+    return [header] + [[sentence(rng, 3), sentence(rng, 25), sentence(rng, 8)] for _ in range(rows)]
+
+def make_article(rng, pages, list_items, table_rows):
+    sections = {}
+    per_section = max(1, pages * PARAGRAPHS_PER_PAGE // len(SECTION_NAMES))
+    total_blocks = 0
+    for section_name in SECTION_NAMES:
+        subsections = []
+        for start in range(0, per_section, 5):
+            blocks = [
+                {'type': 'paragraph', 'text': " ".join(sentence(rng, 12) for _ in range(6))}
+                for _ in range(min(5, per_section - start))
+            ]
+            # Dosing-style lists repeat entries, which the old numbering got wrong
+            items = [sentence(rng, 6) for _ in range(list_items // 2)]
+            blocks.append({'type': 'list', 'style': 'ordered', 'items': items + items})
+            blocks.append({'type': 'list', 'style': 'unordered', 'items': [sentence(rng, 6) for _ in range(list_items)]})
+            subsections.append({'heading': sentence(rng, 4), 'content': blocks})
+            total_blocks += 1
+        if table_rows:
+            tables = [
+                {'type': 'table', 'data': dosing_table(rng, table_rows)},
+                {'type': 'table', 'data': differential_table(rng, table_rows // 2)}
+            ]
+            subsections.append({'heading': "Dosing and differentials", 'content': tables})
+            total_blocks += 1
+        sections[section_name] = subsections
+    return {
+        'url': "https://emedicine.medscape.com/article/300000-overview",
+        'title': "Generated condition: a very long article",
+        'authors': ["Jane Doe, MD"],
+        'last_updated': "Jan 01, 2025",
+        'sections': sections,
+        'successful_sections': len(sections),
+        'total_sections': len(sections),
+        'total_content_blocks': total_blocks
+    }
+
+def without_tables(article_data):
+    """The article minus its tables, i.e. the content the legacy builder renders"""
+    sections = {}
+    for section_name, subsections in article_data['sections'].items():
+        sections[section_name] = []
+        for content_block in subsections:
+            content = [item for item in content_block['content'] if item['type'] != 'table']
+            if content:
+                sections[section_name].append(dict(content_block, content=content))
+    return dict(article_data, sections=sections)
+
+def render(builder, article_data, styles, filepath):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate
+    started = time.perf_counter()
+    story = builder(article_data, styles)
+    story_seconds = time.perf_counter() - started
+    flowables = len(story)
+    doc = SimpleDocTemplate(filepath, pagesize=letter, rightMargin=54, leftMargin=54, topMargin=72, bottomMargin=72)
+    doc.build(story)
+    return {
+        'flowables': flowables,
+        'pages': doc.page,
+        'story_seconds': story_seconds,
+        'total_seconds': time.perf_counter() - started,
+        'size_kb': os.path.getsize(filepath) / 1024
+    }
+
+def measure(builder, article_data, styles, filepath, repeat):
+    runs = [render(builder, article_data, styles, filepath) for _ in range(repeat)]
+    result = min(runs, key=lambda run: run['total_seconds'])
+
+    # Memory is measured on a separate run since tracing slows everything down
+    tracemalloc.start()
+    render(builder, article_data, styles, filepath)
+    result['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    tracemalloc.stop()
+    return result
+
+def traced(function):
+    """Wall time of one call, then peak traced memory of a second one"""
+    started = time.perf_counter()
+    result = function()
+    seconds = time.perf_counter() - started
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds, peak / (1024 * 1024)
+
+def run_combined(args, workdir):
+    pdf_paths = []
+    for index in range(args.combined):
+        article_data = make_article(random.Random(args.seed + index), args.combined_pages, args.list_items,
+                                    args.table_rows // 3)
+        pdf_paths.append(os.path.join(workdir, f"article_{index}.pdf"))
+        medscape_engine.build_article_pdf(article_data, pdf_paths[-1])
+    
+    combined_path = os.path.join(workdir, "combined.pdf")
+    result, seconds, peak = traced(lambda: medscape_engine.create_combined_pdf(pdf_paths, combined_path))
+    data, legacy_seconds, legacy_peak = traced(lambda: legacy_combine(pdf_paths))
+    return {
+        'legacy': {'seconds': legacy_seconds, 'peak_memory_mb': legacy_peak, 'size_kb': len(data) / 1024,
+                   'pages': result['pages']},
+        'current': {'seconds': seconds, 'peak_memory_mb': peak, 'size_kb': result['size'] / 1024,
+                    'pages': result['pages'], 'shared_objects': result['shared_objects']}
+    }
+
+def run_benchmark(args, workdir):
+    rng = random.Random(args.seed)
+    article_data = make_article(rng, args.pages, args.list_items, args.table_rows)
+    shared_styles = SimpleNamespace(**medscape_engine.shared_resource('pdf_styles', medscape_engine.build_pdf_styles))
+    results = {'builders': {}}
+    builders = results['builders']
+    # Same content for both builders: the legacy one has no table support
+    compared = without_tables(article_data)
+    for name, (builder, make_styles) in BUILDERS.items():
+        builders[name] = measure(builder, compared, make_styles(shared_styles), os.path.join(workdir, f"{name}.pdf"),
+                                args.repeat)
+
+    if args.table_rows:
+        builders['with tables'] = measure(medscape_engine.build_article_story, article_data, shared_styles,
+                                          os.path.join(workdir, "full.pdf"), args.repeat)
+        tables_only = make_article(rng, 0, 0, args.table_rows)
+        for subsections in tables_only['sections'].values():
+            del subsections[:-1]
+        builders['tables only'] = measure(medscape_engine.build_article_story, tables_only, shared_styles,
+                                          os.path.join(workdir, "tables.pdf"), args.repeat)
+        builders['tables only']['column_width_cache'] = medscape_engine.table_column_widths.cache_info()._asdict()
+    
+    if args.combined:
+        results['combined'] = run_combined(args, workdir)
+    return results
+
+def print_report(results):
+    print(f"{'builder':<12} {'flowables':>10} {'pages':>6} {'story s':>8} {'total s':>8} {'peak MB':>8} {'PDF KB':>8}")
+    for name, result in results['builders'].items():
+        print(f"{name:<12} {result['flowables']:>10} {result['pages']:>6} {result['story_seconds']:>8.2f} "
+              f"{result['total_seconds']:>8.2f} {result['peak_memory_mb']:>8.1f} {result['size_kb']:>8.0f}")
+    if 'with tables' in results['builders']:
+        print("(legacy and current render the article without its tables; 'with tables' is current on the full article)")
+    
+    if 'combined' in results:
+        print(f"\n{'combined':<12} {'pages':>6} {'total s':>8} {'peak MB':>8} {'PDF KB':>8}")
+        for name, result in results['combined'].items():
+            print(f"{name:<12} {result['pages']:>6} {result['seconds']:>8.2f} {result['peak_memory_mb']:>8.1f} "
+                  f"{result['size_kb']:>8.0f}")
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=200, help="approximate article length")
+    parser.add_argument('--list-items', type=int, default=8, help="items per list")
+    parser.add_argument('--table-rows', type=int, default=30, help="dosing table rows per section (0 for no tables)")
+    parser.add_argument('--combined', type=int, default=0, help="articles in the combined PDF comparison (0 skips it)")
+    parser.add_argument('--combined-pages', type=int, default=10, help="approximate length of each combined article")
+    parser.add_argument('--repeat', type=int, default=2, help="timed runs per builder; the fastest is reported")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='PATH', help="also write the results to this file")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run_benchmark(args, workdir)
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(results, python=sys.version.split()[0], arguments=vars(args)), f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
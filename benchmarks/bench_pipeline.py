@@ -0,0 +1,207 @@
+"""End-to-end throughput benchmark against the local stand-in server
+
+Runs article discovery, single-article scraping, PDF rendering and the
+batch pipeline against benchmarks/standin_server.py and reports
+articles/min, p50/p95 latency per stage, CPU time and peak RSS. The server
+runs in a child process so the numbers only cover the scraper. Usage:
+
+    python benchmarks/bench_pipeline.py --articles 20 --latency 0.05 --json results.json
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from standin_server import build_arg_parser as build_server_arg_parser, server_from_args
+import medscape_engine
+
+def percentile(values, fraction):
+    """Nearest-rank percentile; 0 for an empty sample"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+def summarize(latencies):
+    return {
+        'count': len(latencies),
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+    }
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _serve(args, ready):
+    server = server_from_args(args)
+    ready.put(server.base_url)
+    server.serve_forever()
+
+def start_server(args):
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_serve, args=(args, ready), daemon=True)
+    process.start()
+    return process, ready.get(timeout=30)
+
+class Phase:
+    """Wall/CPU time of one benchmark phase"""
+
+    def __init__(self, name, results):
+        self.name = name
+        self.results = results
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = cpu_seconds()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.results[self.name] = {
+            'wall_seconds': time.perf_counter() - self.wall,
+            'cpu_seconds': cpu_seconds() - self.cpu,
+            'peak_rss_mb': peak_rss_mb()
+        }
+        return False
+
+def make_scraper(base_url, args):
+    scraper = medscape_engine.AdvancedMedscapeScraper(use_cache=False)
+    scraper.base_url = base_url
+    scraper.rate_limiter.configure(args.rate, args.parallel)
+    if args.render_workers:
+        scraper.pdf_renderer = medscape_engine.shared_resource(
+            'pdf_render_service', lambda: medscape_engine.PdfRenderService(args.render_workers)
+        )
+    return scraper
+
+def run_benchmark(args):
+    server, base_url = start_server(args)
+    results = {'phases': {}, 'stages': {}}
+    phases = results['phases']
+    try:
+        scraper = make_scraper(base_url, args)
+
+        # Discovery crawls the specialty index with its pagination (see --page-size)
+        crawler = medscape_engine.DiscoveryCrawler(scraper, 'bench_discovery.sqlite3')
+        with Phase('discover', phases):
+            pages_crawled = sum(event['type'] == 'page' for event in crawler.crawl([f"{base_url}/{args.specialty}"]))
+            articles = crawler.catalog()
+        results['articles_discovered'] = len(articles)
+        results['index_pages_crawled'] = pages_crawled
+        if not articles:
+            raise RuntimeError(f"No articles discovered at {base_url}/{args.specialty}")
+
+        # Single-article path: the same calls the Single Article tab makes
+        scrape_latencies, render_latencies = [], []
+        with Phase('single', phases):
+            for article in articles[:args.single]:
+                started = time.perf_counter()
+                article_data = scraper.scrape_complete_article(article['url'])
+                scrape_latencies.append(time.perf_counter() - started)
+                if article_data and article_data['sections']:
+                    started = time.perf_counter()
+                    scraper.create_enhanced_pdf(article_data, 'single_pdfs')
+                    render_latencies.append(time.perf_counter() - started)
+        results['stages']['scrape_complete_article'] = summarize(scrape_latencies)
+        results['stages']['create_enhanced_pdf'] = summarize(render_latencies)
+
+        # Batch path: job queue plus the pipelined scrape/parse/render stages
+        batch_articles = articles[:args.batch]
+        job_queue = medscape_engine.BatchJobQueue('bench_jobs.sqlite3')
+        batch_id = job_queue.create_batch(batch_articles, label="benchmark")
+        pipeline = medscape_engine.BatchPipeline(make_scraper(base_url, args), scrape_workers=args.scrape_workers,
+                                                 job_queue=job_queue, batch_id=batch_id, output_dir='batch_pdfs')
+        stage_latencies = {stage: [] for stage in pipeline.STAGES}
+        article_latencies = []
+        with Phase('batch', phases):
+            batch_started = time.perf_counter()
+            for event in pipeline.run():
+                stage_latencies[event['stage']].append(event['seconds'])
+                if event['type'] == 'done':
+                    article_latencies.append(time.perf_counter() - batch_started)
+        for stage, latencies in stage_latencies.items():
+            results['stages'][f"batch_{stage}"] = summarize(latencies)
+
+        progress = job_queue.batch_progress(batch_id)
+        batch_minutes = phases['batch']['wall_seconds'] / 60
+        results['batch'] = {
+            'articles': progress['total'],
+            'done': progress['done'],
+            'failed': progress['failed'],
+            'articles_per_minute': progress['done'] / batch_minutes if batch_minutes else 0,
+            'time_to_first_pdf_seconds': article_latencies[0] if article_latencies else None
+        }
+        single_minutes = phases['single']['wall_seconds'] / 60
+        results['single_articles_per_minute'] = len(render_latencies) / single_minutes if single_minutes else 0
+        results['peak_rss_mb'] = peak_rss_mb()
+    finally:
+        server.terminate()
+        server.join()
+    return results
+
+def print_report(results):
+    print(f"articles discovered: {results['articles_discovered']} ({results['index_pages_crawled']} index pages)")
+    print(f"\n{'phase':<10} {'wall s':>8} {'cpu s':>8} {'peak RSS MB':>12}")
+    for name, phase in results['phases'].items():
+        print(f"{name:<10} {phase['wall_seconds']:>8.2f} {phase['cpu_seconds']:>8.2f} {phase['peak_rss_mb']:>12.1f}")
+
+    print(f"\n{'stage':<26} {'n':>5} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, stage in results['stages'].items():
+        print(f"{name:<26} {stage['count']:>5} {stage['p50_ms']:>9.1f} {stage['p95_ms']:>9.1f}")
+
+    batch = results['batch']
+    print(f"\nsingle path: {results['single_articles_per_minute']:.1f} articles/min")
+    print(f"batch path:  {batch['articles_per_minute']:.1f} articles/min "
+          f"({batch['done']}/{batch['articles']} done, {batch['failed']} failed)")
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0],
+        parents=[build_server_arg_parser(add_help=False, port=0)]
+    )
+    parser.add_argument('--specialty', default='pulmonology', help="index page path on the stand-in server")
+    parser.add_argument('--single', type=int, default=3, help="articles run through the single-article path")
+    parser.add_argument('--batch', type=int, default=10, help="articles run through the batch pipeline")
+    parser.add_argument('--scrape-workers', type=int, default=2)
+    parser.add_argument('--rate', type=float, default=50.0, help="scraper requests per second per host")
+    parser.add_argument('--parallel', type=int, default=4, help="scraper parallel requests per host")
+    parser.add_argument('--render-workers', type=int, default=0, help="PDF render processes (0 renders in-process)")
+    parser.add_argument('--json', metavar='PATH', help="also write the results to this file")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    args.articles = max(args.articles, args.single, args.batch)
+    if args.json:
+        args.json = os.path.abspath(args.json)
+    logging.basicConfig(level=logging.WARNING)
+
+    # Caches, stores, job queue and PDFs all live in a throwaway directory
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            results = run_benchmark(args)
+        finally:
+            os.chdir(original_dir)
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(results, python=sys.version.split()[0], arguments=vars(args)), f, indent=2, default=str)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""Full-text search benchmark over a synthetic corpus of stored articles
+
+Indexes generated articles (sections of headings, paragraphs, lists and
+tables with a Zipf-like vocabulary) into ArticleSearchIndex, then reports
+indexing throughput and p50/p95 query latency for common, rare, prefix
+and multi-word queries. Usage:
+
+    python benchmarks/bench_search.py --articles 2000 --json search.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from standin_server import SECTION_NAMES, WORDS
+import medscape_engine
+
+QUERIES = {
+    'common word': "patient",
+    'rare word': "term4321",
+    'prefix': "pathophys",
+    'two words': "renal dose",
+    'three words': "chronic infection term17"
+}
+
+def make_vocabulary(size):
+    return WORDS + [f"term{i}" for i in range(size)]
+
+def sentence(rng, vocabulary, words):
+    # Low indexes (the medical words) dominate, like real text
+    return " ".join(vocabulary[min(int(rng.paretovariate(1.1)) - 1, len(vocabulary) - 1)] for _ in range(words)).capitalize()
+
+def make_article(article_id, rng, vocabulary, sections, paragraphs):
+    content = {}
+    for section_name in SECTION_NAMES[:sections]:
+        subsections = []
+        for _ in range(max(1, paragraphs // 5)):
+            blocks = [{'type': 'paragraph', 'text': sentence(rng, vocabulary, 60)} for _ in range(5)]
+            blocks.append({'type': 'list', 'style': 'unordered', 'items': [sentence(rng, vocabulary, 8) for _ in range(4)]})
+            subsections.append({'heading': sentence(rng, vocabulary, 4), 'level': 'h3', 'content': blocks})
+        content[section_name] = subsections
+    return {
+        'url': f"https://emedicine.medscape.com/article/{article_id}-overview",
+        'title': f"Condition {article_id}: {sentence(rng, vocabulary, 3)}",
+        'authors': ["Jane Doe, MD"],
+        'last_updated': "Jan 01, 2025",
+        'sections': content
+    }
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+def run_benchmark(args, workdir):
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary)
+    index = medscape_engine.ArticleSearchIndex(os.path.join(workdir, 'search_index.sqlite3'))
+    
+    started = time.perf_counter()
+    for i in range(args.articles):
+        index.index_article(make_article(300000 + i, rng, vocabulary, args.sections, args.paragraphs))
+    index_seconds = time.perf_counter() - started
+    stats = index.get_stats()
+    
+    results = {
+        'articles': stats['articles'],
+        'sections': stats['sections'],
+        'blocks': stats['blocks'],
+        'index_seconds': index_seconds,
+        'articles_per_second': stats['articles'] / index_seconds,
+        'database_mb': os.path.getsize(index.db_path) / (1024 * 1024),
+        'queries': {}
+    }
+    for name, text in QUERIES.items():
+        latencies = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            hits = index.search(text, limit=20)
+            latencies.append(time.perf_counter() - started)
+        results['queries'][name] = {
+            'query': text,
+            'hits': len(hits),
+            'p50_ms': percentile(latencies, 0.50) * 1000,
+            'p95_ms': percentile(latencies, 0.95) * 1000
+        }
+    return results
+
+def print_report(results):
+    print(f"indexed {results['articles']} articles ({results['sections']} sections, {results['blocks']} blocks) "
+          f"in {results['index_seconds']:.1f}s "
+          f"= {results['articles_per_second']:.0f} articles/s, {results['database_mb']:.0f} MB")
+    print(f"\n{'query':<14} {'text':<28} {'hits':>5} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, query in results['queries'].items():
+        print(f"{name:<14} {query['query']:<28} {query['hits']:>5} {query['p50_ms']:>8.1f} {query['p95_ms']:>8.1f}")
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--articles', type=int, default=2000)
+    parser.add_argument('--sections', type=int, default=12, help="sections per article")
+    parser.add_argument('--paragraphs', type=int, default=10, help="paragraphs per section")
+    parser.add_argument('--vocabulary', type=int, default=20000, help="synthetic terms besides the medical words")
+    parser.add_argument('--repeat', type=int, default=20, help="runs per query")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='PATH', help="also write the results to this file")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run_benchmark(args, workdir)
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(dict(results, python=sys.version.split()[0], arguments=vars(args)), f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Cold-start benchmark for the engine and the Streamlit app module
+
+Every measurement runs in a fresh interpreter so import caches do not
+leak between samples. Usage:
+
+    python benchmarks/bench_startup.py [--repeat 5] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that should only be imported by the feature that needs them
+HEAVY_MODULES = ('reportlab', 'PyPDF2', 'fake_useragent', 'httpx', 'pandas', 'plotly')
+
+PROBE = r'''
+import json, sys, time
+sys.path.insert(0, {repo!r})
+timings = {{}}
+started = time.perf_counter()
+import medscape_engine
+timings['import_engine'] = time.perf_counter() - started
+loaded_after_import = [name for name in {heavy!r} if name in sys.modules]
+
+started = time.perf_counter()
+scraper = medscape_engine.AdvancedMedscapeScraper()
+timings['first_scraper'] = time.perf_counter() - started
+
+started = time.perf_counter()
+medscape_engine.AdvancedMedscapeScraper()
+timings['second_scraper'] = time.perf_counter() - started
+
+started = time.perf_counter()
+scraper.setup_pdf_styles()
+timings['first_pdf_styles'] = time.perf_counter() - started
+
+loaded_by_app = []
+if {with_app!r}:
+    already_loaded = set(sys.modules)
+    started = time.perf_counter()
+    import medscape
+    timings['import_app'] = time.perf_counter() - started
+    loaded_by_app = [name for name in {heavy!r} if name in sys.modules and name not in already_loaded]
+
+print(json.dumps({{'timings': timings, 'heavy_after_engine_import': loaded_after_import,
+                  'heavy_loaded_by_app': loaded_by_app}}))
+'''
+
+def run_probe(with_app):
+    code = PROBE.format(repo=REPO_DIR, heavy=HEAVY_MODULES, with_app=with_app)
+    with tempfile.TemporaryDirectory() as workdir:
+        # The scraper creates its cache directory in the working directory
+        output = subprocess.run(
+            [sys.executable, '-c', code], cwd=workdir, capture_output=True, text=True, check=True
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help="fresh interpreters per measurement")
+    parser.add_argument('--no-app', action='store_true', help="skip importing the Streamlit app module")
+    parser.add_argument('--json', metavar='PATH', help="also write the results to this file")
+    args = parser.parse_args(argv)
+    
+    samples = [run_probe(not args.no_app) for _ in range(args.repeat)]
+    results = {
+        name: {
+            'median_ms': statistics.median(sample['timings'][name] for sample in samples) * 1000,
+            'max_ms': max(sample['timings'][name] for sample in samples) * 1000
+        }
+        for name in samples[0]['timings']
+    }
+    
+    print(f"{'measurement':<20} {'median ms':>10} {'max ms':>10}")
+    for name, result in results.items():
+        print(f"{name:<20} {result['median_ms']:>10.1f} {result['max_ms']:>10.1f}")
+    print(f"heavy modules after engine import: {', '.join(samples[0]['heavy_after_engine_import']) or 'none'}")
+    if not args.no_app:
+        print(f"heavy modules loaded by the app:   {', '.join(samples[0]['heavy_loaded_by_app']) or 'none'}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'python': sys.version.split()[0], 'repeat': args.repeat, 'results': results,
+                       'heavy_after_engine_import': samples[0]['heavy_after_engine_import'],
+                       'heavy_loaded_by_app': samples[0]['heavy_loaded_by_app']}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,298 @@
+"""Local stand-in for emedicine.medscape.com used by the benchmarks
+
+Serves a deterministic corpus shaped like the real site: a root page listing
+specialties, (optionally paginated) specialty indexes with topic sections,
+article overviews with a sections nav, many section pages and large
+drug/dose tables. Recorded pages can be dropped into a
+corpus directory (``<dir>/article/123456-overview.html``) and are served in
+place of the generated ones. Latency, 429/503 injection and a bandwidth cap
+are configurable so throughput can be measured offline. Usage:
+
+    python benchmarks/standin_server.py --port 8765 --latency 0.05 --error-rate 0.02
+"""
+import argparse
+import hashlib
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SECTION_NAMES = [
+    'Overview', 'Background', 'Pathophysiology', 'Etiology', 'Epidemiology', 'Prognosis',
+    'Presentation', 'History', 'Physical Examination', 'Workup', 'Laboratory Studies',
+    'Imaging Studies', 'Treatment', 'Medical Care', 'Surgical Care', 'Prevention',
+    'Medication', 'Medication Summary', 'Guidelines', 'Guidelines Summary'
+]
+
+WORDS = (
+    "patient treatment diagnosis clinical acute chronic therapy dose infection pulmonary "
+    "cardiac renal hepatic symptoms presentation imaging laboratory findings management "
+    "mortality incidence prevalence risk factors pathophysiology etiology guideline"
+).split()
+
+SPECIALTIES = [
+    'pulmonology', 'cardiology', 'neurology', 'nephrology', 'gastroenterology', 'oncology',
+    'infectious_diseases', 'endocrinology', 'rheumatology', 'dermatology'
+]
+
+FIRST_ARTICLE_ID = 300000
+
+class StandInSite:
+    """Generates the stand-in pages; every page is a pure function of its path"""
+
+    def __init__(self, articles=50, sections=12, paragraphs=20, table_rows=40, corpus_dir=None, seed=0,
+                 specialties=3, page_size=0):
+        self.articles = articles
+        self.specialties = SPECIALTIES[:max(1, min(specialties, len(SPECIALTIES)))]
+        self.page_size = page_size
+        self.sections = SECTION_NAMES[:max(1, min(sections, len(SECTION_NAMES)))]
+        self.paragraphs = paragraphs
+        self.table_rows = table_rows
+        self.corpus_dir = corpus_dir
+        self.seed = seed
+
+    def article_urls(self, base_url):
+        return [f"{base_url}/article/{FIRST_ARTICLE_ID + i}-overview" for i in range(self.articles)]
+
+    def _sentence(self, rng, words=18):
+        return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+    def _recorded(self, path):
+        if not self.corpus_dir:
+            return None
+        candidate = os.path.join(self.corpus_dir, path.strip('/').replace('/', os.sep) + '.html')
+        if os.path.isfile(candidate):
+            with open(candidate, 'rb') as f:
+                return f.read()
+        return None
+
+    def root_page(self):
+        links = "".join(f'<li><a href="/{name}">{name.replace("_", " ").title()}</a></li>' for name in self.specialties)
+        return f'<html><head><title>Medscape Reference: Medical Article Index</title></head><body><ul>{links}</ul></body></html>'
+
+    def index_page(self, specialty, page=1):
+        """Specialty index listing every article, page_size articles per page when paginated"""
+        first, last = 0, self.articles
+        pager = ""
+        if self.page_size:
+            pages = max(1, -(-self.articles // self.page_size))
+            if not 1 <= page <= pages:
+                return None
+            first, last = (page - 1) * self.page_size, min(page * self.page_size, self.articles)
+            if page < pages:
+                pager = f'<div class="pagination"><a rel="next" href="/{specialty}?page={page + 1}">Next</a></div>'
+        
+        topics = []
+        per_topic = 10
+        for start in range(first, last, per_topic):
+            links = "".join(
+                f'<li><a href="/article/{FIRST_ARTICLE_ID + i}-overview">'
+                f'{specialty.title()} condition number {i} overview</a></li>'
+                for i in range(start, min(start + per_topic, last))
+            )
+            topics.append(
+                f'<div class="topic-section"><h2 class="topic-head">Topic {start // per_topic + 1}</h2>'
+                f'<ul>{links}</ul></div>'
+            )
+        return (
+            f'<html><head><title>{specialty.title()} | Medscape</title></head><body>'
+            f'<div class="nav"><a href="/">Home</a></div>{"".join(topics)}{pager}</body></html>'
+        )
+
+    def article_page(self, article_id, slug):
+        section = next((name for name in self.sections if self._slug(name) == slug), None)
+        if section is None:
+            return None
+        rng = random.Random(f"{self.seed}:{article_id}:{slug}")
+        nav = "".join(
+            f'<li><a href="/article/{article_id}-{self._slug(name)}">{name}</a></li>' for name in self.sections
+        )
+        blocks = [f'<h2>{section}</h2>']
+        for i in range(self.paragraphs):
+            if i % 5 == 0:
+                blocks.append(f'<h3>{self._sentence(rng, 4)}</h3>')
+            blocks.append(f'<p>{" ".join(self._sentence(rng) for _ in range(4))}</p>')
+            if i % 4 == 0:
+                items = "".join(f'<li>{self._sentence(rng, 8)}</li>' for _ in range(5))
+                blocks.append(f'<ul>{items}</ul>')
+        if self.table_rows and section in ('Treatment', 'Medication', 'Laboratory Studies', 'Workup'):
+            rows = "".join(
+                f'<tr><td>Drug {r}</td><td>{rng.randint(1, 500)} mg</td><td>{self._sentence(rng, 10)}</td></tr>'
+                for r in range(self.table_rows)
+            )
+            blocks.append(f'<table><tr><th>Drug</th><th>Dose</th><th>Notes</th></tr>{rows}</table>')
+        return (
+            f'<html><head><title>Article {article_id}: {section} - Medscape</title>'
+            f'<meta name="author" content="Jane Doe, MD; John Roe, MD"></head><body>'
+            f'<h1>Stand-in Medical Article {article_id}</h1>'
+            f'<div class="clinref_updated">Updated: Jan 01, 2025</div>'
+            f'<div class="sections-nav"><ul>{nav}</ul></div>'
+            f'<div class="drugdbsectioncontent">{"".join(blocks)}</div>'
+            f'<div class="footer">Related articles and advertising</div></body></html>'
+        )
+
+    def _slug(self, name):
+        return name.lower().replace(' ', '-')
+
+    def page(self, path):
+        """Page body for a request path, or None for a 404"""
+        path, _, query = path.split('#', 1)[0].partition('?')
+        recorded = self._recorded(path)
+        if recorded is not None:
+            return recorded
+
+        parts = path.strip('/').split('/')
+        if len(parts) == 2 and parts[0] == 'article' and '-' in parts[1]:
+            article_id, slug = parts[1].split('-', 1)
+            if article_id.isdigit() and 0 <= int(article_id) - FIRST_ARTICLE_ID < self.articles:
+                html = self.article_page(int(article_id), slug)
+                return html.encode() if html else None
+            return None
+        if len(parts) == 1 and parts[0]:
+            page = re.search(r'(?:^|&)page=(\d+)', query)
+            html = self.index_page(parts[0], int(page.group(1)) if page else 1)
+            return html.encode() if html else None
+        if path == '/':
+            return self.root_page().encode()
+        return None
+
+class StandInServer:
+    """Threaded HTTP server for a StandInSite with injected latency, errors and bandwidth limits"""
+
+    def __init__(self, site=None, host='127.0.0.1', port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, bandwidth_kbps=0, seed=0):
+        self.site = site or StandInSite()
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.bandwidth_kbps = bandwidth_kbps
+        self.stats = {'requests': 0, 'not_modified': 0, 'injected_errors': 0, 'bytes_sent': 0}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _roll(self):
+        with self._lock:
+            self.stats['requests'] += 1
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+            error = None
+            if self.error_rate and self._rng.random() < self.error_rate:
+                error = self._rng.choice((429, 503))
+                self.stats['injected_errors'] += 1
+            return delay, error
+
+    def _send(self, handler, status, body=b"", headers=None):
+        handler.send_response(status)
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.send_header('Content-Length', str(len(body)))
+        handler.end_headers()
+
+        if not self.bandwidth_kbps:
+            handler.wfile.write(body)
+        else:
+            # Trickle the body out to emulate a slow link
+            chunk_size = 4096
+            for offset in range(0, len(body), chunk_size):
+                chunk = body[offset:offset + chunk_size]
+                handler.wfile.write(chunk)
+                time.sleep(len(chunk) / (self.bandwidth_kbps * 1024))
+        with self._lock:
+            self.stats['bytes_sent'] += len(body)
+
+    def handle(self, handler):
+        delay, error = self._roll()
+        if delay:
+            time.sleep(delay)
+        if error:
+            self._send(handler, error, b"Too many requests" if error == 429 else b"Service unavailable",
+                       {'Content-Type': 'text/plain', 'Retry-After': '1'})
+            return
+
+        body = self.site.page(handler.path)
+        if body is None:
+            self._send(handler, 404, b"Not found", {'Content-Type': 'text/plain'})
+            return
+
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        if handler.headers.get('If-None-Match') == etag:
+            with self._lock:
+                self.stats['not_modified'] += 1
+            self._send(handler, 304, headers={'ETag': etag})
+            return
+        self._send(handler, 200, body, {'Content-Type': 'text/html; charset=utf-8', 'ETag': etag})
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+def build_arg_parser(add_help=True, port=8765):
+    parser = argparse.ArgumentParser(description="Serve the Medscape stand-in corpus", add_help=add_help)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=port, help="0 picks a free port")
+    parser.add_argument('--articles', type=int, default=50)
+    parser.add_argument('--specialties', type=int, default=3, help="specialty indexes listed on the root page")
+    parser.add_argument('--page-size', type=int, default=0, help="articles per specialty index page (0 = one page)")
+    parser.add_argument('--sections', type=int, default=12, help="sections per article")
+    parser.add_argument('--paragraphs', type=int, default=20, help="paragraphs per section")
+    parser.add_argument('--table-rows', type=int, default=40, help="rows in treatment/medication tables")
+    parser.add_argument('--corpus-dir', help="directory of recorded pages served in place of generated ones")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="extra random latency up to this many seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of responses replaced by 429/503")
+    parser.add_argument('--bandwidth-kbps', type=float, default=0, help="per-connection bandwidth cap (0 = unlimited)")
+    parser.add_argument('--seed', type=int, default=0)
+    return parser
+
+def server_from_args(args):
+    site = StandInSite(args.articles, args.sections, args.paragraphs, args.table_rows, args.corpus_dir, args.seed,
+                       args.specialties, args.page_size)
+    return StandInServer(site, args.host, args.port, args.latency, args.jitter, args.error_rate,
+                         args.bandwidth_kbps, args.seed)
+
+def main(argv=None):
+    server = server_from_args(build_arg_parser().parse_args(argv))
+    print(f"Serving {server.site.articles} stand-in articles at {server.base_url}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,883 +1,82 @@
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
-import time
 import json
-from urllib.parse import urljoin, urlparse
 import re
 import os
-from datetime import datetime, timedelta
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-import random
-import hashlib
-import base64
-import zipfile
-from io import BytesIO
-from PyPDF2 import PdfMerger, PdfReader, PdfWriter
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+from datetime import datetime
 from collections import Counter
+from io import BytesIO
 import logging
-from fake_useragent import UserAgent
-import urllib3
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-
-# Disable SSL warnings
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+import threading
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from medscape_engine import (
+    AdvancedMedscapeScraper, BatchJobQueue, BatchPipeline, DiscoveryCrawler, EventReporter, PdfRenderService,
+    create_zip_file, create_combined_pdf, shared_resource, PYARROW_AVAILABLE
+)
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class AdvancedMedscapeScraper:
-    def __init__(self):
-        self.session = requests.Session()
-        self.ua = UserAgent()
-        self.user_agents = self._generate_user_agents()
-        self.setup_session()
-        self.base_url = "https://emedicine.medscape.com"
-        self.setup_pdf_styles()
-        self.content_hash_tracker = set()
-        self.request_count = 0
-        self.successful_requests = 0
-        self.failed_requests = 0
-        self.user_agent_rotation_frequency = 3
-        self.setup_retry_strategy()
-        self.request_history = []
-        self.start_time = datetime.now()
-        
-    def _generate_user_agents(self):
-        """Generate a large pool of realistic user agents"""
-        agents = []
-        try:
-            # Generate multiple user agents using fake_useragent
-            for _ in range(100):
-                agents.append(self.ua.random)
-        except:
-            # Fallback user agents if fake_useragent fails
-            agents = [
-                # Chrome - Various versions and platforms
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (X11; Ubuntu; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                
-                # Firefox
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0',
-                'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:121.0) Gecko/20100101 Firefox/121.0',
-                'Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0',
-                
-                # Safari
-                'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
-                'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
-                
-                # Edge
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/120.0.0.0 Safari/537.36',
-                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/119.0.0.0 Safari/537.36',
-                
-                # Mobile
-                'Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1',
-                'Mozilla/5.0 (iPad; CPU OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1',
-                'Mozilla/5.0 (Linux; Android 14; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.6099.210 Mobile Safari/537.36',
-                'Mozilla/5.0 (Linux; Android 13; SM-G991B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.6099.210 Mobile Safari/537.36',
-            ]
-        return list(set(agents))  # Remove duplicates
+def streamlit_thread_context():
+    """Worker initializer that lets engine threads report to the current Streamlit session"""
+    ctx = get_script_run_ctx()
+    return lambda: add_script_run_ctx(threading.current_thread(), ctx)
 
-    def setup_retry_strategy(self):
-        """Setup retry strategy with exponential backoff"""
-        retry_strategy = Retry(
-            total=5,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["GET", "POST"],
-            backoff_factor=2,
-            respect_retry_after_header=True
-        )
-        adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=10, pool_maxsize=10)
-        self.session.mount("http://", adapter)
-        self.session.mount("https://", adapter)
+class StreamlitReporter(EventReporter):
+    """Shows engine events on the page"""
 
-    def setup_session(self):
-        """Setup session with advanced headers to mimic real browser"""
-        self.session.headers.update({
-            'User-Agent': random.choice(self.user_agents),
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/avif,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-            'Accept-Encoding': 'gzip, deflate, br',
-            'DNT': '1',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Sec-Fetch-Dest': 'document',
-            'Sec-Fetch-Mode': 'navigate',
-            'Sec-Fetch-Site': 'none',
-            'Sec-Fetch-User': '?1',
-            'Cache-Control': 'max-age=0',
-            'sec-ch-ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
-            'sec-ch-ua-mobile': '?0',
-            'sec-ch-ua-platform': '"Windows"',
-        })
+    def __init__(self):
+        self._progress = None
 
-    def rotate_user_agent(self):
-        """Rotate user agent with intelligent selection"""
-        self.request_count += 1
-        
-        if self.request_count % self.user_agent_rotation_frequency == 0:
-            new_agent = random.choice(self.user_agents)
-            self.session.headers.update({'User-Agent': new_agent})
-            
+    def emit(self, kind, message="", **data):
+        if kind == 'debug':
             if st.session_state.get('debug_mode', False):
-                st.write(f"🔄 Rotated to: {new_agent[:80]}...")
-
-    def get_intelligent_delay(self, base_delay=3):
-        """Get intelligent delay based on recent success rate"""
-        if not self.request_history:
-            return base_delay + random.uniform(0.5, 2.0)
-        
-        # Calculate success rate from recent requests
-        recent_requests = self.request_history[-10:]  # Last 10 requests
-        success_rate = sum(1 for r in recent_requests if r['success']) / len(recent_requests)
-        
-        # Adjust delay based on success rate
-        if success_rate < 0.5:
-            return base_delay + random.uniform(3, 6)  # Longer delay if many failures
-        elif success_rate > 0.8:
-            return base_delay + random.uniform(0.1, 1.0)  # Shorter delay if successful
-        
-        return base_delay + random.uniform(0.5, 2.0)
-
-    def make_request(self, url, max_retries=8, delay=3):
-        """Make request with advanced retry logic and intelligent delays"""
-        for attempt in range(max_retries):
-            try:
-                self.rotate_user_agent()
-                current_delay = self.get_intelligent_delay(delay)
-                
-                if st.session_state.get('debug_mode', False):
-                    st.write(f"⏳ Delay: {current_delay:.2f}s (Attempt {attempt + 1}/{max_retries})")
-                
-                time.sleep(current_delay)
-                
-                response = self.session.get(
-                    url, 
-                    timeout=20,
-                    verify=False,  # Bypass SSL verification for better compatibility
-                    allow_redirects=True
-                )
-                
-                # Record request attempt
-                request_record = {
-                    'timestamp': datetime.now(),
-                    'url': url,
-                    'attempt': attempt + 1,
-                    'status_code': response.status_code,
-                    'success': False
-                }
-                
-                if response.status_code == 403:
-                    st.warning(f"🔒 Access denied (403), retrying... (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(10)
-                    continue
-                elif response.status_code == 429:
-                    wait_time = 20 + (attempt * 5)
-                    st.warning(f"⏳ Rate limited, waiting {wait_time}s... (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(wait_time)
-                    continue
-                elif response.status_code == 503:
-                    st.warning(f"🔧 Service unavailable, retrying... (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(15)
-                    continue
-                elif response.status_code != 200:
-                    st.warning(f"⚠️ Status {response.status_code}, retrying... (attempt {attempt + 1}/{max_retries})")
-                    continue
-                
-                response.raise_for_status()
-                
-                # Check for blocking patterns
-                if self.is_blocked(response.text):
-                    st.warning(f"🚫 Blocking detected, rotating... (attempt {attempt + 1}/{max_retries})")
-                    time.sleep(12)
-                    continue
-                
-                # Check if we got actual content
-                if self.is_valid_content(response.text):
-                    request_record['success'] = True
-                    self.request_history.append(request_record)
-                    self.successful_requests += 1
-                    return response
-                else:
-                    st.warning(f"📄 Invalid content received, retrying... (attempt {attempt + 1}/{max_retries})")
-                    
-            except requests.exceptions.Timeout:
-                st.warning(f"⏰ Timeout, retrying... (attempt {attempt + 1}/{max_retries})")
-            except requests.exceptions.SSLError:
-                st.warning(f"🔐 SSL Error, retrying... (attempt {attempt + 1}/{max_retries})")
-            except requests.exceptions.RequestException as e:
-                st.warning(f"❌ Request failed (attempt {attempt + 1}/{max_retries}): {str(e)[:100]}...")
-            
-            if attempt < max_retries - 1:
-                backoff_delay = delay * (2 ** attempt)  # Exponential backoff
-                time.sleep(backoff_delay)
-        
-        self.failed_requests += 1
-        if 'request_record' in locals():
-            self.request_history.append(request_record)
-        st.error(f"💥 Failed to fetch {url} after {max_retries} attempts")
-        return None
-
-    def is_blocked(self, html_content):
-        """Enhanced blocking detection"""
-        blocked_indicators = [
-            "access denied", "cloudflare", "captcha", "bot protection",
-            "security check", "distil", "incapsula", "blocked",
-            "please verify you are human", "unusual traffic"
-        ]
-        
-        content_lower = html_content.lower()
-        return any(indicator in content_lower for indicator in blocked_indicators)
-
-    def is_valid_content(self, html_content):
-        """Check if content is valid medical article content"""
-        valid_indicators = [
-            "medscape", "article", "medical", "treatment", "diagnosis",
-            "symptoms", "overview", "background", "pathophysiology"
-        ]
-        
-        content_lower = html_content.lower()
-        valid_count = sum(1 for indicator in valid_indicators if indicator in content_lower)
-        return valid_count >= 2  # At least 2 medical indicators
-
-    def get_performance_metrics(self):
-        """Get performance metrics for dashboard"""
-        total_time = (datetime.now() - self.start_time).total_seconds()
-        success_rate = (self.successful_requests / max(self.request_count, 1)) * 100 if self.request_count > 0 else 0
-        
-        recent_success = 0
-        if self.request_history:
-            recent_requests = self.request_history[-20:]  # Last 20 requests
-            recent_success = sum(1 for r in recent_requests if r['success']) / len(recent_requests) * 100 if recent_requests else 0
-        
-        return {
-            'total_requests': self.request_count,
-            'successful_requests': self.successful_requests,
-            'failed_requests': self.failed_requests,
-            'success_rate': success_rate,
-            'recent_success_rate': recent_success,
-            'total_time_seconds': total_time,
-            'requests_per_minute': (self.request_count / max(total_time/60, 1)),
-            'user_agents_count': len(self.user_agents)
-        }
-
-    def setup_pdf_styles(self):
-        """Setup enhanced PDF styles"""
-        self.styles = getSampleStyleSheet()
-        
-        self.article_title_style = ParagraphStyle(
-            name='ArticleTitle',
-            parent=self.styles['Heading1'],
-            fontSize=18,
-            spaceAfter=15,
-            textColor=colors.HexColor('#2E86AB'),
-            alignment=1  # Center
-        )
-        
-        self.section_title_style = ParagraphStyle(
-            name='SectionTitle',
-            parent=self.styles['Heading2'],
-            fontSize=16,
-            spaceAfter=8,
-            textColor=colors.HexColor('#A23B72'),
-            spaceBefore=12
-        )
-        
-        self.subsection_style = ParagraphStyle(
-            name='Subsection',
-            parent=self.styles['Heading3'],
-            fontSize=14,
-            spaceAfter=6,
-            textColor=colors.HexColor('#F18F01'),
-            spaceBefore=8
-        )
-        
-        self.normal_style = ParagraphStyle(
-            name='NormalText',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            spaceAfter=6,
-            leading=15,
-            textColor=colors.HexColor('#2B2D42')
-        )
-        
-        self.metadata_style = ParagraphStyle(
-            name='Metadata',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            textColor=colors.HexColor('#6C757D'),
-            spaceAfter=3
-        )
-        
-        self.analytics_style = ParagraphStyle(
-            name='Analytics',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            textColor=colors.HexColor('#28A745'),
-            spaceAfter=4,
-            backColor=colors.HexColor('#F8F9FA')
-        )
-
-    def extract_article_links(self, html_content):
-        """Extract all article URLs with enhanced filtering"""
-        soup = BeautifulSoup(html_content, 'html.parser')
-        article_links = []
-        
-        st.info("🔍 Extracting articles from categorized sections...")
-        
-        # Multiple extraction strategies
-        extraction_methods = [
-            # Method 1: Topic sections
-            lambda: soup.find_all('div', class_='topic-section'),
-            # Method 2: Article grids
-            lambda: soup.find_all('div', class_=re.compile(r'article|item|card')),
-            # Method 3: Any div with links containing /article/
-            lambda: [div for div in soup.find_all('div') if div.find('a', href=re.compile(r'/article/\d+'))]
-        ]
-        
-        for method in extraction_methods:
-            sections = method()
-            for section in sections:
-                category = "Unknown"
-                category_elem = section.find(['h2', 'h3', 'div'], class_=re.compile(r'title|head|category'))
-                if category_elem:
-                    category = category_elem.get_text(strip=True)
-                
-                links = section.find_all('a', href=re.compile(r'/article/\d+'))
-                for link in links:
-                    href = link.get('href')
-                    title = link.get_text(strip=True)
-                    
-                    if href and title and len(title) > 10:  # Filter out navigation links
-                        full_url = urljoin(self.base_url, href)
-                        article_links.append({
-                            'url': full_url,
-                            'title': title,
-                            'category': category
-                        })
-            
-            if article_links:  # Stop if we found articles
-                break
-        
-        # Remove duplicates
-        seen_urls = set()
-        unique_links = []
-        
-        for article in article_links:
-            if article['url'] not in seen_urls:
-                seen_urls.add(article['url'])
-                unique_links.append(article)
-        
-        st.success(f"✅ Found {len(unique_links)} unique articles")
-        return unique_links
-
-    def get_all_article_sections(self, overview_url):
-        """Get URLs for all sections of an article with enhanced discovery"""
-        response = self.make_request(overview_url)
-        if not response:
-            return {'Overview': overview_url}
-            
-        soup = BeautifulSoup(response.content, 'html.parser')
-        sections = {}
-        
-        # Standard medical section order (priority)
-        standard_order = [
-            'Overview', 'Background', 'Pathophysiology', 'Etiology', 
-            'Epidemiology', 'Prognosis', 'Presentation', 'History', 
-            'Physical Examination', 'DDx', 'Differential Diagnoses',
-            'Workup', 'Approach Considerations', 'Laboratory Studies', 
-            'Imaging Studies', 'Treatment', 'Medical Care', 'Surgical Care', 
-            'Prevention', 'Medication', 'Medication Summary',
-            'Guidelines', 'Guidelines Summary', 'References'
-        ]
-        
-        # Multiple navigation discovery strategies
-        nav_selectors = [
-            'div.sections-nav',
-            'div#dd_nav',
-            'div.sections-nav ul',
-            'ul.nav-tabs',
-            'div.tab-navigation',
-            'div.article-nav'
-        ]
-        
-        nav = None
-        for selector in nav_selectors:
-            nav = soup.select_one(selector)
-            if nav:
-                break
-        
-        if nav:
-            links = nav.find_all('a', href=True)
-            for link in links:
-                section_name = link.get_text(strip=True)
-                href = link['href']
-                
-                # Skip non-content links
-                skip_keywords = ['Show All', 'Media Gallery', 'References', 'Share', 'Print', 'Feedback', 'Q&A']
-                if any(keyword in section_name for keyword in skip_keywords):
-                    continue
-                
-                if href.startswith('javascript:') or href.startswith('#'):
-                    continue
-                
-                if href.startswith('/'):
-                    full_url = urljoin(self.base_url, href)
-                else:
-                    full_url = urljoin(overview_url, href)
-                
-                if section_name and section_name not in sections:
-                    sections[section_name] = full_url
-        
-        # Always include overview
-        sections['Overview'] = overview_url
-        
-        # Order sections by priority
-        ordered_sections = {}
-        for section_name in standard_order:
-            if section_name in sections:
-                ordered_sections[section_name] = sections[section_name]
-        
-        # Add remaining sections
-        for section_name, url in sections.items():
-            if section_name not in ordered_sections:
-                ordered_sections[section_name] = url
-        
-        return ordered_sections
-
-    def create_content_hash(self, text):
-        """Create hash of content to detect duplicates"""
-        return hashlib.md5(text.strip().encode()).hexdigest()
-
-    def scrape_section_content(self, section_url, section_name):
-        """Scrape content from a specific section with enhanced extraction"""
-        response = self.make_request(section_url)
-        if not response:
-            return []
-            
-        soup = BeautifulSoup(response.content, 'html.parser')
-        content = []
-        
-        # Multiple content area discovery strategies
-        content_selectors = [
-            'div.drugdbsectioncontent',
-            'div.article-content',
-            'div.refsection_content',
-            'div.drugdbmain',
-            'div.content',
-            'div.main-content',
-            'article',
-            'div.article-body'
-        ]
-        
-        content_area = None
-        for selector in content_selectors:
-            content_area = soup.select_one(selector)
-            if content_area:
-                break
-        
-        if not content_area:
-            return content
-        
-        # Extract content with enhanced filtering
-        elements = content_area.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'p', 'ul', 'ol', 'table'])
-        
-        current_section = {'heading': section_name, 'content': []}
-        seen_hashes = set()
-        
-        for element in elements:
-            # Skip navigation and irrelevant elements
-            if element.get('class'):
-                class_names = ' '.join(element.get('class', []))
-                skip_classes = ['action-items', 'back_next_btn', 'emed-logo', 'nav', 'menu', 'sidebar']
-                if any(skip_class in class_names for skip_class in skip_classes):
-                    continue
-            
-            if element.name in ['h1', 'h2', 'h3', 'h4', 'h5']:
-                if current_section['content']:
-                    content.append(current_section)
-                
-                heading_text = element.get_text(strip=True)
-                if heading_text and len(heading_text) > 2:
-                    current_section = {
-                        'heading': heading_text,
-                        'level': element.name,
-                        'content': []
-                    }
-            
-            elif element.name == 'p':
-                text = element.get_text(strip=True)
-                if text and len(text) > 15:  # Reduced minimum length
-                    content_hash = self.create_content_hash(text)
-                    if content_hash not in seen_hashes and not any(nav_text in text for nav_text in ['Previous', 'Next:', 'Show All']):
-                        seen_hashes.add(content_hash)
-                        current_section['content'].append({
-                            'type': 'paragraph',
-                            'text': text
-                        })
-            
-            elif element.name in ['ul', 'ol']:
-                list_items = []
-                for li in element.find_all('li'):
-                    item_text = li.get_text(strip=True)
-                    if item_text and len(item_text) > 3:  # Reduced minimum length
-                        list_items.append(item_text)
-                
-                if list_items:
-                    list_hash = self.create_content_hash(''.join(list_items))
-                    if list_hash not in seen_hashes:
-                        seen_hashes.add(list_hash)
-                        current_section['content'].append({
-                            'type': 'list',
-                            'style': 'unordered' if element.name == 'ul' else 'ordered',
-                            'items': list_items
-                        })
-            
-            elif element.name == 'table':
-                # Extract table data
-                table_data = []
-                for row in element.find_all('tr'):
-                    row_data = [cell.get_text(strip=True) for cell in row.find_all(['td', 'th'])]
-                    if row_data:
-                        table_data.append(row_data)
-                
-                if table_data and len(table_data) > 1:  # At least header + one row
-                    current_section['content'].append({
-                        'type': 'table',
-                        'data': table_data
-                    })
-        
-        if current_section['content']:
-            content.append(current_section)
-        
-        return content
-
-    def scrape_complete_article(self, article_url):
-        """Enhanced article scraping with better error handling and progress tracking"""
-        st.info(f"🎯 Starting advanced scraping: {article_url}")
-        
-        try:
-            # Initialize scraping metrics
-            scraping_metrics = {
-                'sections_found': 0,
-                'sections_scraped': 0,
-                'content_blocks': 0,
-                'start_time': datetime.now()
-            }
-            
-            sections = self.get_all_article_sections(article_url)
-            scraping_metrics['sections_found'] = len(sections)
-            st.info(f"📑 Found {len(sections)} sections to scrape")
-            
-            complete_content = {}
-            successful_sections = 0
-            
-            # Create detailed progress tracking
+                st.write(message)
+        elif kind == 'section':
             if st.session_state.get('single_article_mode', False):
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                metrics_text = st.empty()
-                total_sections = len(sections)
-            
-            for i, (section_name, section_url) in enumerate(sections.items()):
-                if st.session_state.get('single_article_mode', False):
-                    progress = (i + 1) / total_sections
-                    progress_bar.progress(progress)
-                    status_text.text(f"🔍 Scraping section {i+1}/{total_sections}: {section_name}")
-                    
-                    # Update real-time metrics
-                    metrics_text.text(
-                        f"📊 Progress: {successful_sections}/{i+1} successful | "
-                        f"Blocks: {scraping_metrics['content_blocks']} | "
-                        f"Success Rate: {self.get_performance_metrics()['recent_success_rate']:.1f}%"
-                    )
-                
-                section_content = self.scrape_section_content(section_url, section_name)
-                
-                if section_content:
-                    complete_content[section_name] = section_content
-                    successful_sections += 1
-                    scraping_metrics['content_blocks'] += len(section_content)
-                    
-                    if st.session_state.get('single_article_mode', False):
-                        st.success(f"✅ {section_name}: {len(section_content)} content blocks")
-                else:
-                    st.warning(f"⚠️ {section_name}: No content extracted")
-                
-                # Adaptive delay based on current performance
-                time.sleep(self.get_intelligent_delay(1))
-            
-            # Clear progress indicators
+                st.success(message)
+        elif kind == 'progress':
             if st.session_state.get('single_article_mode', False):
-                status_text.empty()
-                progress_bar.empty()
-                metrics_text.empty()
-            
-            # Get article info
-            response = self.make_request(article_url)
-            if not response:
-                return None
-                
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            title = self._extract_title(soup)
-            authors = self._extract_authors(soup)
-            updated_date = self._extract_updated_date(soup)
-            
-            total_content_blocks = sum(len(content) for content in complete_content.values())
-            scraping_metrics['end_time'] = datetime.now()
-            scraping_metrics['total_duration'] = (scraping_metrics['end_time'] - scraping_metrics['start_time']).total_seconds()
-            
-            return {
-                'url': article_url,
-                'title': title,
-                'authors': authors,
-                'last_updated': updated_date,
-                'sections': complete_content,
-                'total_sections': len(complete_content),
-                'total_content_blocks': total_content_blocks,
-                'successful_sections': successful_sections,
-                'scraping_metrics': scraping_metrics,
-                'performance_metrics': self.get_performance_metrics()
-            }
-            
-        except Exception as e:
-            st.error(f"💥 Advanced scraping failed: {e}")
-            logger.error(f"Scraping error: {e}", exc_info=True)
-            return None
-
-    def _extract_title(self, soup):
-        """Enhanced title extraction"""
-        title_selectors = ['h1', 'div.article-title', 'title']
-        for selector in title_selectors:
-            title = soup.select_one(selector)
-            if title:
-                text = title.get_text(strip=True)
-                if text and len(text) > 5:
-                    return text
-        return "Title not found"
-
-    def _extract_authors(self, soup):
-        """Enhanced author extraction"""
-        authors = []
-        author_selectors = [
-            'div.condition-title-info',
-            'div.authors',
-            'div.article-authors',
-            'meta[name="author"]'
-        ]
-        
-        for selector in author_selectors:
-            author_section = soup.select_one(selector)
-            if author_section:
-                if selector == 'meta[name="author"]':
-                    author_content = author_section.get('content', '')
-                    if author_content:
-                        authors = [auth.strip() for auth in author_content.split(';') if auth.strip()]
-                else:
-                    author_text = author_section.get_text()
-                    if 'Author:' in author_text:
-                        author_part = author_text.split('Author:')[-1].split('more...')[0]
-                        authors = [auth.strip() for auth in author_part.split(';') if auth.strip()]
-                
-                if authors:
-                    break
-        
-        return authors if authors else ["Authors information not available"]
-
-    def _extract_updated_date(self, soup):
-        """Enhanced date extraction"""
-        date_selectors = [
-            'div.clinref_updated',
-            'div.article-updated',
-            'meta[property="article:modified_time"]',
-            'div.update-date'
-        ]
-        
-        for selector in date_selectors:
-            date_elem = soup.select_one(selector)
-            if date_elem:
-                if selector.startswith('meta'):
-                    date_text = date_elem.get('content', '')
-                else:
-                    date_text = date_elem.get_text(strip=True)
-                
-                if date_text:
-                    # Clean up date text
-                    date_text = re.sub(r'Updated:\s*', '', date_text)
-                    return date_text.strip()
-        
-        return "Date not available"
-
-    def create_enhanced_pdf(self, article_data, output_dir="enhanced_pdfs"):
-        """Create enhanced PDF with better formatting and analytics"""
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-        
-        safe_title = "".join(c for c in article_data['title'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
-        filename = f"{safe_title[:60]}_{datetime.now().strftime('%H%M%S')}.pdf"
-        filepath = os.path.join(output_dir, filename)
-        
-        try:
-            doc = SimpleDocTemplate(
-                filepath,
-                pagesize=letter,
-                rightMargin=54,
-                leftMargin=54,
-                topMargin=72,
-                bottomMargin=72,
-                title=article_data['title'],
-                author=", ".join(article_data['authors'])
-            )
-            
-            story = []
-            
-            # Enhanced title page
-            story.append(Paragraph(article_data['title'], self.article_title_style))
-            story.append(Spacer(1, 20))
-            
-            # Analytics section
-            story.append(Paragraph("Scraping Analytics", self.section_title_style))
-            story.append(Spacer(1, 10))
-            
-            metrics = article_data.get('performance_metrics', {})
-            scraping_metrics = article_data.get('scraping_metrics', {})
-            
-            analytics_data = [
-                f"• Success Rate: {metrics.get('success_rate', 0):.1f}%",
-                f"• Total Requests: {metrics.get('total_requests', 0)}",
-                f"• Sections Scraped: {article_data['successful_sections']}/{article_data['total_sections']}",
-                f"• Content Blocks: {article_data['total_content_blocks']}",
-                f"• Scraping Duration: {scraping_metrics.get('total_duration', 0):.1f}s",
-                f"• Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-            ]
-            
-            for item in analytics_data:
-                story.append(Paragraph(item, self.analytics_style))
-            
-            story.append(Spacer(1, 20))
-            
-            # Metadata
-            story.append(Paragraph("Document Information", self.section_title_style))
-            story.append(Spacer(1, 10))
-            
-            metadata = [
-                f"• Source: {article_data['url']}",
-                f"• Authors: {', '.join(article_data['authors'])}",
-                f"• Last Updated: {article_data['last_updated']}",
-                f"• PDF Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-            ]
-            
-            for item in metadata:
-                story.append(Paragraph(item, self.metadata_style))
-            
-            story.append(Spacer(1, 20))
-            story.append(PageBreak())
-            
-            # Enhanced table of contents
-            story.append(Paragraph("Detailed Table of Contents", self.section_title_style))
-            story.append(Spacer(1, 15))
-            
-            for section_name, section_content in article_data['sections'].items():
-                blocks_count = len(section_content)
-                story.append(Paragraph(f"• {section_name} ({blocks_count} content blocks)", self.normal_style))
-                story.append(Spacer(1, 5))
-            
-            story.append(Spacer(1, 20))
-            story.append(PageBreak())
-            
-            # Enhanced content with better formatting
-            for section_name, section_content in article_data['sections'].items():
-                if section_content:
-                    story.append(Paragraph(section_name, self.section_title_style))
-                    story.append(Spacer(1, 12))
-                    
-                    for content_block in section_content:
-                        if content_block['heading'] and content_block['heading'] != section_name:
-                            story.append(Paragraph(content_block['heading'], self.subsection_style))
-                            story.append(Spacer(1, 8))
-                        
-                        for item in content_block['content']:
-                            if item['type'] == 'paragraph':
-                                paragraphs = self._split_paragraph(item['text'])
-                                for para in paragraphs:
-                                    story.append(Paragraph(para, self.normal_style))
-                                    story.append(Spacer(1, 6))
-                            
-                            elif item['type'] == 'list':
-                                for list_item in item['items']:
-                                    bullet = "•" if item['style'] == 'unordered' else f"{item['items'].index(list_item) + 1}."
-                                    story.append(Paragraph(f"{bullet} {list_item}", self.normal_style))
-                                    story.append(Spacer(1, 3))
-                                story.append(Spacer(1, 8))
-                    
-                    story.append(Spacer(1, 15))
-                    
-                    # Add page break after major sections
-                    if section_name in ['Overview', 'Presentation', 'Treatment', 'Medication', 'References']:
-                        story.append(PageBreak())
-            
-            doc.build(story)
-            file_size = os.path.getsize(filepath)
-            
-            # Add to download history
-            download_record = {
-                'title': article_data['title'],
-                'filename': filename,
-                'file_size_kb': file_size / 1024,
-                'timestamp': datetime.now(),
-                'sections': article_data['successful_sections'],
-                'content_blocks': article_data['total_content_blocks']
-            }
-            
-            st.session_state.download_history.append(download_record)
-            
-            st.success(f"🎉 Enhanced PDF created: {filename} ({file_size/1024:.1f} KB)")
-            return filepath
-            
-        except Exception as e:
-            st.error(f"💥 Enhanced PDF creation failed: {e}")
-            logger.error(f"PDF creation error: {e}", exc_info=True)
-            return None
-
-    def _split_paragraph(self, text, max_chars=500):
-        """Split long paragraphs intelligently"""
-        if len(text) <= max_chars:
-            return [text]
-        
-        # Split by sentences first
-        sentences = re.split(r'[.!?]+', text)
-        sentences = [s.strip() for s in sentences if s.strip()]
-        
-        paragraphs = []
-        current_para = ""
-        
-        for sentence in sentences:
-            if len(current_para) + len(sentence) < max_chars:
-                current_para += sentence + '. '
-            else:
-                if current_para:
-                    paragraphs.append(current_para.strip())
-                current_para = sentence + '. '
-        
-        if current_para:
-            paragraphs.append(current_para.strip())
-        
-        return paragraphs if paragraphs else [text]
+                self._show_progress(message, data)
+        elif kind == 'progress_end':
+            self._clear_progress()
+        elif kind == 'pdf_created':
+            st.session_state.download_history.append(data['record'])
+            st.success(message)
+        elif kind in ('info', 'success', 'warning', 'error'):
+            getattr(st, kind)(message)
+
+    def _show_progress(self, message, data):
+        if self._progress is None:
+            self._progress = (st.progress(0), st.empty(), st.empty())
+        progress_bar, status_text, metrics_text = self._progress
+        progress_bar.progress(data['completed'] / data['total'])
+        status_text.text(message)
+        metrics_text.text(data['metrics'])
+
+    def _clear_progress(self):
+        if self._progress is not None:
+            for widget in self._progress:
+                widget.empty()
+            self._progress = None
+
+def create_scraper():
+    scraper = AdvancedMedscapeScraper(reporter=StreamlitReporter(), context_factory=streamlit_thread_context)
+    # One render process pool for the whole server keeps ReportLab off the script threads
+    scraper.pdf_renderer = shared_resource('pdf_render_service', PdfRenderService)
+    return scraper
+
+def request_history_frame(history):
+    """DataFrame of the retained request history, rebuilt only after new requests"""
+    import pandas as pd
+    
+    cached = st.session_state.get('request_history_frame')
+    if cached is None or cached[0] is not history or cached[1] != history.version:
+        df = pd.DataFrame(history.columns())
+        df['success_numeric'] = df['success'].astype(int)
+        cached = (history, history.version, df)
+        st.session_state.request_history_frame = cached
+    return cached[2]
 
 def create_dashboard_metrics(scraper):
     """Create a comprehensive dashboard with metrics"""
@@ -896,13 +95,15 @@ def create_dashboard_metrics(scraper):
     
     # Create performance chart
     if len(scraper.request_history) > 1:
-        df = pd.DataFrame(scraper.request_history)
-        df['success_numeric'] = df['success'].astype(int)
+        # Charting libraries load on first use to keep the app's cold start fast
+        import plotly.graph_objects as go
+        
+        df = request_history_frame(scraper.request_history)
         
         fig = go.Figure()
         fig.add_trace(go.Scatter(
             x=df['timestamp'], 
-            y=df['success_numeric'].cumsum(),
+            y=df['cumulative_successes'],
             mode='lines',
             name='Successful Requests',
             line=dict(color='green', width=3)
@@ -917,34 +118,6 @@ def create_dashboard_metrics(scraper):
         
         st.plotly_chart(fig, use_container_width=True)
 
-def create_zip_file(pdf_paths, zip_filename="medscape_articles.zip"):
-    """Create a ZIP file containing all PDFs"""
-    zip_buffer = BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for pdf_path in pdf_paths:
-            pdf_name = os.path.basename(pdf_path)
-            zip_file.write(pdf_path, pdf_name)
-    
-    zip_buffer.seek(0)
-    return zip_buffer
-
-def create_combined_pdf(pdf_paths, output_filename="combined_articles.pdf"):
-    """Create a single PDF combining all individual PDFs"""
-    merger = PdfMerger()
-    
-    for pdf_path in pdf_paths:
-        try:
-            merger.append(pdf_path)
-        except Exception as e:
-            st.warning(f"⚠️ Could not merge {os.path.basename(pdf_path)}: {e}")
-    
-    combined_buffer = BytesIO()
-    merger.write(combined_buffer)
-    merger.close()
-    combined_buffer.seek(0)
-    
-    return combined_buffer
-
 def render_single_article_tab():
     """Render the enhanced single article tab"""
     st.session_state.single_article_mode = True
@@ -980,7 +153,7 @@ def handle_single_article_scraping(article_url):
         st.session_state.scraper.request_count = 0
         st.session_state.scraper.successful_requests = 0
         st.session_state.scraper.failed_requests = 0
-        st.session_state.scraper.request_history = []
+        st.session_state.scraper.request_history.clear()
         st.session_state.scraper.start_time = datetime.now()
         
         # Create advanced progress container
@@ -991,15 +164,24 @@ def handle_single_article_scraping(article_url):
                 current_agent = st.session_state.scraper.session.headers['User-Agent']
                 st.write(f"🎭 Initial User Agent: {current_agent}")
                 st.write(f"🎯 Total User Agents: {len(st.session_state.scraper.user_agents)}")
-            
-            article_data = st.session_state.scraper.scrape_complete_article(article_url)
+                st.write(f"🧩 Parser Backend: {st.session_state.scraper.parser_backend}")
+            
+            if st.session_state.get('incremental_mode', False):
+                refresh = st.session_state.scraper.refresh_article(article_url)
+                article_data = refresh['article_data'] if refresh else None
+                pdf_path = refresh['pdf_path'] if refresh else None
+                if refresh and refresh['changed_sections']:
+                    st.info(f"♻️ Changed sections: {', '.join(refresh['changed_sections'])}")
+            else:
+                article_data = st.session_state.scraper.scrape_complete_article(article_url)
+                pdf_path = None
         
         if article_data and article_data['sections']:
-            display_enhanced_article_results(article_data)
+            display_enhanced_article_results(article_data, pdf_path)
         else:
             display_scraping_failure()
 
-def display_enhanced_article_results(article_data):
+def display_enhanced_article_results(article_data, pdf_path=None):
     """Display enhanced results for successful scraping"""
     st.success(f"✅ Successfully scraped: {article_data['title']}")
     
@@ -1034,9 +216,10 @@ def display_enhanced_article_results(article_data):
             blocks_count = len(section_content)
             st.write(f"• **{section_name}**: {blocks_count} content blocks")
     
-    # Generate enhanced PDF
+    # Generate enhanced PDF (incremental mode may already have an up-to-date one)
     with st.spinner("📄 Creating enhanced PDF with advanced formatting..."):
-        pdf_path = st.session_state.scraper.create_enhanced_pdf(article_data)
+        if pdf_path is None:
+            pdf_path = st.session_state.scraper.create_enhanced_pdf(article_data)
         
         if pdf_path:
             display_pdf_download_options(pdf_path, article_data)
@@ -1080,6 +263,16 @@ def display_pdf_download_options(pdf_path, article_data):
     with col4:
         if st.button("📊 View Analytics", use_container_width=True):
             st.session_state.show_analytics = True
+    
+    # Structured copy of the article, reusable without scraping again
+    document = st.session_state.scraper.structured_store.get(article_data['url'])
+    if document:
+        st.download_button(
+            label="🗂️ Download Structured Data (JSON)",
+            data=json.dumps(document, ensure_ascii=False, indent=2),
+            file_name=f"medscape_{document['article_id']}.json",
+            mime="application/json"
+        )
 
 def display_scraping_failure():
     """Display enhanced failure information"""
@@ -1111,11 +304,18 @@ def render_multiple_articles_tab(delay, max_retries):
             placeholder="https://emedicine.medscape.com/specialty",
             key="multi_base_url"
         )
+        crawl = st.checkbox(
+            "🕸️ Crawl pagination and sub-indexes",
+            key="multi_crawl",
+            help="Follow next-page and sub-index links and add every article to the saved catalog"
+        )
         
     with col2:
         st.markdown("###")
         if st.button("🔍 Discover Articles", key="discover", use_container_width=True):
-            if base_url:
+            if base_url and crawl:
+                crawl_articles(base_url)
+            elif base_url:
                 with st.spinner("Discovering articles with enhanced extraction..."):
                     response = st.session_state.scraper.make_request(base_url)
                     if response:
@@ -1127,6 +327,8 @@ def render_multiple_articles_tab(delay, max_retries):
             else:
                 st.warning("⚠️ Please enter a base URL.")
     
+    display_unfinished_batches(delay)
+    
     # Display discovered articles
     if st.session_state.get('articles_found', []):
         display_articles_selection_interface()
@@ -1135,6 +337,32 @@ def render_multiple_articles_tab(delay, max_retries):
         if st.session_state.get('selected_articles', []):
             display_batch_generation_options(delay)
 
+def get_crawler():
+    """The session's discovery crawler, bound to the current scraper"""
+    if 'crawler' not in st.session_state:
+        st.session_state.crawler = DiscoveryCrawler(st.session_state.scraper)
+    st.session_state.crawler.scraper = st.session_state.scraper
+    return st.session_state.crawler
+
+def crawl_articles(base_url):
+    """Crawl an index page and its sub-indexes, then offer the articles found under it for selection"""
+    crawler = get_crawler()
+    crawler.refresh(max_age_hours=24)
+    status_text = st.empty()
+    with st.spinner("Crawling index pages..."):
+        for event in crawler.crawl([base_url]):
+            progress = crawler.progress()
+            status_text.text(f"🕸️ {progress['done']} index pages crawled, {progress['pending']} queued, "
+                             f"{progress['articles']} articles in the catalog")
+            if event['type'] == 'failed':
+                st.warning(f"⚠️ Failed to crawl {event['url']}: {event['error'][:100]}")
+    
+    st.session_state.articles_found = crawler.catalog([base_url])
+    st.session_state.select_all = False
+    st.session_state.selected_articles = []
+    if not st.session_state.articles_found:
+        st.error("❌ No articles found while crawling.")
+
 def display_articles_selection_interface():
     """Display the articles selection interface"""
     st.subheader(f"📋 Discovered Articles ({len(st.session_state.articles_found)})")
@@ -1143,6 +371,14 @@ def display_articles_selection_interface():
     if len(st.session_state.articles_found) > 10:
         st.warning(f"⚠️ Found {len(st.session_state.articles_found)} articles. Generating PDFs for all of them may take a long time.")
     
+    if st.session_state.get('multi_crawl'):
+        st.download_button(
+            label="⬇️ Download Catalog (CSV)",
+            data=get_crawler().catalog_csv(st.session_state.articles_found),
+            file_name="medscape_catalog.csv",
+            mime="text/csv"
+        )
+    
     # Select all checkbox
     col1, col2 = st.columns([1, 4])
     with col1:
@@ -1212,56 +448,93 @@ def display_batch_generation_options(delay):
         
         st.info(f"🚀 Generating PDFs for {len(st.session_state.selected_articles)} selected articles...")
         
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        metrics_text = st.empty()
-        
-        st.session_state.generated_pdfs = []
-        failed_articles = []
-        
-        for i, article in enumerate(st.session_state.selected_articles):
-            status_text.text(f"📖 Processing {i+1}/{len(st.session_state.selected_articles)}: {article['title']}")
-            
-            # Update metrics
-            metrics = st.session_state.scraper.get_performance_metrics()
-            metrics_text.text(f"📊 Success Rate: {metrics['success_rate']:.1f}% | Requests: {metrics['total_requests']}")
-            
-            article_data = st.session_state.scraper.scrape_complete_article(article['url'])
-            
-            if article_data and article_data['sections']:
-                pdf_path = st.session_state.scraper.create_enhanced_pdf(article_data)
-                if pdf_path:
-                    st.session_state.generated_pdfs.append({
-                        'title': article_data['title'],
-                        'path': pdf_path,
-                        'size': os.path.getsize(pdf_path),
-                        'sections': len(article_data['sections']),
-                        'content_blocks': article_data['total_content_blocks']
-                    })
-                else:
-                    failed_articles.append(article['title'])
-            else:
-                failed_articles.append(article['title'])
-            
-            progress_bar.progress((i + 1) / len(st.session_state.selected_articles))
-            
-            # Add delay between requests
-            if i < len(st.session_state.selected_articles) - 1:
-                time.sleep(delay)
-        
-        status_text.text("✅ Completed!")
-        metrics_text.empty()
-        
-        # Show failure summary
-        if failed_articles:
-            st.error(f"❌ Failed to generate PDFs for {len(failed_articles)} articles:")
-            for failed in failed_articles:
-                st.write(f"- {failed}")
-        
-        # Show success summary
-        if st.session_state.generated_pdfs:
-            st.success(f"🎉 Successfully generated {len(st.session_state.generated_pdfs)} PDFs!")
-            display_batch_download_options()
+        # Persist the batch first so it survives reruns, disconnects and crashes
+        batch_id = st.session_state.job_queue.create_batch(
+            st.session_state.selected_articles,
+            label=st.session_state.get('multi_base_url', '')
+        )
+        run_batch_with_progress(batch_id, delay)
+
+def run_batch_with_progress(batch_id, delay):
+    """Run (or resume) a persisted batch and report progress to the page"""
+    job_queue = st.session_state.job_queue
+    
+    progress_bar = st.progress(0)
+    status_text = st.empty()
+    metrics_text = st.empty()
+    stage_text = st.empty()
+    
+    st.session_state.generated_pdfs = []
+    progress = job_queue.batch_progress(batch_id)
+    total_articles = progress['total']
+    finished = progress['done'] + progress['failed']
+    if finished:
+        st.info(f"⏯️ Resuming batch #{batch_id}: {progress['done']} of {total_articles} articles already done")
+    
+    # Scraping, parsing and PDF rendering overlap across articles
+    pipeline = BatchPipeline(st.session_state.scraper, article_delay=delay, job_queue=job_queue, batch_id=batch_id)
+    stage_icons = {'scrape': '🌐', 'parse': '🧩', 'render': '📄'}
+    
+    for event in pipeline.run():
+        if event['type'] == 'stage':
+            status_text.text(
+                f"{stage_icons[event['stage']]} {event['stage'].title()} finished "
+                f"{event['index']+1}/{total_articles}: {event['title']}"
+            )
+        elif event['type'] == 'retry':
+            status_text.text(f"🔁 Will retry {event['title']} after backoff: {event['error'][:80]}")
+        elif event['type'] in ('done', 'failed'):
+            finished += 1
+        
+        progress_bar.progress(min(finished / total_articles, 1.0))
+        
+        # Update metrics
+        metrics = st.session_state.scraper.get_performance_metrics()
+        metrics_text.text(f"📊 Success Rate: {metrics['success_rate']:.1f}% | Requests: {metrics['total_requests']}")
+        stage_text.text(" | ".join(
+            f"{stage_icons[stage]} {stage.title()}: {stats['items']} done, {stats['items_per_minute']:.1f}/min"
+            for stage, stats in pipeline.get_stage_stats().items()
+        ))
+    
+    progress_bar.progress(1.0)
+    
+    # Results come from the queue so work from earlier runs is included, in selection order
+    st.session_state.generated_pdfs = [
+        result for result in job_queue.batch_results(batch_id) if os.path.exists(result['path'])
+    ]
+    st.session_state.generated_batch_id = batch_id
+    failed_articles = job_queue.failed_articles(batch_id)
+    
+    status_text.text("✅ Completed!")
+    metrics_text.empty()
+    
+    # Show failure summary
+    if failed_articles:
+        st.error(f"❌ Failed to generate PDFs for {len(failed_articles)} articles:")
+        for failed in failed_articles:
+            st.write(f"- {failed['title']} ({failed['last_error']})")
+    
+    # Show success summary
+    if st.session_state.generated_pdfs:
+        st.success(f"🎉 Successfully generated {len(st.session_state.generated_pdfs)} PDFs!")
+        display_batch_download_options()
+
+def display_unfinished_batches(delay):
+    """Offer to resume batches interrupted by a rerun, disconnect or crash"""
+    unfinished = st.session_state.job_queue.list_batches(unfinished_only=True)
+    if not unfinished:
+        return
+    
+    with st.expander(f"⏯️ Unfinished Batches ({len(unfinished)})", expanded=False):
+        for batch in unfinished:
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                created = datetime.fromtimestamp(batch['created_at']).strftime('%Y-%m-%d %H:%M')
+                st.write(f"**Batch #{batch['id']}** ({created}) {batch['label']}")
+                st.caption(f"{batch['done']}/{batch['total']} done | {batch['failed']} failed")
+            with col2:
+                if st.button("▶️ Resume", key=f"resume_batch_{batch['id']}", use_container_width=True):
+                    run_batch_with_progress(batch['id'], delay)
 
 def display_batch_download_options():
     """Display batch download options for generated PDFs"""
@@ -1286,40 +559,71 @@ def display_batch_download_options():
     # Bulk Download Options
     st.markdown("### 📦 Bulk Download Options")
     col1, col2 = st.columns(2)
+    # Named per batch so sessions downloading different batches never share an archive
+    batch_suffix = f"batch_{st.session_state.get('generated_batch_id', 'latest')}"
     
     with col1:
         if st.button("📦 Download All as ZIP", use_container_width=True):
             with st.spinner("Creating ZIP file..."):
                 pdf_paths = [pdf['path'] for pdf in st.session_state.generated_pdfs]
-                zip_buffer = create_zip_file(pdf_paths)
-                
-                st.download_button(
-                    label="⬇️ Download ZIP File",
-                    data=zip_buffer.getvalue(),
-                    file_name=f"medscape_articles_{datetime.now().strftime('%Y%m%d_%H%M')}.zip",
-                    mime="application/zip",
-                    key="download_zip",
-                    type="primary"
+                # Built on disk next to the PDFs and handed to the download as an open file
+                zip_path = create_zip_file(
+                    pdf_paths, os.path.join(os.path.dirname(pdf_paths[0]), f"medscape_articles_{batch_suffix}.zip")
                 )
+                
+                with open(zip_path, 'rb') as zip_file:
+                    st.download_button(
+                        label="⬇️ Download ZIP File",
+                        data=zip_file,
+                        file_name=f"medscape_articles_{datetime.now().strftime('%Y%m%d_%H%M')}.zip",
+                        mime="application/zip",
+                        key="download_zip",
+                        type="primary"
+                    )
     
     with col2:
         if st.button("📑 Download All as Single PDF", use_container_width=True):
             with st.spinner("Combining PDFs..."):
                 pdf_paths = [pdf['path'] for pdf in st.session_state.generated_pdfs]
-                combined_pdf_buffer = create_combined_pdf(pdf_paths)
-                
-                st.download_button(
-                    label="⬇️ Download Combined PDF",
-                    data=combined_pdf_buffer.getvalue(),
-                    file_name=f"combined_articles_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf",
-                    mime="application/pdf",
-                    key="download_combined",
-                    type="primary"
+                combined = create_combined_pdf(
+                    pdf_paths,
+                    os.path.join(os.path.dirname(pdf_paths[0]), f"combined_articles_{batch_suffix}.pdf"),
+                    reporter=st.session_state.scraper.reporter
                 )
+                
+                with open(combined['path'], 'rb') as combined_file:
+                    st.download_button(
+                        label="⬇️ Download Combined PDF",
+                        data=combined_file,
+                        file_name=f"combined_articles_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf",
+                        mime="application/pdf",
+                        key="download_combined",
+                        type="primary"
+                    )
+    
+    article_ids = [pdf['article_id'] for pdf in st.session_state.generated_pdfs if pdf.get('article_id') is not None]
+    if article_ids and st.button("🗂️ Export Content Blocks", use_container_width=True):
+        with st.spinner("Exporting content blocks..."):
+            blocks = st.session_state.scraper.structured_store.blocks(article_ids)
+            if PYARROW_AVAILABLE:
+                buffer = BytesIO()
+                blocks.to_parquet(buffer, index=False)
+                data, extension, mime = buffer.getvalue(), "parquet", "application/vnd.apache.parquet"
+            else:
+                data, extension, mime = blocks.to_csv(index=False), "csv", "text/csv"
+            
+            st.download_button(
+                label=f"⬇️ Download Content Blocks ({extension.upper()})",
+                data=data,
+                file_name=f"medscape_blocks_{datetime.now().strftime('%Y%m%d_%H%M')}.{extension}",
+                mime=mime,
+                key="download_blocks"
+            )
     
     st.info("💡 **Bulk Download Tips:**\n"
            "- **ZIP File**: Best for keeping individual articles separate\n"
-           "- **Combined PDF**: Best for reading all articles in sequence")
+           "- **Combined PDF**: Best for reading all articles in sequence\n"
+           "- **Content Blocks**: Every section, heading and paragraph as a table for analysis")
     
     # Individual PDF downloads
     st.markdown("### 📋 Individual PDF Downloads")
@@ -1348,6 +652,54 @@ def display_batch_download_options():
                 type="primary"
             )
 
+def render_search_tab():
+    """Full-text search over every article scraped so far"""
+    st.header("🔎 Search Scraped Articles")
+    scraper = st.session_state.scraper
+    
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        stats = scraper.search_index.get_stats()
+        st.caption(f"{stats['articles']} articles indexed ({stats['sections']} sections, {stats['blocks']} content blocks)")
+    with col2:
+        if st.button("🔄 Index Stored Articles", use_container_width=True,
+                     help="Add articles stored before the search index existed"):
+            with st.spinner("Indexing stored articles..."):
+                indexed = scraper.search_index.index_store(scraper.structured_store)
+            st.success(f"✅ Indexed {indexed} article(s)")
+    
+    query = st.text_input("Search:", placeholder="e.g. pulmonary embolism anticoagulation", key="search_query")
+    if not query:
+        return
+    
+    started = datetime.now()
+    hits = scraper.search_index.search(query, limit=20, highlight=('**', '**'))
+    elapsed_ms = (datetime.now() - started).total_seconds() * 1000
+    st.caption(f"{len(hits)} matching sections in {elapsed_ms:.0f} ms")
+    
+    for i, hit in enumerate(hits):
+        with st.container(border=True):
+            st.markdown(f"**[{hit['title']}]({hit['url']})** › {hit['section']}")
+            if '**' in hit['heading']:
+                st.caption(hit['heading'].replace('\n', ' › '))
+            st.markdown(hit['snippet'].replace('\n', ' '))
+            
+            # Stored content renders without another scrape
+            if st.button("📄 Build PDF", key=f"search_pdf_{i}"):
+                document = scraper.structured_store.get(hit['article_id'])
+                pdf_path = scraper.create_enhanced_pdf(document) if document else None
+                if pdf_path:
+                    with open(pdf_path, "rb") as pdf_file:
+                        st.download_button(
+                            label="📥 Download PDF",
+                            data=pdf_file.read(),
+                            file_name=os.path.basename(pdf_path),
+                            mime="application/pdf",
+                            key=f"search_download_{i}"
+                        )
+                else:
+                    st.error("❌ Stored content for this article is missing.")
+
 def render_favorites_tab():
     """Render the favorites tab"""
     st.header("⭐ Favorite Articles")
@@ -1356,6 +708,20 @@ def render_favorites_tab():
         st.info("🌟 No favorite articles yet. Add some from the Single Article tab!")
         return
     
+    # Incremental refresh only refetches and re-renders what changed
+    if st.button("♻️ Refresh All Favorites", use_container_width=True):
+        status_counts = Counter()
+        progress_bar = st.progress(0)
+        for i, fav in enumerate(st.session_state.favorite_articles):
+            refresh = st.session_state.scraper.refresh_article(fav['url'])
+            status_counts[refresh['status'] if refresh else 'failed'] += 1
+            progress_bar.progress((i + 1) / len(st.session_state.favorite_articles))
+        progress_bar.empty()
+        st.success(
+            f"✅ Refresh complete: {status_counts['unchanged']} unchanged, "
+            f"{status_counts['updated']} updated, {status_counts['new']} new, {status_counts['failed']} failed"
+        )
+    
     # Display favorites
     for i, fav in enumerate(st.session_state.favorite_articles):
         with st.expander(f"⭐ {fav['title']}", expanded=False):
@@ -1395,9 +761,10 @@ def render_analytics_tab():
     
     # Performance charts
     if st.session_state.scraper.request_history:
+        import plotly.express as px
+        
         # Success over time
-        df = pd.DataFrame(st.session_state.scraper.request_history)
-        df['success_numeric'] = df['success'].astype(int)
+        df = request_history_frame(st.session_state.scraper.request_history)
         
         col1, col2 = st.columns(2)
         
@@ -1408,15 +775,60 @@ def render_analytics_tab():
             st.plotly_chart(fig1, use_container_width=True)
         
         with col2:
-            # Status code distribution
-            status_counts = df['status_code'].value_counts()
-            fig2 = px.pie(values=status_counts.values, names=status_counts.index,
+            # Status code distribution, counted over every request rather than the retained window
+            status_counts = st.session_state.scraper.request_history.status_counts
+            fig2 = px.pie(values=list(status_counts.values()), names=[str(code) for code in status_counts],
                          title='Status Code Distribution')
             st.plotly_chart(fig2, use_container_width=True)
     
+    # Time spent per instrumented stage (network, waits, parsing, PDF)
+    tracer = st.session_state.scraper.tracer
+    span_summary = tracer.summary()
+    if span_summary:
+        st.subheader("⏱️ Where the Time Goes")
+        renderer = st.session_state.scraper.pdf_renderer
+        if renderer is not None:
+            render_stats = renderer.get_stats()
+            st.caption(f"PDF render pool: {render_stats['workers']} processes, {render_stats['rendered']} rendered, "
+                       f"{render_stats['queued']} queued, {render_stats['timed_out']} timed out, "
+                       f"{render_stats['cancelled']} cancelled")
+        st.dataframe([
+            {'stage': name, 'count': entry['count'], 'total_seconds': round(entry['total_seconds'], 2),
+             'avg_ms': round(entry['avg_seconds'] * 1000, 1)}
+            for name, entry in span_summary.items()
+        ])
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button(
+                label="⬇️ Traces (OpenTelemetry JSON)",
+                data=json.dumps(tracer.to_otlp_json()),
+                file_name=f"medscape_traces_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json"
+            )
+        with col2:
+            st.download_button(
+                label="⬇️ Metrics (Prometheus)",
+                data=tracer.to_prometheus(),
+                file_name="medscape_metrics.prom",
+                mime="text/plain"
+            )
+    
+    # URLs that needed retries, slowest first
+    retry_log = list(st.session_state.scraper.retry_policy.retry_log)
+    if retry_log:
+        retry_stats = st.session_state.scraper.retry_policy.get_stats()
+        st.subheader("🔁 Time Spent Retrying")
+        st.caption(f"{retry_stats['retries']} retries over {retry_stats['requests']} requests, "
+                   f"{retry_stats['retry_seconds']:.1f}s total; "
+                   f"{retry_stats['budget_exhausted']} gave up on the retry budget, "
+                   f"{retry_stats['deadline_exceeded']} on the deadline")
+        st.dataframe(sorted(retry_log, key=lambda entry: entry['retry_seconds'], reverse=True)[:20])
+    
     # Download history
     if st.session_state.download_history:
         st.subheader("📥 Download History")
+        import pandas as pd
         download_df = pd.DataFrame(st.session_state.download_history)
         st.dataframe(download_df[['title', 'file_size_kb', 'sections', 'content_blocks', 'timestamp']].tail(10))
     
@@ -1425,7 +837,7 @@ def render_analytics_tab():
         analytics_data = {
             'performance_metrics': st.session_state.scraper.get_performance_metrics(),
             'download_history': st.session_state.download_history,
-            'request_history': st.session_state.scraper.request_history[-100:],  # Last 100 requests
+            'request_history': st.session_state.scraper.request_history.records(last=100),  # Last 100 requests
             'favorite_articles': st.session_state.favorite_articles,
             'export_timestamp': datetime.now().isoformat()
         }
@@ -1452,7 +864,9 @@ def main():
     
     # Initialize session state with enhanced features
     if 'scraper' not in st.session_state:
-        st.session_state.scraper = AdvancedMedscapeScraper()
+        st.session_state.scraper = create_scraper()
+    if 'job_queue' not in st.session_state:
+        st.session_state.job_queue = BatchJobQueue()
     if 'download_history' not in st.session_state:
         st.session_state.download_history = []
     if 'favorite_articles' not in st.session_state:
@@ -1494,6 +908,7 @@ def main():
         else:
             delay = st.slider("Delay (seconds)", 1, 10, 3)
             max_retries = st.slider("Max Retries", 1, 10, 5)
+        st.session_state.scraper.retry_policy.configure(max_attempts=max_retries)
         
         st.session_state.scraper.user_agent_rotation_frequency = st.slider(
             "User Agent Rotation:",
@@ -1502,8 +917,47 @@ def main():
             value=3,
             help="Rotate user agent every N requests"
         )
+
+        requests_per_second = st.slider(
+            "Requests/sec per Host:",
+            min_value=0.1,
+            max_value=5.0,
+            value=1.0,
+            step=0.1,
+            help="Ceiling for the adaptive per-host rate; it backs off on 429/503 and recovers gradually"
+        )
+        max_in_flight = st.slider(
+            "Parallel Requests per Host:",
+            min_value=1,
+            max_value=8,
+            value=4,
+            help="Ceiling for the adaptive number of requests outstanding against one host"
+        )
+        st.session_state.scraper.rate_limiter.configure(requests_per_second, max_in_flight)
+        for host, stats in st.session_state.scraper.rate_limiter.host_stats().items():
+            st.caption(
+                f"🎚️ {host}: {stats['requests_per_second']:.2f} req/s, "
+                f"{stats['max_in_flight']} parallel, throttled {stats['throttled']}x"
+            )
         
         st.session_state.debug_mode = st.checkbox("Debug Mode", value=False)
+        st.session_state.incremental_mode = st.checkbox(
+            "Incremental Re-scrape",
+            value=False,
+            help="Reuse stored articles and skip PDF regeneration when nothing changed"
+        )
+
+        st.markdown("---")
+        st.header("💾 Response Cache")
+        if st.session_state.scraper.cache is not None:
+            cache_stats = st.session_state.scraper.cache.get_stats()
+            st.caption(
+                f"{cache_stats['entries']} pages | {cache_stats['size_mb']:.1f} MB | "
+                f"Hit rate: {cache_stats['hit_rate']:.1f}% | Revalidated: {cache_stats['revalidations']}"
+            )
+            if st.button("🧹 Clear Cache", use_container_width=True):
+                st.session_state.scraper.cache.clear()
+                st.rerun()
         
         st.markdown("---")
         st.header("📊 Real-time Dashboard")
@@ -1519,11 +973,13 @@ def main():
         st.markdown("---")
         st.header("🎯 Quick Actions")
         if st.button("🔄 Reset Scraper", use_container_width=True):
-            st.session_state.scraper = AdvancedMedscapeScraper()
+            st.session_state.scraper = create_scraper()
             st.rerun()
     
     # Main content area with tabs
-    tab1, tab2, tab3, tab4 = st.tabs(["🚀 Single Article", "📚 Multiple Articles", "⭐ Favorites", "📈 Analytics"])
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(
+        ["🚀 Single Article", "📚 Multiple Articles", "🔎 Search", "⭐ Favorites", "📈 Analytics"]
+    )
     
     with tab1:
         render_single_article_tab()
@@ -1532,9 +988,12 @@ def main():
         render_multiple_articles_tab(delay, max_retries)
     
     with tab3:
-        render_favorites_tab()
+        render_search_tab()
     
     with tab4:
+        render_favorites_tab()
+    
+    with tab5:
         render_analytics_tab()
     
     # Footer
@@ -0,0 +1,4183 @@
+"""Scraping, parsing and PDF engine shared by the Streamlit app and the command line
+
+Nothing in here imports Streamlit; front ends attach an EventReporter to
+receive progress. Run `python -m medscape_engine --help` for the CLI.
+"""
+import argparse
+import csv
+import sys
+import requests
+from bs4 import BeautifulSoup
+from bs4.builder import builder_registry
+from bs4.filter import ElementFilter
+import time
+import json
+from urllib.parse import urljoin, urlparse, urlunparse, parse_qsl, urlencode
+import re
+import os
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import random
+import hashlib
+import zipfile
+from io import BytesIO, StringIO
+import logging
+import threading
+import queue
+import contextvars
+import functools
+import inspect
+import asyncio
+import importlib.util
+import multiprocessing
+import sqlite3
+import tempfile
+from array import array
+from collections import Counter, deque
+from itertools import chain
+from types import SimpleNamespace
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor, as_completed
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import urllib3
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+from contextlib import contextmanager, asynccontextmanager
+from xml.sax.saxutils import escape
+
+# Optional async transport, imported when first used
+HTTPX_AVAILABLE = importlib.util.find_spec('httpx') is not None
+# Optional Parquet support for the structured article store
+PYARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+# Disable SSL warnings
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+logger = logging.getLogger(__name__)
+
+# BeautifulSoup tree builders in order of preference; html.parser is always available
+PARSER_BACKENDS = ('lxml', 'html.parser')
+
+def resolve_parser_backend(preferred="auto"):
+    """Pick the fastest installed parser backend, falling back to html.parser"""
+    if preferred == "auto":
+        candidates = PARSER_BACKENDS
+    elif preferred in PARSER_BACKENDS:
+        candidates = (preferred, 'html.parser')
+    else:
+        raise ValueError(f"Unknown parser backend: {preferred}")
+    
+    for name in candidates:
+        if builder_registry.lookup(name) is not None:
+            return name
+    return 'html.parser'
+
+# Section content area candidates, in priority order
+CONTENT_AREA_SELECTORS = [
+    'div.drugdbsectioncontent',
+    'div.article-content',
+    'div.refsection_content',
+    'div.drugdbmain',
+    'div.content',
+    'div.main-content',
+    'article',
+    'div.article-body'
+]
+CONTENT_AREA_CLASSES = {selector.split('.', 1)[1] for selector in CONTENT_AREA_SELECTORS if '.' in selector}
+CONTENT_BLOCK_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'p', 'ul', 'ol', 'table'}
+
+# Index page link extraction
+ARTICLE_ID_PATTERN = re.compile(r'/article/(\d+)')
+CATEGORY_CLASS_PATTERN = re.compile(r'title|head|category')
+ARTICLE_CONTAINER_PATTERN = re.compile(r'article|item|card')
+LINK_SCAN_TAGS = ['a', 'h2', 'h3', 'div']
+
+def _has_class(element, pattern):
+    return any(pattern.search(name) for name in element.get('class') or ())
+
+# PDF story building
+SENTENCE_BREAK_PATTERN = re.compile(r'(?<=[.!?])\s+')
+PAGE_BREAK_SECTIONS = {'Overview', 'Presentation', 'Treatment', 'Medication', 'References'}
+PDF_SIDE_MARGIN = 54
+TABLE_CHAR_WIDTH = 4.5  # Average Helvetica glyph width at the table cell font size
+TABLE_CELL_PADDING = 12
+TABLE_MAX_COLUMN_CHARS = 60
+
+class ContentAreaFilter(ElementFilter):
+    """Parse-time filter that only builds tree nodes inside content-area candidates"""
+
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        # Only consulted outside kept subtrees, so descendants are always built
+        if name == 'article':
+            return True
+        if name != 'div' or not attrs:
+            return False
+        classes = attrs.get('class') or ''
+        if isinstance(classes, str):
+            classes = classes.split()
+        return not CONTENT_AREA_CLASSES.isdisjoint(classes)
+
+    def allow_string_creation(self, string):
+        return False
+
+def normalize_url(url):
+    """Normalize URL so equivalent addresses share a cache entry"""
+    parts = urlparse(url.strip())
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunparse((
+        parts.scheme.lower(),
+        parts.netloc.lower(),
+        parts.path or '/',
+        parts.params,
+        query,
+        ''  # Fragments never reach the server
+    ))
+
+class EventReporter:
+    """Receives progress events from the engine; the default just logs them
+
+    Front ends subclass this and override emit(). Kinds are debug, info,
+    success, warning, error, section, progress, progress_end and pdf_created.
+    """
+
+    LOG_LEVELS = {
+        'debug': logging.DEBUG,
+        'section': logging.DEBUG,
+        'progress': logging.DEBUG,
+        'progress_end': logging.DEBUG,
+        'warning': logging.WARNING,
+        'error': logging.ERROR,
+    }
+
+    def emit(self, kind, message="", **data):
+        if message:
+            logger.log(self.LOG_LEVELS.get(kind, logging.INFO), message)
+
+# Current span for nesting; a ContextVar so asyncio tasks sharing a thread keep separate stacks
+_current_span = contextvars.ContextVar('medscape_current_span', default=None)
+
+class Tracer:
+    """Collects timing spans and exports them as OpenTelemetry JSON or Prometheus text
+
+    Spans nest within a thread or asyncio task. Root spans opened with a
+    trace_key (the article URL) share one trace id, so every stage of an
+    article lands in the same trace even when stages run on different
+    threads. Recent spans are kept for export; per-name duration histograms
+    cover every span ever recorded.
+    """
+
+    DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self, service_name="medscape-scraper", max_spans=10000):
+        self.service_name = service_name
+        self.spans = deque(maxlen=max_spans)
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def _new_span(self, name, trace_key, attributes):
+        parent = _current_span.get()
+        if parent is not None:
+            trace_id, parent_id = parent['trace_id'], parent['span_id']
+        elif trace_key:
+            trace_id, parent_id = hashlib.md5(trace_key.encode()).hexdigest(), None
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+        return {
+            'name': name,
+            'trace_id': trace_id,
+            'span_id': os.urandom(8).hex(),
+            'parent_id': parent_id,
+            'start': time.time(),
+            'attributes': attributes,
+            'error': None
+        }
+
+    @contextmanager
+    def span(self, name, trace_key=None, **attributes):
+        """Time the enclosed block; yields the span so attributes can be added"""
+        span = self._new_span(name, trace_key, attributes)
+        token = _current_span.set(span)
+        started = time.perf_counter()
+        try:
+            yield span
+        except Exception as e:
+            span['error'] = f"{type(e).__name__}: {e}"[:200]
+            raise
+        finally:
+            _current_span.reset(token)
+            self._finish(span, time.perf_counter() - started)
+
+    def record(self, name, duration, trace_key=None, **attributes):
+        """Record a span timed elsewhere that has just ended (e.g. time to first byte)"""
+        span = self._new_span(name, trace_key, attributes)
+        span['start'] -= duration
+        self._finish(span, duration)
+
+    def _finish(self, span, duration):
+        span['duration'] = duration
+        with self._lock:
+            self.spans.append(span)
+            totals = self.totals.get(span['name'])
+            if totals is None:
+                totals = self.totals[span['name']] = {
+                    'count': 0, 'sum': 0.0, 'errors': 0, 'buckets': [0] * len(self.DURATION_BUCKETS)
+                }
+            totals['count'] += 1
+            totals['sum'] += duration
+            totals['errors'] += span['error'] is not None
+            for index, bound in enumerate(self.DURATION_BUCKETS):
+                if duration <= bound:
+                    totals['buckets'][index] += 1
+
+    def summary(self, trace_key=None):
+        """Count and seconds per span name, for everything or for one article's trace"""
+        with self._lock:
+            if trace_key is None:
+                return {
+                    name: {'count': totals['count'], 'total_seconds': totals['sum'],
+                           'avg_seconds': totals['sum'] / totals['count']}
+                    for name, totals in sorted(self.totals.items())
+                }
+            trace_id = hashlib.md5(trace_key.encode()).hexdigest()
+            spans = [span for span in self.spans if span['trace_id'] == trace_id]
+        summary = {}
+        for span in spans:
+            entry = summary.setdefault(span['name'], {'count': 0, 'total_seconds': 0.0})
+            entry['count'] += 1
+            entry['total_seconds'] += span['duration']
+        for entry in summary.values():
+            entry['avg_seconds'] = entry['total_seconds'] / entry['count']
+        return dict(sorted(summary.items()))
+
+    def _otlp_value(self, value):
+        if isinstance(value, bool):
+            return {'boolValue': value}
+        if isinstance(value, int):
+            return {'intValue': str(value)}
+        if isinstance(value, float):
+            return {'doubleValue': value}
+        return {'stringValue': str(value)}
+
+    def to_otlp_json(self):
+        """Retained spans in the OTLP/JSON trace format (as posted to /v1/traces)"""
+        with self._lock:
+            spans = list(self.spans)
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                'traceId': span['trace_id'],
+                'spanId': span['span_id'],
+                'name': span['name'],
+                'kind': 3 if span['name'].startswith('http.') else 1,  # CLIENT / INTERNAL
+                'startTimeUnixNano': str(int(span['start'] * 1e9)),
+                'endTimeUnixNano': str(int((span['start'] + span['duration']) * 1e9)),
+                'attributes': [{'key': key, 'value': self._otlp_value(value)} for key, value in span['attributes'].items()],
+                'status': {'code': 2, 'message': span['error']} if span['error'] else {'code': 1}
+            }
+            if span['parent_id']:
+                otlp_span['parentSpanId'] = span['parent_id']
+            otlp_spans.append(otlp_span)
+        return {'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]},
+            'scopeSpans': [{'scope': {'name': 'medscape_engine'}, 'spans': otlp_spans}]
+        }]}
+
+    def to_prometheus(self):
+        """Per-span duration histograms in the Prometheus text exposition format"""
+        lines = [
+            "# HELP medscape_span_duration_seconds Time spent in each instrumented stage",
+            "# TYPE medscape_span_duration_seconds histogram"
+        ]
+        with self._lock:
+            totals = {name: dict(entry, buckets=list(entry['buckets'])) for name, entry in sorted(self.totals.items())}
+        for name, entry in totals.items():
+            for bound, count in zip(self.DURATION_BUCKETS, entry['buckets']):
+                lines.append(f'medscape_span_duration_seconds_bucket{{span="{name}",le="{bound}"}} {count}')
+            lines.append(f'medscape_span_duration_seconds_bucket{{span="{name}",le="+Inf"}} {entry["count"]}')
+            lines.append(f'medscape_span_duration_seconds_sum{{span="{name}"}} {entry["sum"]:.6f}')
+            lines.append(f'medscape_span_duration_seconds_count{{span="{name}"}} {entry["count"]}')
+        lines.append("# HELP medscape_span_errors_total Spans that ended with an exception")
+        lines.append("# TYPE medscape_span_errors_total counter")
+        for name, entry in totals.items():
+            lines.append(f'medscape_span_errors_total{{span="{name}"}} {entry["errors"]}')
+        return "\n".join(lines) + "\n"
+
+def traced(name, trace_key=None):
+    """Method decorator wrapping each call in a span of self.tracer
+
+    trace_key receives the call's bound arguments and returns the key that
+    groups the span's trace, e.g. lambda call: call['article_url'].
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+        
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            key = None
+            if trace_key is not None:
+                call = signature.bind(self, *args, **kwargs)
+                call.apply_defaults()
+                key = trace_key(call.arguments)
+            with self.tracer.span(name, trace_key=key):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def traced_pool_classes(tracer):
+    """urllib3 connection pools whose new connections record an http.connect span
+
+    urllib3 resolves and connects in one call, so the span covers DNS, TCP
+    and (for HTTPS) the TLS handshake. Reused keep-alive connections add none.
+    """
+    class TracedHTTPConnection(urllib3.connection.HTTPConnection):
+        def connect(self):
+            with tracer.span('http.connect', **{'server.address': self.host, 'server.port': self.port}):
+                super().connect()
+
+    class TracedHTTPSConnection(urllib3.connection.HTTPSConnection):
+        def connect(self):
+            with tracer.span('http.connect', **{'server.address': self.host, 'server.port': self.port, 'tls': True}):
+                super().connect()
+
+    class TracedHTTPConnectionPool(urllib3.HTTPConnectionPool):
+        ConnectionCls = TracedHTTPConnection
+
+    class TracedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+        ConnectionCls = TracedHTTPSConnection
+
+    return {'http': TracedHTTPConnectionPool, 'https': TracedHTTPSConnectionPool}
+
+def start_metrics_server(tracer, port=9464, host='127.0.0.1'):
+    """Serve /metrics (Prometheus) and /v1/traces (OTLP JSON) from a daemon thread"""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path == '/metrics':
+                body, content_type = tracer.to_prometheus().encode(), 'text/plain; version=0.0.4'
+            elif path == '/v1/traces':
+                body, content_type = json.dumps(tracer.to_otlp_json()).encode(), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class ResponseCache:
+    """Content-addressed on-disk HTTP response cache with TTL and LRU eviction"""
+
+    # Headers describing the transfer rather than the stored (decoded) body
+    SKIPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'connection'}
+
+    def __init__(self, cache_dir="http_cache", ttl_seconds=24 * 3600, max_size_mb=500):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.index = {}  # key -> {'size': bytes, 'last_access': epoch seconds}
+        self.total_size = 0
+        self._lock = threading.RLock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the in-memory LRU index from the files on disk"""
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.json'):
+                    continue
+                key = name[:-5]
+                meta_path = os.path.join(root, name)
+                body_path = meta_path[:-5] + '.body'
+                if not os.path.exists(body_path):
+                    os.remove(meta_path)
+                    continue
+                size = os.path.getsize(meta_path) + os.path.getsize(body_path)
+                self.index[key] = {'size': size, 'last_access': os.path.getmtime(meta_path)}
+                self.total_size += size
+
+    def make_key(self, url):
+        """Hash the normalized URL into a cache key"""
+        return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+
+    def _paths(self, key):
+        folder = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(folder, key + '.json'), os.path.join(folder, key + '.body')
+
+    def get(self, url, revalidate=False):
+        """Return the cached entry for a URL (fresh or stale), or None
+
+        A fresh entry counts as a hit; a stale or missing one as a miss, as
+        does any entry the caller is about to revalidate with the server.
+        """
+        entry = self._read(self.make_key(url))
+        with self._lock:
+            if entry is not None and not revalidate and self.is_fresh(entry):
+                self.hits += 1
+            else:
+                self.misses += 1
+        return entry
+
+    def _read(self, key):
+        if key not in self.index:
+            return None
+
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as meta_file:
+                entry = json.load(meta_file)
+            with open(body_path, 'rb') as body_file:
+                entry['body'] = body_file.read()
+        except (OSError, ValueError):
+            self._remove(key)
+            return None
+
+        self._touch(key)
+        return entry
+
+    def is_fresh(self, entry):
+        """Check whether an entry is still within the TTL"""
+        return (time.time() - entry['fetched_at']) < self.ttl_seconds
+
+    def validators(self, entry):
+        """Conditional request headers for revalidating a stale entry"""
+        headers = {}
+        stored = {k.lower(): v for k, v in entry.get('headers', {}).items()}
+        if stored.get('etag'):
+            headers['If-None-Match'] = stored['etag']
+        if stored.get('last-modified'):
+            headers['If-Modified-Since'] = stored['last-modified']
+        return headers
+
+    def put(self, url, response):
+        """Store a successful response body, status and headers"""
+        key = self.make_key(url)
+        meta_path, body_path = self._paths(key)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+
+        entry = {
+            'url': normalize_url(url),
+            'final_url': str(response.url),
+            'status': response.status_code,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() not in self.SKIPPED_HEADERS},
+            'encoding': response.encoding,
+            'fetched_at': time.time()
+        }
+
+        with self._lock:
+            if key in self.index:
+                self.total_size -= self.index[key]['size']
+
+            # Body first, meta last, each replaced atomically: a reader (or another
+            # process sharing the directory) never sees meta next to a torn body
+            self._write_file(body_path, lambda body_file: body_file.write(response.content), 'wb')
+            self._write_file(meta_path, lambda meta_file: json.dump(entry, meta_file))
+
+            size = os.path.getsize(meta_path) + os.path.getsize(body_path)
+            self.index[key] = {'size': size, 'last_access': time.time()}
+            self.total_size += size
+            self._evict()
+
+    def mark_revalidated(self, url, response=None):
+        """Reset the fetch time of an entry after a 304 Not Modified"""
+        key = self.make_key(url)
+        meta_path, _ = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as meta_file:
+                entry = json.load(meta_file)
+            entry['fetched_at'] = time.time()
+            if response is not None:
+                # A 304 may carry refreshed validators
+                for header in ('ETag', 'Last-Modified'):
+                    if response.headers.get(header):
+                        entry['headers'][header] = response.headers[header]
+            self._write_file(meta_path, lambda meta_file: json.dump(entry, meta_file))
+        except (OSError, ValueError):
+            self._remove(key)
+            return
+        with self._lock:
+            self.revalidations += 1
+        self._touch(key)
+
+    def _write_file(self, path, write, mode='w'):
+        """Write through a unique temp file and publish it with os.replace"""
+        tmp_path = temp_path_beside(path)
+        try:
+            with open(tmp_path, mode, encoding=None if 'b' in mode else 'utf-8') as tmp_file:
+                write(tmp_file)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def to_response(self, entry):
+        """Rebuild a requests.Response from a cache entry"""
+        response = requests.Response()
+        response.status_code = entry['status']
+        response._content = entry['body']
+        response.headers = CaseInsensitiveDict(entry.get('headers', {}))
+        response.url = entry.get('final_url') or entry['url']
+        response.encoding = entry.get('encoding')
+        response.from_cache = True
+        return response
+
+    def _touch(self, key):
+        now = time.time()
+        with self._lock:
+            if key not in self.index:
+                return
+            self.index[key]['last_access'] = now
+        meta_path, _ = self._paths(key)
+        try:
+            os.utime(meta_path, (now, now))
+        except OSError:
+            pass
+
+    def _remove(self, key):
+        with self._lock:
+            info = self.index.pop(key, None)
+            if info:
+                self.total_size -= info['size']
+        for path in self._paths(key):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _evict(self):
+        """Drop least recently used entries until under the size cap"""
+        with self._lock:
+            if self.total_size <= self.max_size_bytes:
+                return
+            for key, _ in sorted(self.index.items(), key=lambda item: item[1]['last_access']):
+                if self.total_size <= self.max_size_bytes:
+                    break
+                self._remove(key)
+
+    def clear(self):
+        """Remove every cached response"""
+        for key in list(self.index):
+            self._remove(key)
+        with self._lock:
+            self.hits = self.misses = self.revalidations = 0
+
+    def get_stats(self):
+        """Cache statistics for the dashboard"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.index),
+                'size_mb': self.total_size / (1024 * 1024),
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'hit_rate': (self.hits / lookups * 100) if lookups else 0
+            }
+
+class ArticleStore:
+    """Local store of scraped articles used for incremental re-scraping"""
+
+    def __init__(self, store_dir="article_store"):
+        self.store_dir = store_dir
+        self._lock = threading.Lock()
+        os.makedirs(self.store_dir, exist_ok=True)
+
+    def _path(self, url):
+        key = hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+        return os.path.join(self.store_dir, key + '.json')
+
+    def get(self, url):
+        """Return the stored record for an article, or None"""
+        path = self._path(url)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as record_file:
+                return json.load(record_file)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url, record):
+        """Write a record atomically so a crash never leaves a torn file"""
+        path = self._path(url)
+        with self._lock:
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as record_file:
+                json.dump(record, record_file, default=str)
+            os.replace(tmp_path, path)
+
+    def __len__(self):
+        return sum(1 for name in os.listdir(self.store_dir) if name.endswith('.json'))
+
+def article_id_for(url):
+    """Medscape article ID from a URL; other URLs get a stable 60-bit hash"""
+    match = ARTICLE_ID_PATTERN.search(url)
+    if match:
+        return int(match.group(1))
+    return int(hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()[:15], 16)
+
+def article_content_hash(article_data):
+    """Hash of the parts of an article that end up in its PDF"""
+    return hashlib.md5(json.dumps(
+        [article_data['title'], article_data['authors'], article_data['last_updated'], article_data['sections']],
+        sort_keys=True
+    ).encode('utf-8')).hexdigest()
+
+def flatten_article_blocks(document):
+    """Content blocks of a stored article as rows (article_id, section, heading, position, type, text)"""
+    rows = []
+    position = 0
+    for section_name, section_content in document['sections'].items():
+        for subsection in section_content:
+            for block in subsection['content']:
+                if block['type'] == 'list':
+                    text = "\n".join(block['items'])
+                elif block['type'] == 'table':
+                    text = "\n".join("\t".join(row) for row in block['data'])
+                else:
+                    text = block.get('text', '')
+                rows.append({
+                    'article_id': document['article_id'],
+                    'section': section_name,
+                    'heading': subsection['heading'],
+                    'position': position,
+                    'type': block['type'],
+                    'text': text
+                })
+                position += 1
+    return rows
+
+class StructuredArticleStore:
+    """Versioned structured output: one JSON document per article plus a Parquet table of content blocks
+
+    Documents hold everything create_enhanced_pdf needs, so articles can be
+    re-rendered or analysed without scraping again. A SQLite index keeps
+    article metadata filterable without opening every document. Block
+    tables need pyarrow; without it the blocks are rebuilt from the
+    documents on load.
+    """
+
+    SCHEMA_VERSION = 1
+    DOCUMENT_FIELDS = ('url', 'title', 'authors', 'last_updated', 'sections', 'total_sections',
+                       'total_content_blocks', 'successful_sections')
+    BLOCK_COLUMNS = ('article_id', 'section', 'heading', 'position', 'type', 'text')
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS articles (
+            article_id INTEGER PRIMARY KEY,
+            url TEXT NOT NULL,
+            title TEXT,
+            authors TEXT,
+            last_updated TEXT,
+            sections INTEGER NOT NULL,
+            blocks INTEGER NOT NULL,
+            content_hash TEXT NOT NULL,
+            revision INTEGER NOT NULL,
+            stored_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, store_dir="structured_store"):
+        self.store_dir = store_dir
+        self.documents_dir = os.path.join(store_dir, 'documents')
+        self.blocks_dir = os.path.join(store_dir, 'blocks')
+        os.makedirs(self.documents_dir, exist_ok=True)
+        os.makedirs(self.blocks_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._put_lock = threading.Lock()  # Serializes puts from reading the revision to the index write
+        self.conn = sqlite3.connect(os.path.join(store_dir, 'index.sqlite3'), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(self.SCHEMA)
+
+    def _execute(self, sql, params=()):
+        with self._lock, self.conn:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _document_path(self, article_id):
+        return os.path.join(self.documents_dir, f"{article_id}.json")
+
+    def _blocks_path(self, article_id):
+        return os.path.join(self.blocks_dir, f"{article_id}.parquet")
+
+    def put(self, article_data):
+        """Store a scraped article; the revision only moves when its content changes. Returns the article ID"""
+        article_id = article_id_for(article_data['url'])
+        document = {field: article_data.get(field) for field in self.DOCUMENT_FIELDS}
+        content_hash = article_content_hash(document)
+        
+        with self._put_lock:
+            previous = self._execute("SELECT content_hash, revision FROM articles WHERE article_id = ?", (article_id,))
+            if previous and previous[0]['content_hash'] == content_hash and os.path.exists(self._document_path(article_id)):
+                self._execute("UPDATE articles SET stored_at = ? WHERE article_id = ?", (time.time(), article_id))
+                return article_id
+            
+            document.update(
+                schema_version=self.SCHEMA_VERSION,
+                article_id=article_id,
+                content_hash=content_hash,
+                revision=previous[0]['revision'] + 1 if previous else 1,
+                stored_at=datetime.now().isoformat()
+            )
+            rows = flatten_article_blocks(document)
+            
+            # Files first, then the index, each replaced atomically
+            path = self._document_path(article_id)
+            with open(path + '.tmp', 'w', encoding='utf-8') as document_file:
+                json.dump(document, document_file, separators=(',', ':'), ensure_ascii=False, default=str)
+            os.replace(path + '.tmp', path)
+            if PYARROW_AVAILABLE:
+                self._write_blocks(article_id, rows)
+            
+            with self._lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (article_id, document['url'], document['title'], "; ".join(document['authors'] or []),
+                     document['last_updated'], len(document['sections']), len(rows), content_hash,
+                     document['revision'], time.time())
+                )
+        return article_id
+
+    def _write_blocks(self, article_id, rows):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        table = pa.Table.from_pylist(rows, schema=self._block_schema())
+        table = table.replace_schema_metadata({'schema_version': str(self.SCHEMA_VERSION)})
+        path = self._blocks_path(article_id)
+        pq.write_table(table, path + '.tmp', compression='zstd')
+        os.replace(path + '.tmp', path)
+
+    def _block_schema(self):
+        import pyarrow as pa
+        return pa.schema([
+            ('article_id', pa.int64()), ('section', pa.string()), ('heading', pa.string()),
+            ('position', pa.int32()), ('type', pa.string()), ('text', pa.string())
+        ])
+
+    def get(self, article):
+        """The stored document for an article ID or URL, or None"""
+        article_id = article_id_for(article) if isinstance(article, str) else int(article)
+        try:
+            with open(self._document_path(article_id), 'r', encoding='utf-8') as document_file:
+                return json.load(document_file)
+        except (OSError, ValueError):
+            return None
+
+    def list_articles(self, title_contains=None, updated=None, stored_since=None):
+        """Index entries, newest first, filtered by title substring, updated date or store time"""
+        sql = "SELECT * FROM articles WHERE 1 = 1"
+        params = []
+        if title_contains:
+            sql += " AND title LIKE ?"
+            params.append(f"%{title_contains}%")
+        if updated:
+            sql += " AND last_updated = ?"
+            params.append(updated)
+        if stored_since is not None:
+            sql += " AND stored_at >= ?"
+            params.append(stored_since)
+        return [dict(row) for row in self._execute(sql + " ORDER BY stored_at DESC", params)]
+
+    def blocks(self, article_ids=None, section=None, block_type=None):
+        """Content blocks as a pandas DataFrame, optionally filtered"""
+        import pandas as pd
+        
+        if article_ids is None:
+            article_ids = [entry['article_id'] for entry in self.list_articles()]
+        if PYARROW_AVAILABLE:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            
+            tables = [pq.read_table(path) for path in map(self._blocks_path, article_ids) if os.path.exists(path)]
+            frame = pa.concat_tables(tables).to_pandas() if tables else pd.DataFrame(columns=self.BLOCK_COLUMNS)
+        else:
+            rows = []
+            for article_id in article_ids:
+                document = self.get(article_id)
+                if document:
+                    rows.extend(flatten_article_blocks(document))
+            frame = pd.DataFrame(rows, columns=self.BLOCK_COLUMNS)
+        
+        if section is not None:
+            frame = frame[frame['section'] == section]
+        if block_type is not None:
+            frame = frame[frame['type'] == block_type]
+        return frame.reset_index(drop=True)
+
+    def export(self, path, article_ids=None):
+        """Export documents (.jsonl) or the blocks table (.parquet, .csv); returns the number of records"""
+        lower_path = path.lower()
+        if lower_path.endswith('.jsonl'):
+            if article_ids is None:
+                article_ids = [entry['article_id'] for entry in self.list_articles()]
+            count = 0
+            with open(path, 'w', encoding='utf-8') as export_file:
+                for article_id in article_ids:
+                    document = self.get(article_id)
+                    if document:
+                        export_file.write(json.dumps(document, ensure_ascii=False) + "\n")
+                        count += 1
+            return count
+        
+        frame = self.blocks(article_ids)
+        if lower_path.endswith('.parquet'):
+            if not PYARROW_AVAILABLE:
+                raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+            frame.to_parquet(path, index=False, compression='zstd')
+        elif lower_path.endswith('.csv'):
+            frame.to_csv(path, index=False)
+        else:
+            raise ValueError(f"Unsupported export format: {path}")
+        return len(frame)
+
+    def __len__(self):
+        return self._execute("SELECT COUNT(*) FROM articles")[0][0]
+
+class ArticleSearchIndex:
+    """SQLite FTS5 full-text index over the sections of stored articles
+
+    Articles are indexed as they are stored and re-indexed only when their
+    content hash changes. Each section is one FTS row holding its headings
+    and the text of its paragraph, list and table blocks; ranking whole
+    sections keeps common-word queries fast on thousands of articles. The
+    rowid encodes the article's index slot and the section position, so
+    replacing an article is a rowid range delete rather than a table scan.
+    """
+
+    SECTIONS_PER_ARTICLE = 1 << 10
+    # bm25 column weights: title, section, headings, text (the unindexed article_id is ignored)
+    RANK = 'bm25(0, 5.0, 2.0, 3.0, 1.0)'
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS indexed_articles (
+            slot INTEGER PRIMARY KEY AUTOINCREMENT,
+            article_id INTEGER NOT NULL UNIQUE,
+            url TEXT NOT NULL,
+            title TEXT,
+            content_hash TEXT NOT NULL,
+            sections INTEGER NOT NULL,
+            blocks INTEGER NOT NULL,
+            indexed_at REAL NOT NULL
+        );
+        CREATE VIRTUAL TABLE IF NOT EXISTS sections USING fts5(
+            article_id UNINDEXED, title, section, headings, text,
+            tokenize = 'unicode61 remove_diacritics 2'
+        );
+    """
+
+    def __init__(self, db_path="search_index.sqlite3"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(self.SCHEMA)
+            self.conn.execute("INSERT INTO sections (sections, rank) VALUES ('rank', ?)", (self.RANK,))
+
+    def _execute(self, sql, params=()):
+        with self._lock, self.conn:
+            return self.conn.execute(sql, params).fetchall()
+
+    def index_article(self, article_data):
+        """Index (or re-index) one article; returns False when it was already up to date"""
+        article_id = article_data.get('article_id') or article_id_for(article_data['url'])
+        content_hash = article_data.get('content_hash') or article_content_hash(article_data)
+        rows = flatten_article_blocks(dict(article_data, article_id=article_id))
+        section_rows = {}
+        for row in rows:
+            section = section_rows.setdefault(row['section'], {'headings': [], 'text': []})
+            if not section['headings'] or section['headings'][-1] != row['heading']:
+                section['headings'].append(row['heading'])
+            section['text'].append(row['text'])
+        
+        with self._lock, self.conn:
+            existing = self.conn.execute(
+                "SELECT slot, content_hash FROM indexed_articles WHERE article_id = ?", (article_id,)
+            ).fetchone()
+            if existing and existing['content_hash'] == content_hash:
+                return False
+            
+            if existing:
+                slot = existing['slot']
+                self._delete_sections(slot)
+                self.conn.execute(
+                    "UPDATE indexed_articles SET url = ?, title = ?, content_hash = ?, sections = ?, blocks = ?, "
+                    "indexed_at = ? WHERE slot = ?",
+                    (article_data['url'], article_data['title'], content_hash, len(section_rows), len(rows),
+                     time.time(), slot)
+                )
+            else:
+                slot = self.conn.execute(
+                    "INSERT INTO indexed_articles (article_id, url, title, content_hash, sections, blocks, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (article_id, article_data['url'], article_data['title'], content_hash, len(section_rows),
+                     len(rows), time.time())
+                ).lastrowid
+            
+            first_rowid = slot * self.SECTIONS_PER_ARTICLE
+            self.conn.executemany(
+                "INSERT INTO sections (rowid, article_id, title, section, headings, text) VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (first_rowid + position, article_id, article_data['title'], name,
+                     "\n".join(section['headings']), "\n".join(section['text']))
+                    for position, (name, section) in enumerate(section_rows.items())
+                    if position < self.SECTIONS_PER_ARTICLE
+                ]
+            )
+        return True
+
+    def _delete_sections(self, slot):
+        first_rowid = slot * self.SECTIONS_PER_ARTICLE
+        self.conn.execute(
+            "DELETE FROM sections WHERE rowid BETWEEN ? AND ?",
+            (first_rowid, first_rowid + self.SECTIONS_PER_ARTICLE - 1)
+        )
+
+    def index_store(self, store):
+        """Bring the index up to date with a StructuredArticleStore; returns how many articles were (re)indexed"""
+        indexed = {
+            row['article_id']: row['content_hash']
+            for row in self._execute("SELECT article_id, content_hash FROM indexed_articles")
+        }
+        count = 0
+        for entry in store.list_articles():
+            if indexed.get(entry['article_id']) == entry['content_hash']:
+                continue
+            document = store.get(entry['article_id'])
+            if document and self.index_article(document):
+                count += 1
+        return count
+
+    def remove_article(self, article_id):
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT slot FROM indexed_articles WHERE article_id = ?", (article_id,)).fetchone()
+            if row:
+                self._delete_sections(row['slot'])
+                self.conn.execute("DELETE FROM indexed_articles WHERE slot = ?", (row['slot'],))
+
+    @staticmethod
+    def build_query(text):
+        """Turn free text into an FTS5 query: every word must match, the last one as a prefix"""
+        words = re.findall(r'\w+', text)
+        if not words:
+            return None
+        terms = [f'"{word}"' for word in words]
+        terms[-1] += '*'
+        return " ".join(terms)
+
+    def search(self, text, limit=20, raw=False, highlight=('[', ']')):
+        """Ranked section hits with snippets, best first; raw passes FTS5 query syntax through"""
+        query = text if raw else self.build_query(text)
+        if not query:
+            return []
+        # Rank inside the FTS query so SQLite can use its top-N rank optimisation
+        rows = self._execute("""
+            SELECT s.*, a.url FROM (
+                SELECT article_id, title, section, rank AS score,
+                       snippet(sections, 4, ?, ?, ' … ', 16) AS snippet,
+                       snippet(sections, 3, ?, ?, ' … ', 8) AS heading
+                FROM sections WHERE sections MATCH ? ORDER BY rank LIMIT ?
+            ) s JOIN indexed_articles a ON a.article_id = s.article_id
+            ORDER BY s.score
+        """, (*highlight, *highlight, query, limit))
+        return [dict(row, score=-row['score']) for row in rows]
+
+    def get_stats(self):
+        row = self._execute(
+            "SELECT COUNT(*) AS articles, COALESCE(SUM(sections), 0) AS sections, COALESCE(SUM(blocks), 0) AS blocks "
+            "FROM indexed_articles"
+        )[0]
+        return dict(row)
+
+    def __len__(self):
+        return self.get_stats()['articles']
+
+class RequestHistory:
+    """Fixed-capacity columnar ring buffer of request attempts with running statistics
+
+    Timestamps (epoch floats), status codes and success flags live in
+    preallocated arrays, so memory stays constant over long runs. Totals,
+    per-status counts and the rolling success windows are updated on every
+    append instead of being recomputed from the history.
+    """
+
+    def __init__(self, capacity=1000, windows=(10, 20)):
+        self.capacity = capacity
+        self.timestamps = array('d', [0.0]) * capacity
+        self.status_codes = array('H', [0]) * capacity
+        self.attempts = array('H', [0]) * capacity
+        self.successes = array('b', [0]) * capacity
+        self.cumulative_successes = array('q', [0]) * capacity
+        self.urls = [None] * capacity
+        self.windows = {window: 0 for window in windows if window < capacity}
+        self.version = 0  # Bumped on every change so readers can cache derived views
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.count = 0  # Attempts ever appended; the newest sits at (count - 1) % capacity
+            self.total_successes = 0
+            self.status_counts = Counter()
+            self.windows = dict.fromkeys(self.windows, 0)
+            self.version += 1
+
+    def append(self, record):
+        """Add one request_record dict (timestamp, url, attempt, status_code, success)"""
+        success = 1 if record['success'] else 0
+        with self._lock:
+            slot = self.count % self.capacity
+            self.timestamps[slot] = record['timestamp']
+            self.status_codes[slot] = record['status_code'] or 0
+            self.attempts[slot] = record['attempt']
+            self.successes[slot] = success
+            self.urls[slot] = record['url']
+            self.count += 1
+            self.total_successes += success
+            self.cumulative_successes[slot] = self.total_successes
+            self.status_counts[record['status_code']] += 1
+            for window in self.windows:
+                self.windows[window] += success
+                if self.count > window:
+                    self.windows[window] -= self.successes[(self.count - 1 - window) % self.capacity]
+            self.version += 1
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def success_rate(self, window):
+        """Share of the last `window` attempts that succeeded, or None before any request"""
+        with self._lock:
+            size = min(window, self.count, self.capacity)
+            if not size:
+                return None
+            if window in self.windows:
+                return self.windows[window] / size
+            return sum(self.successes[(self.count - 1 - i) % self.capacity] for i in range(size)) / size
+
+    def _slots(self, last=None):
+        size = len(self)
+        if last is not None:
+            size = min(size, last)
+        return [(self.count - size + i) % self.capacity for i in range(size)]
+
+    def columns(self, last=None):
+        """Retained attempts as column lists, oldest first (ready for a DataFrame)"""
+        with self._lock:
+            slots = self._slots(last)
+            return {
+                'timestamp': [datetime.fromtimestamp(self.timestamps[slot]) for slot in slots],
+                'url': [self.urls[slot] for slot in slots],
+                'attempt': [self.attempts[slot] for slot in slots],
+                'status_code': [self.status_codes[slot] for slot in slots],
+                'success': [bool(self.successes[slot]) for slot in slots],
+                'cumulative_successes': [self.cumulative_successes[slot] for slot in slots]
+            }
+
+    def records(self, last=None):
+        """Retained attempts as request_record dicts, oldest first"""
+        columns = self.columns(last)
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+class HostRateLimiter:
+    """Per-host politeness scheduler with AIMD adaptive concurrency
+
+    Each host gets a token bucket (request spacing) and a cap on in-flight
+    requests. Both start below the configured ceilings and are tuned from
+    what the server reports: every healthy response adds a little
+    (additive increase) while latency stays near the host's best; a 429,
+    503, 403, block page or timeout halves them (multiplicative decrease)
+    and holds the host for its Retry-After, at most once per round trip.
+    """
+
+    def __init__(self, requests_per_second=1.0, burst=2, max_in_flight=4, min_requests_per_second=0.05,
+                 latency_tolerance=2.0, max_retry_after=300):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.min_requests_per_second = min_requests_per_second
+        self.latency_tolerance = latency_tolerance
+        self.max_retry_after = max_retry_after
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+        self._async_waiters = []  # (loop, future) pairs woken with the condition
+        self._hosts = {}
+
+    def _host_state(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                now = time.monotonic()
+                state = {
+                    'tokens': float(self.burst),
+                    'updated': now,
+                    'rate': self.requests_per_second / 2,
+                    'limit': max(1.0, self.max_in_flight / 2),
+                    'in_flight': 0,
+                    'hold_until': 0.0,
+                    'latency': None,
+                    'best_latency': None,
+                    'last_decrease': 0.0,
+                    'throttled': 0
+                }
+                self._hosts[host] = state
+            return state
+
+    def _take_token(self, state):
+        """Consume a token if one is available, otherwise return seconds until one is"""
+        with self._lock:
+            now = time.monotonic()
+            if now < state['hold_until']:
+                return state['hold_until'] - now
+            state['tokens'] = min(
+                self.burst,
+                state['tokens'] + (now - state['updated']) * state['rate']
+            )
+            state['updated'] = now
+            if state['tokens'] >= 1:
+                state['tokens'] -= 1
+                return 0
+            return (1 - state['tokens']) / state['rate']
+
+    def _try_enter(self, state):
+        """Take an in-flight slot if the host's current limit allows it (lock held)"""
+        if state['in_flight'] < max(1, int(state['limit'])):
+            state['in_flight'] += 1
+            return True
+        return False
+
+    def _notify_slot_freed(self):
+        """Wake threads and coroutines waiting for an in-flight slot (lock held)"""
+        self._slot_freed.notify_all()
+        for loop, waiter in self._async_waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(self._wake, waiter)
+        self._async_waiters.clear()
+
+    @staticmethod
+    def _wake(waiter):
+        if not waiter.done():  # a cancelled waiter has already left
+            waiter.set_result(None)
+
+    def acquire(self, url):
+        """Block until the host has a free slot and a token, return seconds waited"""
+        state = self._host_state(urlparse(url).netloc.lower())
+        start = time.monotonic()
+        with self._slot_freed:
+            while not self._try_enter(state):
+                self._slot_freed.wait()
+
+        wait = self._take_token(state)
+        while wait:
+            time.sleep(wait)
+            wait = self._take_token(state)
+        return time.monotonic() - start
+
+    def release(self, url):
+        """Free the in-flight slot taken by acquire"""
+        state = self._host_state(urlparse(url).netloc.lower())
+        with self._slot_freed:
+            state['in_flight'] -= 1
+            self._notify_slot_freed()
+
+    @contextmanager
+    def slot(self, url):
+        waited = self.acquire(url)
+        try:
+            yield waited
+        finally:
+            self.release(url)
+
+    @asynccontextmanager
+    async def slot_async(self, url):
+        """Async variant of slot that waits without blocking the event loop
+
+        A full host parks the coroutine on a future that release resolves,
+        and the token wait sleeps exactly until the next token is due.
+        """
+        state = self._host_state(urlparse(url).netloc.lower())
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._try_enter(state):
+                    break
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+        try:
+            wait = self._take_token(state)
+            while wait:
+                await asyncio.sleep(wait)
+                wait = self._take_token(state)
+            yield time.monotonic() - start
+        finally:
+            self.release(url)
+
+    def on_success(self, url, latency):
+        """Additive increase after a healthy response, unless latency shows the host queueing"""
+        state = self._host_state(urlparse(url).netloc.lower())
+        with self._lock:
+            state['latency'] = latency if state['latency'] is None else 0.8 * state['latency'] + 0.2 * latency
+            state['best_latency'] = latency if state['best_latency'] is None else min(state['best_latency'], latency)
+            if state['latency'] > self.latency_tolerance * max(state['best_latency'], 0.05):
+                return
+            state['limit'] = min(self.max_in_flight, state['limit'] + 1 / state['limit'])
+            state['rate'] = min(self.requests_per_second, state['rate'] + self.requests_per_second / 20)
+            self._notify_slot_freed()
+
+    def on_throttle(self, url, retry_after=None):
+        """Multiplicative decrease on server pressure; honour Retry-After as a hold on the host"""
+        state = self._host_state(urlparse(url).netloc.lower())
+        with self._lock:
+            now = time.monotonic()
+            state['throttled'] += 1
+            if retry_after:
+                state['hold_until'] = max(state['hold_until'], now + min(retry_after, self.max_retry_after))
+            # Responses to requests already in flight report the same congestion; react once per round trip
+            if now - state['last_decrease'] < max(state['latency'] or 0, 1.0):
+                return
+            state['last_decrease'] = now
+            state['limit'] = max(1.0, state['limit'] / 2)
+            state['rate'] = max(self.min_requests_per_second, state['rate'] / 2)
+            state['tokens'] = min(state['tokens'], 0.0)
+
+    def host_stats(self):
+        """Current adaptive limits per host, for display"""
+        with self._lock:
+            return {
+                host: {
+                    'requests_per_second': state['rate'],
+                    'max_in_flight': max(1, int(state['limit'])),
+                    'in_flight': state['in_flight'],
+                    'latency_seconds': state['latency'],
+                    'throttled': state['throttled']
+                }
+                for host, state in self._hosts.items()
+            }
+
+    def configure(self, requests_per_second=None, max_in_flight=None):
+        """Update the ceilings the adaptive limits may grow to"""
+        with self._lock:
+            if requests_per_second is not None:
+                self.requests_per_second = requests_per_second
+            if max_in_flight is not None:
+                self.max_in_flight = max_in_flight
+            for state in self._hosts.values():
+                state['rate'] = min(state['rate'], self.requests_per_second)
+                state['limit'] = min(state['limit'], self.max_in_flight)
+
+class RetryPolicy:
+    """The one retry policy for both transports: attempts, deadline and a shared retry budget
+
+    Every request gets up to max_attempts tries within deadline_seconds.
+    Its first retry is always allowed; further retries draw on a budget
+    shared by all requests: each new request deposits budget_ratio of a
+    retry and each budgeted retry spends one, so in steady state retries
+    beyond the first stay near budget_ratio of traffic (with a small reserve
+    for quiet periods). When the budget is gone, a flaky host's URLs fail
+    after their free retry instead of stalling a batch, and requests to
+    other URLs still get theirs.
+    """
+
+    def __init__(self, max_attempts=5, deadline_seconds=120, backoff_base=2.0, backoff_max=30.0,
+                 budget_ratio=0.2, budget_reserve=10, log_size=500):
+        self.max_attempts = max_attempts
+        self.deadline_seconds = deadline_seconds
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.budget_ratio = budget_ratio
+        self.budget_reserve = budget_reserve
+        self.budget = float(budget_reserve)
+        self.stats = {'requests': 0, 'retries': 0, 'retry_seconds': 0.0, 'budget_exhausted': 0, 'deadline_exceeded': 0}
+        self.retry_log = deque(maxlen=log_size)  # URLs that needed retries, newest last
+        self._lock = threading.Lock()
+
+    def begin(self, url, max_attempts=None, backoff_base=None):
+        """Start tracking one request; the per-call overrides keep make_request's old arguments working"""
+        with self._lock:
+            self.stats['requests'] += 1
+            self.budget = min(self.budget + self.budget_ratio, self.budget_reserve + 100 * self.budget_ratio)
+        return RetryState(self, url, max_attempts or self.max_attempts, backoff_base or self.backoff_base)
+
+    def _spend(self, free=False):
+        """Take one retry from the budget; a free retry is granted without touching it"""
+        with self._lock:
+            if not free:
+                if self.budget < 1:
+                    self.stats['budget_exhausted'] += 1
+                    return False
+                self.budget -= 1
+            self.stats['retries'] += 1
+            return True
+
+    def _finish(self, state, outcome):
+        if state.first_failure is None:
+            return 0.0
+        retry_seconds = time.monotonic() - state.first_failure
+        with self._lock:
+            self.stats['retry_seconds'] += retry_seconds
+            if state.gave_up == 'deadline':
+                self.stats['deadline_exceeded'] += 1
+            self.retry_log.append({
+                'url': state.url,
+                'attempts': state.attempts,
+                'retry_seconds': retry_seconds,
+                'outcome': outcome,
+                'gave_up': state.gave_up
+            })
+        return retry_seconds
+
+    def configure(self, max_attempts=None, deadline_seconds=None, budget_ratio=None):
+        with self._lock:
+            if max_attempts is not None:
+                self.max_attempts = max_attempts
+            if deadline_seconds is not None:
+                self.deadline_seconds = deadline_seconds
+            if budget_ratio is not None:
+                self.budget_ratio = budget_ratio
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, budget=self.budget)
+
+class RetryState:
+    """Attempts, deadline and time spent retrying for one request"""
+
+    def __init__(self, policy, url, max_attempts, backoff_base):
+        self.policy = policy
+        self.url = url
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.deadline = time.monotonic() + policy.deadline_seconds
+        self.attempts = 0
+        self.first_failure = None
+        self.gave_up = None
+
+    def timeout(self, default):
+        """Per-attempt timeout, shortened so an attempt cannot outlive the deadline"""
+        return max(1.0, min(default, self.deadline - time.monotonic()))
+
+    def backoff(self, paced=False):
+        """Record a failed attempt; return seconds to wait before the next one, or None to give up
+
+        Paced retries (the host rate limiter already slowed down) wait 0 here.
+        """
+        now = time.monotonic()
+        self.attempts += 1
+        if self.first_failure is None:
+            self.first_failure = now
+        
+        delay = 0.0
+        if not paced:
+            # Exponential backoff with jitter so parallel workers do not retry in lockstep
+            delay = min(self.policy.backoff_max, self.backoff_base * 2 ** (self.attempts - 1)) * random.uniform(0.5, 1.0)
+        
+        if self.attempts >= self.max_attempts:
+            self.gave_up = 'attempts'
+        elif now + delay >= self.deadline:
+            self.gave_up = 'deadline'
+        elif not self.policy._spend(free=self.attempts == 1):
+            self.gave_up = 'budget'
+        return None if self.gave_up else delay
+
+    def finish(self, outcome):
+        """Log the outcome; returns the seconds spent since the first failure (0 without retries)"""
+        return self.policy._finish(self, outcome)
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), or None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def make_thread_pool(max_workers, context_factory=None):
+    """Thread pool whose workers inherit the caller's context (e.g. a UI session)
+
+    context_factory is called on the submitting thread and returns an
+    initializer that each worker thread runs once.
+    """
+    return ThreadPoolExecutor(
+        max_workers=max_workers,
+        initializer=context_factory() if context_factory else None
+    )
+
+_shared_resources = {}
+_shared_resources_lock = threading.Lock()
+
+def shared_resource(name, factory):
+    """Build an expensive read-only resource once per process and hand out the same object"""
+    with _shared_resources_lock:
+        if name not in _shared_resources:
+            _shared_resources[name] = factory()
+        return _shared_resources[name]
+
+def generate_user_agents():
+    """Generate a large pool of realistic user agents"""
+    agents = []
+    try:
+        # Generate multiple user agents using fake_useragent
+        from fake_useragent import UserAgent
+        ua = UserAgent()
+        for _ in range(100):
+            agents.append(ua.random)
+    except:
+        # Fallback user agents if fake_useragent fails
+        agents = [
+            # Chrome - Various versions and platforms
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/118.0.0.0 Safari/537.36',
+            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            'Mozilla/5.0 (X11; Ubuntu; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+            
+            # Firefox
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:121.0) Gecko/20100101 Firefox/121.0',
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0',
+            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:121.0) Gecko/20100101 Firefox/121.0',
+            'Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0',
+            
+            # Safari
+            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
+            'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_14_6) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
+            
+            # Edge
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/120.0.0.0 Safari/537.36',
+            'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/119.0.0.0 Safari/537.36',
+            
+            # Mobile
+            'Mozilla/5.0 (iPhone; CPU iPhone OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1',
+            'Mozilla/5.0 (iPad; CPU OS 17_1 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Mobile/15E148 Safari/604.1',
+            'Mozilla/5.0 (Linux; Android 14; SM-S918B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.6099.210 Mobile Safari/537.36',
+            'Mozilla/5.0 (Linux; Android 13; SM-G991B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.6099.210 Mobile Safari/537.36',
+        ]
+    return list(set(agents))  # Remove duplicates
+
+def build_pdf_styles():
+    """Enhanced PDF styles keyed by scraper attribute name; imports ReportLab on first use"""
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+    
+    styles = {'styles': getSampleStyleSheet()}
+    
+    styles['article_title_style'] = ParagraphStyle(
+        name='ArticleTitle',
+        parent=styles['styles']['Heading1'],
+        fontSize=18,
+        spaceAfter=15,
+        textColor=colors.HexColor('#2E86AB'),
+        alignment=1  # Center
+    )
+    
+    styles['section_title_style'] = ParagraphStyle(
+        name='SectionTitle',
+        parent=styles['styles']['Heading2'],
+        fontSize=16,
+        spaceAfter=20,
+        textColor=colors.HexColor('#A23B72'),
+        spaceBefore=12
+    )
+    
+    styles['subsection_style'] = ParagraphStyle(
+        name='Subsection',
+        parent=styles['styles']['Heading3'],
+        fontSize=14,
+        spaceAfter=14,
+        textColor=colors.HexColor('#F18F01'),
+        spaceBefore=8
+    )
+    
+    styles['normal_style'] = ParagraphStyle(
+        name='NormalText',
+        parent=styles['styles']['Normal'],
+        fontSize=11,
+        spaceAfter=12,
+        leading=15,
+        textColor=colors.HexColor('#2B2D42')
+    )
+    
+    styles['metadata_style'] = ParagraphStyle(
+        name='Metadata',
+        parent=styles['styles']['Normal'],
+        fontSize=9,
+        textColor=colors.HexColor('#6C757D'),
+        spaceAfter=3
+    )
+    
+    styles['analytics_style'] = ParagraphStyle(
+        name='Analytics',
+        parent=styles['styles']['Normal'],
+        fontSize=10,
+        textColor=colors.HexColor('#28A745'),
+        spaceAfter=4,
+        backColor=colors.HexColor('#F8F9FA')
+    )
+    
+    styles['toc_entry_style'] = ParagraphStyle(
+        name='TocEntry',
+        parent=styles['normal_style'],
+        spaceAfter=11
+    )
+    
+    styles['list_item_style'] = ParagraphStyle(
+        name='ListItem',
+        parent=styles['normal_style'],
+        leftIndent=20,
+        bulletIndent=4,
+        spaceAfter=9
+    )
+    
+    # The last item also carries the gap below the list
+    styles['list_end_style'] = ParagraphStyle(
+        name='ListEnd',
+        parent=styles['list_item_style'],
+        spaceAfter=17
+    )
+    
+    styles['table_cell_style'] = ParagraphStyle(
+        name='TableCell',
+        parent=styles['styles']['Normal'],
+        fontSize=8.5,
+        leading=10.5,
+        textColor=colors.HexColor('#2B2D42')
+    )
+    
+    styles['table_header_style'] = ParagraphStyle(
+        name='TableHeader',
+        parent=styles['table_cell_style'],
+        fontName='Helvetica-Bold',
+        textColor=colors.white
+    )
+    
+    styles['table_style'] = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E86AB')),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F8F9FA')]),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#ADB5BD')),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('TOPPADDING', (0, 0), (-1, -1), 3),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 3)
+    ])
+    
+    return styles
+
+def split_paragraph(text, max_chars=2000):
+    """Split very long paragraphs at sentence ends, keeping their punctuation"""
+    if len(text) <= max_chars:
+        return [text]
+    
+    paragraphs = []
+    current, length = [], 0
+    for sentence in SENTENCE_BREAK_PATTERN.split(text):
+        if current and length + len(sentence) > max_chars:
+            paragraphs.append(" ".join(current))
+            current, length = [], 0
+        current.append(sentence)
+        length += len(sentence) + 1
+    paragraphs.append(" ".join(current))
+    return paragraphs
+
+@functools.lru_cache(maxsize=512)
+def table_column_widths(column_chars, available_width):
+    """Column widths for per-column natural text lengths, HTML auto-layout style
+
+    Cached: scraped tables repeat a handful of shapes (dosing, differentials),
+    so most tables reuse an earlier computation.
+    """
+    natural = [max(chars, 1) * TABLE_CHAR_WIDTH + TABLE_CELL_PADDING for chars in column_chars]
+    if sum(natural) <= available_width:
+        scale = available_width / sum(natural)
+        return tuple(width * scale for width in natural)
+    
+    # Columns narrower than an even share keep their natural width; the rest split what is left
+    flexible = set(range(len(natural)))
+    remaining = available_width
+    while flexible:
+        share = remaining / len(flexible)
+        narrow = {index for index in flexible if natural[index] <= share}
+        if not narrow:
+            break
+        flexible -= narrow
+        remaining -= sum(natural[index] for index in narrow)
+    
+    flexible_total = sum(natural[index] for index in flexible)
+    return tuple(
+        remaining * width / flexible_total if index in flexible else width
+        for index, width in enumerate(natural)
+    )
+
+def build_pdf_table(rows, styles, available_width):
+    """Table flowable for scraped rows; the first row is the header, repeated on every page"""
+    from reportlab.platypus import Paragraph, Table
+    
+    columns = max(len(row) for row in rows)
+    column_chars = [0] * columns
+    for row in rows:
+        for index, cell in enumerate(row):
+            column_chars[index] = max(column_chars[index], len(cell))
+    # Bucketed so similar tables share one cache entry
+    widths = table_column_widths(
+        tuple(min(chars, TABLE_MAX_COLUMN_CHARS) // 4 * 4 for chars in column_chars),
+        available_width
+    )
+    
+    data = []
+    for position, row in enumerate(rows):
+        style = styles.table_header_style if position == 0 else styles.table_cell_style
+        data.append([Paragraph(escape(cell), style) for cell in row] + [""] * (columns - len(row)))
+    
+    # splitInRow lets a cell taller than a page continue on the next one
+    return Table(data, colWidths=widths, style=styles.table_style, repeatRows=1, splitInRow=1, spaceAfter=12)
+
+def build_article_story(article_data, styles):
+    """Flowables for one article: title page, contents and section text
+
+    Scraped text is plain, so it is escaped once here before Paragraph parses
+    it as markup. Spacing comes from the paragraph styles rather than Spacer
+    flowables, and each list item is one Paragraph with a hanging bullet.
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import Paragraph, Spacer, PageBreak
+    
+    frame_width = letter[0] - 2 * PDF_SIDE_MARGIN
+    story = []
+    
+    # Enhanced title page
+    title = Paragraph(escape(article_data['title']), styles.article_title_style)
+    title.outline = (article_data['title'], 0)
+    story.append(title)
+    story.append(Spacer(1, 20))
+    
+    # Analytics section
+    story.append(Paragraph("Scraping Analytics", styles.section_title_style))
+    
+    metrics = article_data.get('performance_metrics', {})
+    scraping_metrics = article_data.get('scraping_metrics', {})
+    generated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    analytics_data = [
+        f"• Success Rate: {metrics.get('success_rate', 0):.1f}%",
+        f"• Total Requests: {metrics.get('total_requests', 0)}",
+        f"• Sections Scraped: {article_data['successful_sections']}/{article_data['total_sections']}",
+        f"• Content Blocks: {article_data['total_content_blocks']}",
+        f"• Scraping Duration: {scraping_metrics.get('total_duration', 0):.1f}s",
+        f"• Generated: {generated}"
+    ]
+    
+    for item in analytics_data:
+        story.append(Paragraph(item, styles.analytics_style))
+    
+    story.append(Spacer(1, 20))
+    
+    # Metadata
+    story.append(Paragraph("Document Information", styles.section_title_style))
+    
+    metadata = [
+        f"• Source: {article_data['url']}",
+        f"• Authors: {', '.join(article_data['authors'])}",
+        f"• Last Updated: {article_data['last_updated']}",
+        f"• PDF Generated: {generated}"
+    ]
+    
+    for item in metadata:
+        story.append(Paragraph(escape(item), styles.metadata_style))
+    
+    story.append(PageBreak())
+    
+    # Enhanced table of contents
+    story.append(Paragraph("Detailed Table of Contents", styles.section_title_style))
+    
+    for section_name, section_content in article_data['sections'].items():
+        story.append(Paragraph(f"• {escape(section_name)} ({len(section_content)} content blocks)", styles.toc_entry_style))
+    
+    story.append(PageBreak())
+    
+    # Enhanced content with better formatting
+    for section_name, section_content in article_data['sections'].items():
+        if not section_content:
+            continue
+        
+        section_title = Paragraph(escape(section_name), styles.section_title_style)
+        section_title.outline = (section_name, 1)
+        story.append(section_title)
+        
+        for content_block in section_content:
+            if content_block['heading'] and content_block['heading'] != section_name:
+                story.append(Paragraph(escape(content_block['heading']), styles.subsection_style))
+            
+            for item in content_block['content']:
+                if item['type'] == 'paragraph':
+                    for para in split_paragraph(escape(item['text'])):
+                        story.append(Paragraph(para, styles.normal_style))
+                
+                elif item['type'] == 'list':
+                    last = len(item['items'])
+                    for number, list_item in enumerate(item['items'], 1):
+                        bullet = "•" if item['style'] == 'unordered' else f"{number}."
+                        style = styles.list_end_style if number == last else styles.list_item_style
+                        story.append(Paragraph(escape(list_item), style, bulletText=bullet))
+                
+                elif item['type'] == 'table':
+                    story.append(build_pdf_table(item['data'], styles, frame_width))
+        
+        # Add page break after major sections
+        if section_name in PAGE_BREAK_SECTIONS:
+            story.append(PageBreak())
+        else:
+            story.append(Spacer(1, 15))
+    
+    return story
+
+def build_article_pdf(article_data, filepath):
+    """Lay out an article and write its PDF; returns the number of flowables
+
+    Runs in the calling process or in a PdfRenderService worker, so it only
+    touches the article data and the per-process PDF styles.
+    """
+    # ReportLab is only loaded once a PDF is actually rendered
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate
+    styles = SimpleNamespace(**shared_resource('pdf_styles', build_pdf_styles))
+    
+    doc = SimpleDocTemplate(
+        filepath,
+        pagesize=letter,
+        rightMargin=PDF_SIDE_MARGIN,
+        leftMargin=PDF_SIDE_MARGIN,
+        topMargin=72,
+        bottomMargin=72,
+        title=article_data['title'],
+        author=", ".join(article_data['authors'])
+    )
+    
+    PdfOutline(doc)
+    
+    story = build_article_story(article_data, styles)
+    flowables = len(story)  # doc.build consumes the story
+    doc.build(story)
+    return flowables
+
+class PdfOutline:
+    """Document hook that bookmarks flowables tagged with an ``outline`` of (title, level)"""
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.bookmarks = 0
+        doc.afterFlowable = self.after_flowable
+
+    def after_flowable(self, flowable):
+        outline = getattr(flowable, 'outline', None)
+        if outline is None:
+            return
+        
+        title, level = outline
+        key = f"outline{self.bookmarks}"
+        self.bookmarks += 1
+        canvas = self.doc.canv
+        canvas.bookmarkPage(key)
+        canvas.addOutlineEntry(title, key, level=level, closed=False)
+        if self.bookmarks == 1:
+            canvas.showOutline()
+
+def _pdf_render_worker(connection):
+    """Render worker process: build PDFs for (article_data, filepath) jobs until told to stop"""
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The parent decides when workers stop
+    
+    while True:
+        try:
+            job = connection.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        article_data, filepath = job
+        started = time.perf_counter()
+        try:
+            flowables = build_article_pdf(article_data, filepath)
+            connection.send(('ok', {'path': filepath, 'flowables': flowables, 'seconds': time.perf_counter() - started}))
+        except Exception as e:
+            connection.send(('error', f"{type(e).__name__}: {e}"))
+
+class PdfRenderService:
+    """Process pool that renders article PDFs off the calling thread
+
+    Each worker process is owned by a supervisor thread that hands it one
+    job at a time, so a job that runs past its timeout or is cancelled is
+    stopped by terminating its worker, which is replaced on the next job.
+    At most max_pending jobs are queued or running; submit blocks (or
+    raises queue.Full) beyond that so producers cannot outrun the pool.
+    """
+
+    def __init__(self, workers=None, max_pending=None, timeout=120):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.max_pending = max_pending or self.workers * 2
+        self.timeout = timeout
+        self.stats = {'rendered': 0, 'failed': 0, 'timed_out': 0, 'cancelled': 0, 'worker_starts': 0}
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._jobs = queue.Queue()
+        # Forking a process full of threads (Streamlit, HTTP pools) is unsafe
+        self._context = multiprocessing.get_context('spawn')
+        self._supervisors = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("PDF render service is shut down")
+            if not self._supervisors:
+                for index in range(self.workers):
+                    supervisor = threading.Thread(target=self._supervise, name=f"pdf-render-{index}", daemon=True)
+                    supervisor.start()
+                    self._supervisors.append(supervisor)
+
+    def submit(self, article_data, filepath, timeout=None, cancel_event=None, block=True):
+        """Queue a render and return a Future for {'path', 'flowables', 'seconds'}
+        
+        Cancel a queued job with future.cancel(); set cancel_event to stop one
+        that is already rendering.
+        """
+        self._ensure_started()
+        if not self._slots.acquire(blocking=block):
+            raise queue.Full("PDF render queue is full")
+        future = Future()
+        future.add_done_callback(lambda _: self._slots.release())
+        self._jobs.put((future, article_data, filepath, timeout or self.timeout, cancel_event or threading.Event()))
+        return future
+
+    def _start_worker(self):
+        connection, child_connection = self._context.Pipe()
+        process = self._context.Process(target=_pdf_render_worker, args=(child_connection,), daemon=True)
+        process.start()
+        child_connection.close()
+        self._count('worker_starts')
+        return process, connection
+
+    def _stop_worker(self, process, connection, graceful=True):
+        if graceful:
+            try:
+                connection.send(None)
+                process.join(5)
+            except OSError:
+                pass
+        if process.is_alive():
+            process.terminate()
+            process.join()
+        connection.close()
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _wait(self, connection, timeout, cancel_event):
+        """The worker's reply, or ('timeout'|'cancelled', None) once the job has to be abandoned"""
+        deadline = time.monotonic() + timeout
+        while True:
+            if cancel_event.is_set():
+                return 'cancelled', None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return 'timeout', None
+            if connection.poll(min(0.1, remaining)):
+                return connection.recv()
+
+    def _supervise(self):
+        process = connection = None
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            future, article_data, filepath, timeout, cancel_event = job
+            if not future.set_running_or_notify_cancel():
+                self._count('cancelled')
+                continue
+            
+            if process is None or not process.is_alive():
+                process, connection = self._start_worker()
+            try:
+                connection.send((article_data, filepath))
+                status, payload = self._wait(connection, timeout, cancel_event)
+            except (OSError, EOFError) as e:
+                status, payload = 'crashed', f"Render worker exited: {e}"
+            
+            if status == 'ok':
+                self._count('rendered')
+                future.set_result(payload)
+                continue
+            if status == 'error':
+                self._count('failed')
+                future.set_exception(RuntimeError(payload))
+                continue
+            
+            # Timed out, cancelled or crashed: the worker is replaced and the partial file dropped
+            self._stop_worker(process, connection, graceful=False)
+            process = connection = None
+            if os.path.exists(filepath):
+                os.remove(filepath)
+            if status == 'timeout':
+                self._count('timed_out')
+                future.set_exception(TimeoutError(f"PDF render exceeded {timeout}s"))
+            elif status == 'cancelled':
+                self._count('cancelled')
+                future.set_exception(CancelledError())
+            else:
+                self._count('failed')
+                future.set_exception(RuntimeError(payload))
+        
+        if process is not None:
+            self._stop_worker(process, connection)
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, workers=self.workers, queued=self._jobs.qsize())
+
+    def shutdown(self):
+        """Stop accepting jobs, let queued ones finish and stop the workers"""
+        with self._lock:
+            self._closed = True
+            supervisors = list(self._supervisors)
+        for _ in supervisors:
+            self._jobs.put(None)
+        for supervisor in supervisors:
+            supervisor.join()
+
+class AdvancedMedscapeScraper:
+    def __init__(self, use_cache=True, cache_dir="http_cache", cache_ttl_hours=24, cache_max_mb=500,
+                 transport="requests", parser="auto", reporter=None, context_factory=None, tracer=None,
+                 article_store_dir="article_store", structured_store_dir="structured_store",
+                 search_index_path="search_index.sqlite3"):
+        if transport not in ('requests', 'async'):
+            raise ValueError(f"Unknown transport: {transport}")
+        if transport == 'async' and not HTTPX_AVAILABLE:
+            raise ImportError("The async transport requires httpx (pip install httpx)")
+        self.transport = transport
+        self.reporter = reporter or EventReporter()
+        self.context_factory = context_factory
+        self.tracer = tracer or Tracer()
+        self.parser_backend = resolve_parser_backend(parser)
+        self.async_client = None
+        self._async_client_loop = None
+        self.session = requests.Session()
+        self.user_agents = shared_resource('user_agents', generate_user_agents)
+        self.setup_session()
+        self.base_url = "https://emedicine.medscape.com"
+        self.content_hash_tracker = set()
+        self.request_count = 0
+        self.successful_requests = 0
+        self.failed_requests = 0
+        self.user_agent_rotation_frequency = 3
+        self.setup_retry_strategy()
+        self.request_history = RequestHistory()
+        self.start_time = datetime.now()
+        self.cache = ResponseCache(cache_dir, cache_ttl_hours * 3600, cache_max_mb) if use_cache else None
+        self.rate_limiter = HostRateLimiter()
+        self.retry_policy = RetryPolicy()
+        self.pdf_renderer = None  # PdfRenderService; None renders in the calling thread
+        # Stores are opened on first use, so a scraper that never stores anything touches no files
+        self.article_store_dir = article_store_dir
+        self.structured_store_dir = structured_store_dir
+        self.search_index_path = search_index_path
+        self._stores = {}
+        self._stores_lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+
+    def _open_store(self, name, factory, location):
+        with self._stores_lock:
+            if name not in self._stores:
+                self._stores[name] = factory(location)
+            return self._stores[name]
+
+    @property
+    def article_store(self):
+        """ArticleStore backing refresh_article"""
+        return self._open_store('article_store', ArticleStore, self.article_store_dir)
+
+    @property
+    def structured_store(self):
+        """StructuredArticleStore every scraped article is written to"""
+        return self._open_store('structured_store', StructuredArticleStore, self.structured_store_dir)
+
+    @property
+    def search_index(self):
+        """ArticleSearchIndex kept in step with the structured store"""
+        return self._open_store('search_index', ArticleSearchIndex, self.search_index_path)
+
+    def emit(self, kind, message="", **data):
+        """Report progress to the attached front end"""
+        self.reporter.emit(kind, message, **data)
+
+    def setup_retry_strategy(self):
+        """Mount the connection pool without transport-level retries
+        
+        Retries are decided only by make_request's RetryPolicy, so attempts
+        and backoff are not multiplied by a second layer inside urllib3.
+        """
+        retry_strategy = Retry(total=0, read=False, redirect=False)
+        adapter = HTTPAdapter(max_retries=retry_strategy, pool_connections=10, pool_maxsize=10)
+        adapter.poolmanager.pool_classes_by_scheme = traced_pool_classes(self.tracer)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def setup_session(self):
+        """Setup session with advanced headers to mimic real browser"""
+        self.session.headers.update({
+            'User-Agent': random.choice(self.user_agents),
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,image/avif,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.9',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'DNT': '1',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+            'Sec-Fetch-Dest': 'document',
+            'Sec-Fetch-Mode': 'navigate',
+            'Sec-Fetch-Site': 'none',
+            'Sec-Fetch-User': '?1',
+            'Cache-Control': 'max-age=0',
+            'sec-ch-ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
+            'sec-ch-ua-mobile': '?0',
+            'sec-ch-ua-platform': '"Windows"',
+        })
+
+    def rotate_user_agent(self):
+        """Rotate user agent with intelligent selection"""
+        with self.stats_lock:
+            self.request_count += 1
+            request_number = self.request_count
+        
+        if request_number % self.user_agent_rotation_frequency == 0:
+            new_agent = random.choice(self.user_agents)
+            self.session.headers.update({'User-Agent': new_agent})
+            
+            self.emit('debug', f"🔄 Rotated to: {new_agent[:80]}...")
+
+    def _cache_lookup(self, url, use_cache, revalidate=False):
+        """Return (fresh cached response, stored entry, conditional headers) for a URL
+        
+        With revalidate even a fresh entry is not served; its validators turn
+        the request into a conditional GET instead.
+        """
+        if self.cache is None or not use_cache:
+            return None, None, {}
+        
+        cached_entry = self.cache.get(url, revalidate)
+        if cached_entry and not revalidate and self.cache.is_fresh(cached_entry):
+            self.emit('debug', f"💾 Cache hit: {url}")
+            return self.cache.to_response(cached_entry), cached_entry, {}
+        
+        conditional_headers = self.cache.validators(cached_entry) if cached_entry else {}
+        return None, cached_entry, conditional_headers
+
+    def _check_response(self, url, response, attempt, max_retries, cached_entry, request_record):
+        """Apply status, blocking and content checks shared by both transports
+        
+        Returns (response_to_return, paced). A None response means retry. Server
+        pressure is reported to the host rate limiter, which slows the host
+        down; paced retries then just wait for their next slot instead of also
+        sleeping through the backoff delay.
+        """
+        latency = response.elapsed.total_seconds()
+        if response.status_code == 304 and cached_entry:
+            # Unchanged since last fetch - serve the stored body
+            self.cache.mark_revalidated(url, response)
+            self.rate_limiter.on_success(url, latency)
+            request_record['success'] = True
+            self.request_history.append(request_record)
+            with self.stats_lock:
+                self.successful_requests += 1
+            return self.cache.to_response(cached_entry), False
+        elif response.status_code in (403, 429, 503):
+            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+            self.rate_limiter.on_throttle(url, retry_after)
+            holding = f" for {retry_after:.0f}s" if retry_after else ""
+            if response.status_code == 403:
+                self.emit('warning', f"🔒 Access denied (403), slowing down{holding}... (attempt {attempt + 1}/{max_retries})")
+            elif response.status_code == 429:
+                self.emit('warning', f"⏳ Rate limited, slowing down{holding}... (attempt {attempt + 1}/{max_retries})")
+            else:
+                self.emit('warning', f"🔧 Service unavailable, slowing down{holding}... (attempt {attempt + 1}/{max_retries})")
+            return None, True
+        elif response.status_code != 200:
+            self.emit('warning', f"⚠️ Status {response.status_code}, retrying... (attempt {attempt + 1}/{max_retries})")
+            return None, False
+        
+        # Check for blocking patterns
+        if self.is_blocked(response.text):
+            self.rate_limiter.on_throttle(url)
+            self.emit('warning', f"🚫 Blocking detected, rotating... (attempt {attempt + 1}/{max_retries})")
+            return None, True
+        
+        # Check if we got actual content
+        if self.is_valid_content(response.text):
+            self.rate_limiter.on_success(url, latency)
+            request_record['success'] = True
+            self.request_history.append(request_record)
+            with self.stats_lock:
+                self.successful_requests += 1
+            if self.cache is not None:
+                self.cache.put(url, response)
+            return response, False
+        
+        self.emit('warning', f"📄 Invalid content received, retrying... (attempt {attempt + 1}/{max_retries})")
+        return None, False
+
+    def _finish_retry(self, retry, outcome):
+        """Close the request's retry accounting and trace the time it spent retrying"""
+        retry_seconds = retry.finish(outcome)
+        if retry_seconds:
+            self.tracer.record('retry.total', retry_seconds, **{'url.full': retry.url, 'attempts': retry.attempts,
+                                                                 'outcome': outcome})
+
+    def _record_failure(self, url, retry, request_record):
+        with self.stats_lock:
+            self.failed_requests += 1
+        if request_record is not None:
+            self.request_history.append(request_record)
+        reason = {'deadline': "deadline reached", 'budget': "retry budget exhausted"}.get(retry.gave_up, "attempts used up")
+        self.emit('error', f"💥 Failed to fetch {url} after {retry.attempts} attempts ({reason})")
+
+    def make_request(self, url, max_retries=None, delay=None, use_cache=True, revalidate=False):
+        """Make request under the shared retry policy (attempts, deadline, retry budget)
+        
+        max_retries and delay override the policy's attempts and backoff base.
+        revalidate always asks the server, conditionally when the page is cached.
+        """
+        cached_response, cached_entry, conditional_headers = self._cache_lookup(url, use_cache, revalidate)
+        if cached_response is not None:
+            return cached_response
+        
+        retry = self.retry_policy.begin(url, max_retries, delay)
+        max_retries = retry.max_attempts
+        request_record = None
+        for attempt in range(max_retries):
+            paced = False
+            try:
+                self.rotate_user_agent()
+                
+                # The per-host scheduler spaces requests instead of a fixed sleep
+                with self.tracer.span('http.request', **{'url.full': url, 'attempt': attempt + 1}) as request_span, \
+                        self.rate_limiter.slot(url) as waited:
+                    self.emit('debug', f"⏳ Waited: {waited:.2f}s for host slot (Attempt {attempt + 1}/{max_retries})")
+                    if waited:
+                        self.tracer.record('wait.rate_limit', waited)
+                    
+                    response = self.session.get(
+                        url, 
+                        timeout=retry.timeout(20),
+                        verify=False,  # Bypass SSL verification for better compatibility
+                        allow_redirects=True,
+                        headers=conditional_headers,
+                        stream=True  # Headers first, so time to first byte and download are timed apart
+                    )
+                    self.tracer.record('http.ttfb', response.elapsed.total_seconds())
+                    with self.tracer.span('http.download') as download_span:
+                        download_span['attributes']['http.response.body.size'] = len(response.content)
+                    request_span['attributes']['http.response.status_code'] = response.status_code
+                
+                # Record request attempt
+                request_record = {
+                    'timestamp': time.time(),
+                    'url': url,
+                    'attempt': attempt + 1,
+                    'status_code': response.status_code,
+                    'success': False
+                }
+                
+                result, paced = self._check_response(url, response, attempt, max_retries, cached_entry, request_record)
+                if result is not None:
+                    self._finish_retry(retry, 'ok')
+                    return result
+                    
+            except requests.exceptions.Timeout:
+                self.rate_limiter.on_throttle(url)
+                self.emit('warning', f"⏰ Timeout, retrying... (attempt {attempt + 1}/{max_retries})")
+            except requests.exceptions.SSLError:
+                self.emit('warning', f"🔐 SSL Error, retrying... (attempt {attempt + 1}/{max_retries})")
+            except requests.exceptions.RequestException as e:
+                self.emit('warning', f"❌ Request failed (attempt {attempt + 1}/{max_retries}): {str(e)[:100]}...")
+            
+            backoff_delay = retry.backoff(paced)
+            if backoff_delay is None:
+                break
+            if backoff_delay:
+                self._sleep(backoff_delay, "backoff")
+        
+        self._finish_retry(retry, 'failed')
+        self._record_failure(url, retry, request_record)
+        return None
+
+    def _sleep(self, seconds, reason):
+        """Sleep between attempts, recorded as a wait.backoff span"""
+        with self.tracer.span('wait.backoff', reason=reason):
+            time.sleep(seconds)
+
+    def _get_async_client(self):
+        """Create (or reuse) the httpx client bound to the running event loop"""
+        if self.transport != 'async':
+            raise RuntimeError("Async methods need AdvancedMedscapeScraper(transport='async')")
+        
+        loop = asyncio.get_running_loop()
+        if self.async_client is None or self._async_client_loop is not loop:
+            import httpx
+            
+            # Keep-alive pool sized like the requests adapter; HTTP/2 when h2 is installed
+            self.async_client = httpx.AsyncClient(
+                http2=importlib.util.find_spec('h2') is not None,
+                verify=False,  # Bypass SSL verification for better compatibility
+                follow_redirects=True,
+                timeout=20,
+                # No transport= here: a custom transport would replace the one built from http2 and limits.
+                # The default transport makes no connection retries, so RetryPolicy stays the only retry layer
+                limits=httpx.Limits(max_connections=10, max_keepalive_connections=10)
+            )
+            self._async_client_loop = loop
+        return self.async_client
+
+    async def aclose(self):
+        """Close the async client and its pooled connections"""
+        if self.async_client is not None:
+            await self.async_client.aclose()
+            self.async_client = None
+            self._async_client_loop = None
+
+    async def make_request_async(self, url, max_retries=None, delay=None, use_cache=True, revalidate=False):
+        """Async counterpart of make_request using the httpx transport"""
+        import httpx
+        
+        cached_response, cached_entry, conditional_headers = self._cache_lookup(url, use_cache, revalidate)
+        if cached_response is not None:
+            return cached_response
+        
+        client = self._get_async_client()
+        retry = self.retry_policy.begin(url, max_retries, delay)
+        max_retries = retry.max_attempts
+        request_record = None
+        for attempt in range(max_retries):
+            paced = False
+            try:
+                self.rotate_user_agent()
+                headers = dict(self.session.headers)
+                headers.update(conditional_headers)
+                
+                async with self.rate_limiter.slot_async(url) as waited:
+                    self.emit('debug', f"⏳ Waited: {waited:.2f}s for host slot (Attempt {attempt + 1}/{max_retries})")
+                    if waited:
+                        self.tracer.record('wait.rate_limit', waited)
+                    
+                    with self.tracer.span('http.request', **{'url.full': url, 'attempt': attempt + 1}) as request_span:
+                        response = await client.get(url, headers=headers, timeout=retry.timeout(20))
+                        request_span['attributes']['http.response.status_code'] = response.status_code
+                
+                # Record request attempt
+                request_record = {
+                    'timestamp': time.time(),
+                    'url': url,
+                    'attempt': attempt + 1,
+                    'status_code': response.status_code,
+                    'success': False
+                }
+                
+                result, paced = self._check_response(url, response, attempt, max_retries, cached_entry, request_record)
+                if result is not None:
+                    self._finish_retry(retry, 'ok')
+                    return result
+                    
+            except httpx.TimeoutException:
+                self.rate_limiter.on_throttle(url)
+                self.emit('warning', f"⏰ Timeout, retrying... (attempt {attempt + 1}/{max_retries})")
+            except httpx.HTTPError as e:
+                self.emit('warning', f"❌ Request failed (attempt {attempt + 1}/{max_retries}): {str(e)[:100]}...")
+            
+            backoff_delay = retry.backoff(paced)
+            if backoff_delay is None:
+                break
+            if backoff_delay:
+                with self.tracer.span('wait.backoff', reason="backoff"):
+                    await asyncio.sleep(backoff_delay)
+        
+        self._finish_retry(retry, 'failed')
+        self._record_failure(url, retry, request_record)
+        return None
+
+    def is_blocked(self, html_content):
+        """Enhanced blocking detection"""
+        blocked_indicators = [
+            "access denied", "cloudflare", "captcha", "bot protection",
+            "security check", "distil", "incapsula", "blocked",
+            "please verify you are human", "unusual traffic"
+        ]
+        
+        content_lower = html_content.lower()
+        return any(indicator in content_lower for indicator in blocked_indicators)
+
+    def is_valid_content(self, html_content):
+        """Check if content is valid medical article content"""
+        valid_indicators = [
+            "medscape", "article", "medical", "treatment", "diagnosis",
+            "symptoms", "overview", "background", "pathophysiology"
+        ]
+        
+        content_lower = html_content.lower()
+        valid_count = sum(1 for indicator in valid_indicators if indicator in content_lower)
+        return valid_count >= 2  # At least 2 medical indicators
+
+    def get_performance_metrics(self):
+        """Get performance metrics for dashboard"""
+        total_time = (datetime.now() - self.start_time).total_seconds()
+        success_rate = (self.successful_requests / max(self.request_count, 1)) * 100 if self.request_count > 0 else 0
+        
+        recent_success = (self.request_history.success_rate(20) or 0) * 100  # Last 20 requests
+        retry_stats = self.retry_policy.get_stats()
+        
+        return {
+            'total_requests': self.request_count,
+            'successful_requests': self.successful_requests,
+            'failed_requests': self.failed_requests,
+            'success_rate': success_rate,
+            'recent_success_rate': recent_success,
+            'total_time_seconds': total_time,
+            'requests_per_minute': (self.request_count / max(total_time/60, 1)),
+            'user_agents_count': len(self.user_agents),
+            'retries': retry_stats['retries'],
+            'retry_seconds': retry_stats['retry_seconds'],
+            'retry_budget_exhausted': retry_stats['budget_exhausted'],
+            'retry_deadline_exceeded': retry_stats['deadline_exceeded']
+        }
+
+    def setup_pdf_styles(self):
+        """Attach the enhanced PDF styles, built once per process on first use"""
+        for name, style in shared_resource('pdf_styles', build_pdf_styles).items():
+            setattr(self, name, style)
+
+    def parse_html(self, markup):
+        """Parse a page with the configured parser backend"""
+        with self.tracer.span('html.parse', parser=self.parser_backend):
+            return BeautifulSoup(markup, self.parser_backend)
+
+    def extract_article_links(self, html_content, soup=None):
+        """Extract all article URLs with their categories in one pass over the page
+        
+        Links inside topic sections win over links in article/item/card
+        containers, which win over links in any other div. Each link takes
+        its category from the nearest container holding a category heading.
+        """
+        if soup is None:
+            soup = self.parse_html(html_content)
+        
+        self.emit('info', "🔍 Extracting articles from categorized sections...")
+        
+        # One document-order walk: note category headings and collect article anchors
+        categories = {}  # id(element) -> category of the first heading inside it
+        anchors = []
+        for element in soup.find_all(LINK_SCAN_TAGS):
+            if element.name == 'a':
+                href = element.get('href')
+                if href and ARTICLE_ID_PATTERN.search(href):
+                    anchors.append(element)
+            elif _has_class(element, CATEGORY_CLASS_PATTERN):
+                category = element.get_text(strip=True)
+                # Every ancestor without a category gets this one; ancestors above a categorized one already have it
+                for ancestor in element.parents:
+                    if id(ancestor) in categories:
+                        break
+                    categories[id(ancestor)] = category
+        
+        # Resolve each anchor's container tier and category, sharing the walk between siblings
+        containers = {}  # id(parent) -> (tier, category)
+        candidates = []
+        for anchor in anchors:
+            title = anchor.get_text(strip=True)
+            if len(title) <= 10:  # Filter out navigation links
+                continue
+            parent = anchor.parent
+            if id(parent) not in containers:
+                containers[id(parent)] = self._link_container(parent, categories)
+            tier, category = containers[id(parent)]
+            if tier is not None:
+                candidates.append((tier, anchor['href'], title, category))
+        
+        article_links = []
+        seen_urls = set()
+        best_tier = min((candidate[0] for candidate in candidates), default=None)
+        for tier, href, title, category in candidates:
+            if tier != best_tier:
+                continue
+            full_url = urljoin(self.base_url, href)
+            if full_url not in seen_urls:
+                seen_urls.add(full_url)
+                article_links.append({
+                    'url': full_url,
+                    'title': title,
+                    'category': category
+                })
+        
+        self.emit('success', f"✅ Found {len(article_links)} unique articles")
+        return article_links
+
+    def _link_container(self, element, categories):
+        """(tier, category) of the best container div around element; tier None outside any div"""
+        tier, container, category = None, None, "Unknown"
+        for ancestor in chain([element], element.parents):
+            if ancestor.name != 'div':
+                continue
+            classes = ancestor.get('class') or []
+            if 'topic-section' in classes:
+                ancestor_tier = 1
+            elif _has_class(ancestor, ARTICLE_CONTAINER_PATTERN):
+                ancestor_tier = 2
+            else:
+                ancestor_tier = 3
+            if tier is None or ancestor_tier < tier:
+                tier, container = ancestor_tier, ancestor
+            if tier == 1:
+                break
+        if container is not None:
+            # Nearest categorized ancestor, looking no further out than the container itself
+            for ancestor in chain([element], element.parents):
+                if id(ancestor) in categories:
+                    category = categories[id(ancestor)]
+                    break
+                if ancestor is container:
+                    break
+        return tier, category
+
+    def get_all_article_sections(self, overview_url, soup=None):
+        """Get URLs for all sections of an article with enhanced discovery"""
+        if soup is None:
+            response = self.make_request(overview_url)
+            if not response:
+                return {'Overview': overview_url}
+            soup = self.parse_html(response.content)
+            
+        sections = {}
+        
+        # Standard medical section order (priority)
+        standard_order = [
+            'Overview', 'Background', 'Pathophysiology', 'Etiology', 
+            'Epidemiology', 'Prognosis', 'Presentation', 'History', 
+            'Physical Examination', 'DDx', 'Differential Diagnoses',
+            'Workup', 'Approach Considerations', 'Laboratory Studies', 
+            'Imaging Studies', 'Treatment', 'Medical Care', 'Surgical Care', 
+            'Prevention', 'Medication', 'Medication Summary',
+            'Guidelines', 'Guidelines Summary', 'References'
+        ]
+        
+        # Multiple navigation discovery strategies
+        nav_selectors = [
+            'div.sections-nav',
+            'div#dd_nav',
+            'div.sections-nav ul',
+            'ul.nav-tabs',
+            'div.tab-navigation',
+            'div.article-nav'
+        ]
+        
+        nav = None
+        for selector in nav_selectors:
+            nav = soup.select_one(selector)
+            if nav:
+                break
+        
+        if nav:
+            links = nav.find_all('a', href=True)
+            for link in links:
+                section_name = link.get_text(strip=True)
+                href = link['href']
+                
+                # Skip non-content links
+                skip_keywords = ['Show All', 'Media Gallery', 'References', 'Share', 'Print', 'Feedback', 'Q&A']
+                if any(keyword in section_name for keyword in skip_keywords):
+                    continue
+                
+                if href.startswith('javascript:') or href.startswith('#'):
+                    continue
+                
+                if href.startswith('/'):
+                    full_url = urljoin(self.base_url, href)
+                else:
+                    full_url = urljoin(overview_url, href)
+                
+                if section_name and section_name not in sections:
+                    sections[section_name] = full_url
+        
+        # Always include overview
+        sections['Overview'] = overview_url
+        
+        # Order sections by priority
+        ordered_sections = {}
+        for section_name in standard_order:
+            if section_name in sections:
+                ordered_sections[section_name] = sections[section_name]
+        
+        # Add remaining sections
+        for section_name, url in sections.items():
+            if section_name not in ordered_sections:
+                ordered_sections[section_name] = url
+        
+        return ordered_sections
+
+    def create_content_hash(self, text):
+        """Create hash of content to detect duplicates"""
+        return hashlib.md5(text.strip().encode()).hexdigest()
+
+    def find_content_area(self, soup):
+        """Return the first content area matching the selectors in priority order"""
+        for selector in CONTENT_AREA_SELECTORS:
+            content_area = soup.select_one(selector)
+            if content_area:
+                return content_area
+        return None
+
+    def parse_content_area(self, markup):
+        """Parse only the content-area subtrees of a section page"""
+        with self.tracer.span('html.parse', parser=self.parser_backend, content_area_only=True):
+            soup = BeautifulSoup(markup, self.parser_backend, parse_only=ContentAreaFilter())
+        return self.find_content_area(soup)
+
+    def iter_content_blocks(self, content_area):
+        """Yield heading, paragraph, list and table blocks in document order"""
+        seen_hashes = set()
+        
+        # Walk descendants lazily so consumers get blocks as they are found
+        for element in content_area.descendants:
+            if element.name not in CONTENT_BLOCK_TAGS:
+                continue
+            
+            # Skip navigation and irrelevant elements
+            if element.get('class'):
+                class_names = ' '.join(element.get('class', []))
+                skip_classes = ['action-items', 'back_next_btn', 'emed-logo', 'nav', 'menu', 'sidebar']
+                if any(skip_class in class_names for skip_class in skip_classes):
+                    continue
+            
+            if element.name in ['h1', 'h2', 'h3', 'h4', 'h5']:
+                yield {
+                    'type': 'heading',
+                    'text': element.get_text(strip=True),
+                    'level': element.name
+                }
+            
+            elif element.name == 'p':
+                text = element.get_text(strip=True)
+                if text and len(text) > 15:  # Reduced minimum length
+                    content_hash = self.create_content_hash(text)
+                    if content_hash not in seen_hashes and not any(nav_text in text for nav_text in ['Previous', 'Next:', 'Show All']):
+                        seen_hashes.add(content_hash)
+                        yield {
+                            'type': 'paragraph',
+                            'text': text
+                        }
+            
+            elif element.name in ['ul', 'ol']:
+                list_items = []
+                for li in element.find_all('li'):
+                    item_text = li.get_text(strip=True)
+                    if item_text and len(item_text) > 3:  # Reduced minimum length
+                        list_items.append(item_text)
+                
+                if list_items:
+                    list_hash = self.create_content_hash(''.join(list_items))
+                    if list_hash not in seen_hashes:
+                        seen_hashes.add(list_hash)
+                        yield {
+                            'type': 'list',
+                            'style': 'unordered' if element.name == 'ul' else 'ordered',
+                            'items': list_items
+                        }
+            
+            elif element.name == 'table':
+                # Extract table data
+                table_data = []
+                for row in element.find_all('tr'):
+                    row_data = [cell.get_text(strip=True) for cell in row.find_all(['td', 'th'])]
+                    if row_data:
+                        table_data.append(row_data)
+                
+                if table_data and len(table_data) > 1:  # At least header + one row
+                    yield {
+                        'type': 'table',
+                        'data': table_data
+                    }
+
+    def group_content_blocks(self, blocks, section_name):
+        """Group a block stream into heading-delimited subsections"""
+        content = []
+        current_section = {'heading': section_name, 'content': []}
+        
+        for block in blocks:
+            if block['type'] == 'heading':
+                if current_section['content']:
+                    content.append(current_section)
+                
+                heading_text = block['text']
+                if heading_text and len(heading_text) > 2:
+                    current_section = {
+                        'heading': heading_text,
+                        'level': block['level'],
+                        'content': []
+                    }
+            else:
+                current_section['content'].append(block)
+        
+        if current_section['content']:
+            content.append(current_section)
+        
+        return content
+
+    def scrape_section_content(self, section_url, section_name, soup=None, markup=None):
+        """Scrape content from a specific section with enhanced extraction"""
+        if soup is not None:
+            content_area = self.find_content_area(soup)
+        else:
+            if markup is None:
+                response = self.make_request(section_url)
+                if not response:
+                    return []
+                markup = response.content
+            content_area = self.parse_content_area(markup)
+        
+        if not content_area:
+            return []
+        
+        with self.tracer.span('html.extract', section=section_name) as extract_span:
+            blocks = self.group_content_blocks(self.iter_content_blocks(content_area), section_name)
+            extract_span['attributes']['blocks'] = len(blocks)
+        return blocks
+
+    def _plan_section_pages(self, article_url, overview_soup):
+        """Discover sections and mark which page still has to be fetched"""
+        sections = self.get_all_article_sections(article_url, soup=overview_soup)
+        self.emit('info', f"📑 Found {len(sections)} sections to scrape")
+        
+        section_pages = []
+        for section_name, section_url in sections.items():
+            is_overview = normalize_url(section_url) == normalize_url(article_url)
+            section_pages.append({
+                'name': section_name,
+                'url': section_url,
+                'soup': overview_soup if is_overview else None,
+                'html': None
+            })
+        return section_pages
+
+    @traced('article.fetch', lambda call: call['article_url'])
+    def fetch_article_pages(self, article_url, on_section_fetched=None, overview_soup=None, skip_sections=None,
+                            revalidate=False):
+        """Download the overview and every section page of an article (network stage)
+        
+        revalidate checks every page with the server even when the cached copy is fresh.
+        """
+        start_time = datetime.now()
+        
+        # Fetch the overview once and reuse it for section discovery,
+        # overview content and metadata extraction
+        if overview_soup is None:
+            overview_response = self.make_request(article_url, revalidate=revalidate)
+            if not overview_response:
+                return None
+            overview_soup = self.parse_html(overview_response.content)
+        section_pages = self._plan_section_pages(article_url, overview_soup)
+        
+        # Fetch sections concurrently; the per-host rate limiter keeps the
+        # pace polite while letting several requests be outstanding
+        with make_thread_pool(self.rate_limiter.max_in_flight, self.context_factory) as executor:
+            futures = {
+                # Each request runs in a copy of this context so its spans nest under the article
+                executor.submit(contextvars.copy_context().run, self.make_request, page['url'],
+                                revalidate=revalidate): page
+                for page in section_pages
+                if page['soup'] is None and page['name'] not in (skip_sections or ())
+            }
+            for completed, future in enumerate(as_completed(futures), start=1):
+                page = futures[future]
+                response = future.result()
+                if response:
+                    page['html'] = response.content
+                if on_section_fetched:
+                    on_section_fetched(completed, len(futures), page['name'])
+        
+        return {
+            'url': article_url,
+            'overview_soup': overview_soup,
+            'sections': section_pages,
+            'start_time': start_time
+        }
+
+    @traced('article.parse', lambda call: call['pages']['url'])
+    def parse_article_pages(self, pages, previous=None, completed_sections=None):
+        """Extract section content and metadata from fetched pages (CPU stage)
+        
+        With a previous article store record, section pages whose body hash is
+        unchanged reuse the stored content instead of being parsed again.
+        Sections in completed_sections (checkpointed by the job queue) are
+        taken as-is.
+        """
+        scraping_metrics = {
+            'sections_found': len(pages['sections']),
+            'sections_scraped': 0,
+            'content_blocks': 0,
+            'start_time': pages['start_time']
+        }
+        
+        complete_content = {}
+        successful_sections = 0
+        page_hashes = {}
+        previous_hashes = previous.get('page_hashes', {}) if previous else {}
+        previous_sections = previous['article_data']['sections'] if previous else {}
+        
+        # Sections stay in discovery order regardless of fetch completion order
+        for page in pages['sections']:
+            if completed_sections and page['name'] in completed_sections:
+                section_content = completed_sections[page['name']]
+            elif page['soup'] is not None:
+                section_content = self.scrape_section_content(page['url'], page['name'], soup=page['soup'])
+            elif page['html'] is not None:
+                page_hash = hashlib.md5(page['html']).hexdigest()
+                page_hashes[page['name']] = page_hash
+                if previous_hashes.get(page['name']) == page_hash and page['name'] in previous_sections:
+                    section_content = previous_sections[page['name']]
+                else:
+                    section_content = self.scrape_section_content(page['url'], page['name'], markup=page['html'])
+            else:
+                section_content = []
+            
+            if section_content:
+                complete_content[page['name']] = section_content
+                successful_sections += 1
+                scraping_metrics['content_blocks'] += len(section_content)
+                
+                self.emit('section', f"✅ {page['name']}: {len(section_content)} content blocks",
+                          name=page['name'], blocks=len(section_content))
+            else:
+                self.emit('warning', f"⚠️ {page['name']}: No content extracted")
+        
+        scraping_metrics['sections_scraped'] = successful_sections
+        
+        # Get article info from the already parsed overview
+        overview_soup = pages['overview_soup']
+        title = self._extract_title(overview_soup)
+        authors = self._extract_authors(overview_soup)
+        updated_date = self._extract_updated_date(overview_soup)
+        
+        total_content_blocks = sum(len(content) for content in complete_content.values())
+        scraping_metrics['end_time'] = datetime.now()
+        scraping_metrics['total_duration'] = (scraping_metrics['end_time'] - scraping_metrics['start_time']).total_seconds()
+        
+        article_data = {
+            'url': pages['url'],
+            'title': title,
+            'authors': authors,
+            'last_updated': updated_date,
+            'sections': complete_content,
+            'total_sections': len(complete_content),
+            'total_content_blocks': total_content_blocks,
+            'successful_sections': successful_sections,
+            'scraping_metrics': scraping_metrics,
+            'performance_metrics': self.get_performance_metrics(),
+            'page_hashes': page_hashes
+        }
+        if complete_content:
+            self.store_structured(article_data)
+        return article_data
+
+    def store_structured(self, article_data):
+        """Persist an article to the structured store and search index; a failed write never fails the scrape"""
+        try:
+            with self.tracer.span('store.write', trace_key=article_data['url']):
+                article_data['article_id'] = self.structured_store.put(article_data)
+            with self.tracer.span('search.index', trace_key=article_data['url']):
+                self.search_index.index_article(article_data)
+        except Exception as e:
+            self.emit('warning', f"⚠️ Could not store structured article data: {e}")
+            logger.error(f"Structured store error: {e}", exc_info=True)
+
+    def _section_hashes(self, article_data):
+        return {
+            section_name: self.create_content_hash(json.dumps(section_content, sort_keys=True))
+            for section_name, section_content in article_data['sections'].items()
+        }
+
+    @traced('article.refresh', lambda call: call['article_url'])
+    def refresh_article(self, article_url, output_dir="enhanced_pdfs"):
+        """Incrementally re-scrape an article backed by the local article store
+        
+        Every page is revalidated with the server (a conditional GET when it
+        is cached), so a fresh cache entry never hides an update. Skips
+        section fetches when the overview's updated date is unchanged, reuses
+        stored content for section pages whose body did not change and only
+        regenerates the PDF when the extracted content differs.
+        """
+        try:
+            record = self.article_store.get(article_url)
+            pdf_available = bool(record and record.get('pdf_path') and os.path.exists(record['pdf_path']))
+            
+            overview_response = self.make_request(article_url, revalidate=True)
+            if not overview_response:
+                return None
+            overview_soup = self.parse_html(overview_response.content)
+            updated_date = self._extract_updated_date(overview_soup)
+            
+            date_known = updated_date != "Date not available"
+            if record and pdf_available and date_known and updated_date == record['last_updated']:
+                self.emit('info', f"⏭️ Unchanged since {updated_date}: {record['article_data']['title']}")
+                return {
+                    'status': 'unchanged',
+                    'article_data': record['article_data'],
+                    'pdf_path': record['pdf_path'],
+                    'changed_sections': []
+                }
+            
+            pages = self.fetch_article_pages(article_url, overview_soup=overview_soup, revalidate=True)
+            article_data = self.parse_article_pages(pages, previous=record)
+            if not article_data['sections']:
+                return None
+            
+            section_hashes = self._section_hashes(article_data)
+            previous_hashes = record.get('section_hashes', {}) if record else {}
+            changed_sections = [
+                name for name in set(section_hashes) | set(previous_hashes)
+                if section_hashes.get(name) != previous_hashes.get(name)
+            ]
+            content_hash = self.create_content_hash(json.dumps(
+                [article_data['title'], article_data['authors'], article_data['last_updated'], section_hashes],
+                sort_keys=True
+            ))
+            
+            if record and pdf_available and content_hash == record.get('content_hash'):
+                status = 'unchanged'
+                pdf_path = record['pdf_path']
+                self.emit('info', f"⏭️ Content unchanged, keeping existing PDF: {article_data['title']}")
+            else:
+                status = 'updated' if record else 'new'
+                pdf_path = self.create_enhanced_pdf(article_data, output_dir)
+                if not pdf_path:
+                    return None
+            
+            self.article_store.put(article_url, {
+                'url': article_url,
+                'last_updated': article_data['last_updated'],
+                'article_data': article_data,
+                'page_hashes': article_data['page_hashes'],
+                'section_hashes': section_hashes,
+                'content_hash': content_hash,
+                'pdf_path': pdf_path,
+                'refreshed_at': datetime.now().isoformat()
+            })
+            
+            return {
+                'status': status,
+                'article_data': article_data,
+                'pdf_path': pdf_path,
+                'changed_sections': sorted(changed_sections)
+            }
+            
+        except Exception as e:
+            self.emit('error', f"💥 Incremental refresh failed: {e}")
+            logger.error(f"Refresh error: {e}", exc_info=True)
+            return None
+
+    @traced('article.scrape', lambda call: call['article_url'])
+    def scrape_complete_article(self, article_url):
+        """Enhanced article scraping with better error handling and progress tracking"""
+        self.emit('info', f"🎯 Starting advanced scraping: {article_url}")
+        
+        try:
+            # Detailed progress tracking for whichever front end is listening
+            def on_section_fetched(completed, total_sections, section_name):
+                self.emit(
+                    'progress',
+                    f"🔍 Scraped section {completed}/{total_sections}: {section_name}",
+                    completed=completed,
+                    total=total_sections,
+                    metrics=(
+                        f"📊 Requests: {self.request_count} | "
+                        f"Success Rate: {self.get_performance_metrics()['recent_success_rate']:.1f}%"
+                    )
+                )
+            
+            try:
+                pages = self.fetch_article_pages(article_url, on_section_fetched)
+            finally:
+                # Clear progress indicators
+                self.emit('progress_end')
+            
+            if not pages:
+                return None
+            
+            return self.parse_article_pages(pages)
+            
+        except Exception as e:
+            self.emit('error', f"💥 Advanced scraping failed: {e}")
+            logger.error(f"Scraping error: {e}", exc_info=True)
+            return None
+
+    async def scrape_section_content_async(self, section_url, section_name):
+        """Async counterpart of scrape_section_content"""
+        response = await self.make_request_async(section_url)
+        if not response:
+            return []
+        return await asyncio.to_thread(self.scrape_section_content, section_url, section_name, markup=response.content)
+
+    async def scrape_complete_article_async(self, article_url):
+        """Async counterpart of scrape_complete_article; many articles can share one loop"""
+        self.emit('info', f"🎯 Starting advanced scraping: {article_url}")
+        
+        try:
+            start_time = datetime.now()
+            overview_response = await self.make_request_async(article_url)
+            if not overview_response:
+                return None
+            # Parsing is CPU-bound; worker threads keep the loop free for other articles' downloads
+            overview_soup = await asyncio.to_thread(self.parse_html, overview_response.content)
+            section_pages = self._plan_section_pages(article_url, overview_soup)
+            
+            # All section downloads share the client's keep-alive connections
+            pending = [page for page in section_pages if page['soup'] is None]
+            responses = await asyncio.gather(*(self.make_request_async(page['url']) for page in pending))
+            for page, response in zip(pending, responses):
+                if response:
+                    page['html'] = response.content
+            
+            return await asyncio.to_thread(self.parse_article_pages, {
+                'url': article_url,
+                'overview_soup': overview_soup,
+                'sections': section_pages,
+                'start_time': start_time
+            })
+            
+        except Exception as e:
+            self.emit('error', f"💥 Advanced scraping failed: {e}")
+            logger.error(f"Scraping error: {e}", exc_info=True)
+            return None
+
+    def _extract_title(self, soup):
+        """Enhanced title extraction"""
+        title_selectors = ['h1', 'div.article-title', 'title']
+        for selector in title_selectors:
+            title = soup.select_one(selector)
+            if title:
+                text = title.get_text(strip=True)
+                if text and len(text) > 5:
+                    return text
+        return "Title not found"
+
+    def _extract_authors(self, soup):
+        """Enhanced author extraction"""
+        authors = []
+        author_selectors = [
+            'div.condition-title-info',
+            'div.authors',
+            'div.article-authors',
+            'meta[name="author"]'
+        ]
+        
+        for selector in author_selectors:
+            author_section = soup.select_one(selector)
+            if author_section:
+                if selector == 'meta[name="author"]':
+                    author_content = author_section.get('content', '')
+                    if author_content:
+                        authors = [auth.strip() for auth in author_content.split(';') if auth.strip()]
+                else:
+                    author_text = author_section.get_text()
+                    if 'Author:' in author_text:
+                        author_part = author_text.split('Author:')[-1].split('more...')[0]
+                        authors = [auth.strip() for auth in author_part.split(';') if auth.strip()]
+                
+                if authors:
+                    break
+        
+        return authors if authors else ["Authors information not available"]
+
+    def _extract_updated_date(self, soup):
+        """Enhanced date extraction"""
+        date_selectors = [
+            'div.clinref_updated',
+            'div.article-updated',
+            'meta[property="article:modified_time"]',
+            'div.update-date'
+        ]
+        
+        for selector in date_selectors:
+            date_elem = soup.select_one(selector)
+            if date_elem:
+                if selector.startswith('meta'):
+                    date_text = date_elem.get('content', '')
+                else:
+                    date_text = date_elem.get_text(strip=True)
+                
+                if date_text:
+                    # Clean up date text
+                    date_text = re.sub(r'Updated:\s*', '', date_text)
+                    return date_text.strip()
+        
+        return "Date not available"
+
+    @traced('pdf.render', lambda call: call['article_data']['url'])
+    def create_enhanced_pdf(self, article_data, output_dir="enhanced_pdfs", cancel_event=None):
+        """Create enhanced PDF with better formatting and analytics
+        
+        With a pdf_renderer attached the layout runs in a worker process;
+        cancel_event stops a render that is no longer wanted.
+        """
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        
+        safe_title = "".join(c for c in article_data['title'] if c.isalnum() or c in (' ', '-', '_')).rstrip()
+        filename = f"{safe_title[:60]}_{datetime.now().strftime('%H%M%S')}.pdf"
+        filepath = os.path.join(output_dir, filename)
+        
+        try:
+            if self.pdf_renderer is not None:
+                outcome = self.pdf_renderer.submit(article_data, filepath, cancel_event=cancel_event).result()
+                self.tracer.record('pdf.build', outcome['seconds'], flowables=outcome['flowables'], process='worker')
+            else:
+                with self.tracer.span('pdf.build') as build_span:
+                    build_span['attributes']['flowables'] = build_article_pdf(article_data, filepath)
+            file_size = os.path.getsize(filepath)
+            
+            # Reported so the front end can add it to its download history
+            download_record = {
+                'title': article_data['title'],
+                'filename': filename,
+                'file_size_kb': file_size / 1024,
+                'timestamp': datetime.now(),
+                'sections': article_data['successful_sections'],
+                'content_blocks': article_data['total_content_blocks']
+            }
+            
+            self.emit('pdf_created', f"🎉 Enhanced PDF created: {filename} ({file_size/1024:.1f} KB)",
+                      record=download_record)
+            return filepath
+            
+        except CancelledError:
+            self.emit('warning', f"⏹️ PDF rendering cancelled: {article_data['title']}")
+            return None
+        except Exception as e:
+            self.emit('error', f"💥 Enhanced PDF creation failed: {e}")
+            logger.error(f"PDF creation error: {e}", exc_info=True)
+            return None
+
+class DiscoveryCrawler:
+    """Resumable crawler that builds a catalog of every article under a set of index pages
+
+    Index pages wait in a SQLite frontier and articles are deduplicated by
+    their Medscape article ID, so an interrupted crawl picks up where it
+    stopped. Pagination and sub-index links are followed up to max_depth
+    levels below the seeds. Refreshing re-queues pages older than a cutoff,
+    which the scraper revalidates from its HTTP cache. The links between
+    index pages and the article listings of each page are kept, so the
+    catalog of one seed is everything reachable from it, in the order the
+    crawl found it, however many other seeds share the database.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            depth INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            articles INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            fetched_at REAL
+        );
+        CREATE TABLE IF NOT EXISTS articles (
+            article_id INTEGER PRIMARY KEY,
+            url TEXT NOT NULL,
+            title TEXT,
+            category TEXT,
+            source_page TEXT,
+            first_seen REAL NOT NULL,
+            last_seen REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS page_links (
+            parent TEXT NOT NULL,
+            child TEXT NOT NULL,
+            PRIMARY KEY (parent, child)
+        );
+        CREATE TABLE IF NOT EXISTS article_sources (
+            article_id INTEGER NOT NULL,
+            page_url TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            PRIMARY KEY (article_id, page_url)
+        );
+        CREATE INDEX IF NOT EXISTS idx_pages_status ON pages (status);
+        CREATE INDEX IF NOT EXISTS idx_article_sources_page ON article_sources (page_url);
+        -- Catalogs from before article_sources existed know each article's first page only
+        INSERT INTO article_sources (article_id, page_url, position)
+        SELECT article_id, source_page, 0 FROM articles
+        WHERE source_page IS NOT NULL AND NOT EXISTS (SELECT 1 FROM article_sources);
+    """
+
+    CATALOG_FIELDS = ('article_id', 'title', 'category', 'url')
+
+    def __init__(self, scraper, db_path="discovery.sqlite3", max_depth=2, workers=4, max_attempts=3):
+        self.scraper = scraper
+        self.db_path = db_path
+        self.max_depth = max_depth
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(self.SCHEMA)
+
+    def _execute(self, sql, params=()):
+        with self._lock, self.conn:
+            return self.conn.execute(sql, params).fetchall()
+
+    def add_seeds(self, urls):
+        """Queue index pages at depth 0; pages already crawled are left alone"""
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO pages (url, depth) VALUES (?, 0)",
+                [(normalize_url(url),) for url in urls]
+            )
+
+    def refresh(self, max_age_hours=24):
+        """Re-queue crawled pages older than max_age_hours; returns how many were queued"""
+        cutoff = time.time() - max_age_hours * 3600
+        with self._lock, self.conn:
+            return self.conn.execute(
+                "UPDATE pages SET status = 'pending', attempts = 0 WHERE status != 'pending' AND fetched_at < ?",
+                (cutoff,)
+            ).rowcount
+
+    def _claim_pages(self, limit):
+        with self._lock, self.conn:
+            rows = self.conn.execute(
+                "SELECT url, depth FROM pages WHERE status = 'pending' ORDER BY depth, rowid LIMIT ?", (limit,)
+            ).fetchall()
+            self.conn.executemany("UPDATE pages SET status = 'running' WHERE url = ?", [(row['url'],) for row in rows])
+        return [dict(row) for row in rows]
+
+    def extract_index_links(self, soup, page_url):
+        """Pagination links (same depth) and sub-index links (one level deeper) on an index page"""
+        page = urlparse(page_url)
+        page_path = page.path.rstrip('/')
+        pagination, sub_indexes = [], []
+        for link in soup.find_all('a', href=True):
+            href = link['href']
+            if href.startswith(('javascript:', '#', 'mailto:')):
+                continue
+            url = urlparse(urljoin(page_url, href))
+            if url.netloc != page.netloc or ARTICLE_ID_PATTERN.search(url.path):
+                continue
+            path = url.path.rstrip('/')
+            if 'next' in (link.get('rel') or []) or (path == page_path and 'page=' in url.query):
+                pagination.append(url.geturl())
+            elif page_path and path.startswith(page_path + '/'):
+                sub_indexes.append(url.geturl())
+            elif not page_path and re.fullmatch(r'/[a-z][a-z0-9_\-]*', path):
+                # The site root lists the specialty indexes
+                sub_indexes.append(url.geturl())
+        return pagination, sub_indexes
+
+    def _crawl_page(self, page):
+        response = self.scraper.make_request(page['url'])
+        if response is None:
+            raise RuntimeError("Failed to fetch index page")
+        soup = self.scraper.parse_html(response.text)
+        articles = self.scraper.extract_article_links(response.text, soup=soup)
+        pagination, sub_indexes = self.extract_index_links(soup, page['url'])
+        return articles, pagination, sub_indexes
+
+    def _record_page(self, page, articles, pagination, sub_indexes):
+        now = time.time()
+        new_pages = [(normalize_url(url), page['depth']) for url in pagination]
+        if page['depth'] < self.max_depth:
+            new_pages += [(normalize_url(url), page['depth'] + 1) for url in sub_indexes]
+        rows = []
+        for article in articles:
+            match = ARTICLE_ID_PATTERN.search(article['url'])
+            if match:
+                rows.append((int(match.group(1)), article['url'], article['title'], article['category'], page['url'], now, now))
+        sources = [(row[0], page['url'], position) for position, row in enumerate(rows)]
+        
+        with self._lock, self.conn:
+            self.conn.executemany("""
+                INSERT INTO articles (article_id, url, title, category, source_page, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (article_id) DO UPDATE SET last_seen = excluded.last_seen
+            """, rows)
+            new_articles = self.conn.execute(
+                "SELECT COUNT(*) FROM articles WHERE first_seen = ? AND source_page = ?", (now, page['url'])
+            ).fetchone()[0]
+            # A re-crawl replaces the page's listing rather than adding to it
+            self.conn.execute("DELETE FROM article_sources WHERE page_url = ?", (page['url'],))
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO article_sources (article_id, page_url, position) VALUES (?, ?, ?)", sources
+            )
+            self.conn.executemany("INSERT OR IGNORE INTO page_links (parent, child) VALUES (?, ?)",
+                                  [(page['url'], url) for url, _ in new_pages])
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO pages (url, depth) VALUES (?, ?)", new_pages)
+            queued = self.conn.total_changes - before
+            self.conn.execute(
+                "UPDATE pages SET status = 'done', articles = ?, last_error = NULL, fetched_at = ? WHERE url = ?",
+                (len(rows), now, page['url'])
+            )
+        return new_articles, queued
+
+    def _fail_page(self, page, error):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE pages SET status = CASE WHEN attempts + 1 < ? THEN 'pending' ELSE 'failed' END, "
+                "attempts = attempts + 1, last_error = ?, fetched_at = ? WHERE url = ?",
+                (self.max_attempts, str(error)[:500], time.time(), page['url'])
+            )
+
+    def crawl(self, seeds=(), max_pages=None):
+        """Crawl the frontier (plus any new seeds) and yield one event per index page"""
+        self.add_seeds(seeds)
+        # Pages left running by an interrupted crawl go back to the frontier
+        self._execute("UPDATE pages SET status = 'pending' WHERE status = 'running'")
+        
+        crawled = 0
+        try:
+            with make_thread_pool(self.workers, self.scraper.context_factory) as executor:
+                while max_pages is None or crawled < max_pages:
+                    limit = self.workers if max_pages is None else min(self.workers, max_pages - crawled)
+                    pages = self._claim_pages(limit)
+                    if not pages:
+                        break
+                    futures = {executor.submit(self._crawl_page, page): page for page in pages}
+                    for future in as_completed(futures):
+                        page = futures[future]
+                        crawled += 1
+                        try:
+                            articles, pagination, sub_indexes = future.result()
+                        except Exception as e:
+                            self._fail_page(page, e)
+                            yield {'type': 'failed', 'url': page['url'], 'depth': page['depth'], 'error': str(e)}
+                            continue
+                        new_articles, queued = self._record_page(page, articles, pagination, sub_indexes)
+                        yield {
+                            'type': 'page',
+                            'url': page['url'],
+                            'depth': page['depth'],
+                            'articles': len(articles),
+                            'new_articles': new_articles,
+                            'pages_queued': queued
+                        }
+        finally:
+            # Pages claimed but not finished (the caller stopped early) stay in the frontier
+            self._execute("UPDATE pages SET status = 'pending' WHERE status = 'running'")
+
+    def progress(self):
+        """Frontier page counts by status plus the catalog size"""
+        rows = self._execute("SELECT status, COUNT(*) AS count FROM pages GROUP BY status")
+        progress = {'pending': 0, 'running': 0, 'done': 0, 'failed': 0}
+        progress.update({row['status']: row['count'] for row in rows})
+        progress['articles'] = self._execute("SELECT COUNT(*) FROM articles")[0][0]
+        return progress
+
+    def catalog(self, seeds=None, category=None, seen_since=None):
+        """Catalog entries in discovery order, optionally filtered by category or last crawl time
+        
+        With seeds, only articles listed on those index pages or on pages
+        the crawl reached from them are returned, each at its first listing
+        (shallowest page, then crawl order, then position on the page).
+        """
+        sql = """
+            SELECT a.article_id, a.title, a.category, a.url, a.first_seen, a.last_seen
+            FROM articles a JOIN article_sources s ON s.article_id = a.article_id JOIN pages p ON p.url = s.page_url
+        """
+        params = []
+        if seeds is not None:
+            seeds = [normalize_url(seed) for seed in seeds]
+            sql = f"""
+                WITH RECURSIVE reached (url) AS (
+                    VALUES {", ".join("(?)" for _ in seeds) or "(NULL)"}
+                    UNION SELECT child FROM page_links JOIN reached ON parent = reached.url
+                )
+            """ + sql + " JOIN reached r ON r.url = s.page_url"
+            params.extend(seeds)
+        sql += " WHERE 1 = 1"
+        if category is not None:
+            sql += " AND a.category = ?"
+            params.append(category)
+        if seen_since is not None:
+            sql += " AND a.last_seen >= ?"
+            params.append(seen_since)
+        
+        entries = {}
+        for row in self._execute(sql + " ORDER BY p.depth, p.rowid, s.position", params):
+            entries.setdefault(row['article_id'], dict(row))
+        return list(entries.values())
+
+    def catalog_csv(self, entries=None):
+        """The catalog as CSV text"""
+        buffer = StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.CATALOG_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(self.catalog() if entries is None else entries)
+        return buffer.getvalue()
+
+    def write_catalog(self, path, seeds=None):
+        """Write the catalog (of seeds, if given) as CSV or, for any other extension, JSON; returns the entry count"""
+        entries = self.catalog(seeds)
+        if path.lower().endswith('.csv'):
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                f.write(self.catalog_csv(entries))
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump([{field: entry[field] for field in self.CATALOG_FIELDS} for entry in entries], f, indent=2)
+        return len(entries)
+
+class BatchJobQueue:
+    """SQLite-backed task queue that lets batch generation resume after a crash
+
+    Every article and every section is a task with a status. Completed work is
+    never redone and failed tasks are retried with exponential backoff.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS batches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            label TEXT,
+            created_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch_id INTEGER NOT NULL REFERENCES batches(id),
+            parent_id INTEGER REFERENCES tasks(id),
+            kind TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            url TEXT NOT NULL,
+            title TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL DEFAULT 0,
+            last_error TEXT,
+            result TEXT,
+            updated_at REAL NOT NULL,
+            UNIQUE (parent_id, title)
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_batch ON tasks (batch_id, kind, status);
+    """
+
+    def __init__(self, db_path="batch_jobs.sqlite3", max_attempts=3, backoff_seconds=30):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(self.SCHEMA)
+
+    def _execute(self, sql, params=()):
+        with self._lock, self.conn:
+            return self.conn.execute(sql, params).fetchall()
+
+    def create_batch(self, articles, label=""):
+        """Persist a batch with one pending task per article, return its id"""
+        now = time.time()
+        with self._lock, self.conn:
+            batch_id = self.conn.execute(
+                "INSERT INTO batches (label, created_at) VALUES (?, ?)", (label, now)
+            ).lastrowid
+            self.conn.executemany(
+                "INSERT INTO tasks (batch_id, kind, position, url, title, updated_at) VALUES (?, 'article', ?, ?, ?, ?)",
+                [(batch_id, position, article['url'], article['title'], now) for position, article in enumerate(articles)]
+            )
+        return batch_id
+
+    def list_batches(self, unfinished_only=False):
+        """Batches with their article task counts, newest first"""
+        rows = self._execute("""
+            SELECT b.id, b.label, b.created_at,
+                   COUNT(t.id) AS total,
+                   SUM(t.status = 'done') AS done,
+                   SUM(t.status = 'failed') AS failed
+            FROM batches b JOIN tasks t ON t.batch_id = b.id AND t.kind = 'article'
+            GROUP BY b.id ORDER BY b.id DESC
+        """)
+        batches = [dict(row) for row in rows]
+        if unfinished_only:
+            batches = [batch for batch in batches if batch['done'] + batch['failed'] < batch['total']]
+        return batches
+
+    def batch_progress(self, batch_id):
+        """Article task counts by status"""
+        rows = self._execute(
+            "SELECT status, COUNT(*) AS count FROM tasks WHERE batch_id = ? AND kind = 'article' GROUP BY status",
+            (batch_id,)
+        )
+        progress = {'pending': 0, 'running': 0, 'done': 0, 'failed': 0}
+        progress.update({row['status']: row['count'] for row in rows})
+        progress['total'] = sum(progress.values())
+        return progress
+
+    def reset_stale(self, batch_id):
+        """Return tasks left running by a dead process to the pending state
+        
+        Articles finished with sections that can still be retried are reopened
+        too, so a resumed batch fetches those sections again.
+        """
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE tasks SET status = 'pending', updated_at = ? WHERE batch_id = ? AND status = 'running'",
+                (now, batch_id)
+            )
+            self.conn.execute("""
+                UPDATE tasks SET status = 'pending', next_attempt_at = 0, updated_at = ?
+                WHERE batch_id = ? AND kind = 'article' AND status = 'done' AND id IN (
+                    SELECT parent_id FROM tasks WHERE batch_id = ? AND kind = 'section' AND status = 'failed' AND attempts < ?
+                )
+            """, (now, batch_id, batch_id, self.max_attempts))
+
+    def claim_due_articles(self, batch_id):
+        """Mark pending article tasks whose backoff has expired as running and return them"""
+        now = time.time()
+        with self._lock, self.conn:
+            rows = self.conn.execute("""
+                SELECT id, position, url, title FROM tasks
+                WHERE batch_id = ? AND kind = 'article' AND status = 'pending' AND next_attempt_at <= ?
+                ORDER BY position
+            """, (batch_id, now)).fetchall()
+            self.conn.executemany(
+                "UPDATE tasks SET status = 'running', updated_at = ? WHERE id = ?",
+                [(now, row['id']) for row in rows]
+            )
+        return [
+            {'task_id': row['id'], 'position': row['position'], 'url': row['url'], 'title': row['title']}
+            for row in rows
+        ]
+
+    def has_open_tasks(self, batch_id):
+        rows = self._execute(
+            "SELECT 1 FROM tasks WHERE batch_id = ? AND kind = 'article' AND status IN ('pending', 'running') LIMIT 1",
+            (batch_id,)
+        )
+        return bool(rows)
+
+    def register_sections(self, article_task_id, section_pages):
+        """Create section tasks for newly discovered sections of an article"""
+        now = time.time()
+        with self._lock, self.conn:
+            batch_id = self.conn.execute("SELECT batch_id FROM tasks WHERE id = ?", (article_task_id,)).fetchone()[0]
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO tasks (batch_id, parent_id, kind, position, url, title, updated_at) "
+                "VALUES (?, ?, 'section', ?, ?, ?, ?)",
+                [(batch_id, article_task_id, position, page['url'], page['name'], now)
+                 for position, page in enumerate(section_pages)]
+            )
+
+    def completed_sections(self, article_task_id):
+        """Extracted content of the sections already checkpointed for an article"""
+        rows = self._execute(
+            "SELECT title, result FROM tasks WHERE parent_id = ? AND status = 'done'",
+            (article_task_id,)
+        )
+        return {row['title']: json.loads(row['result']) for row in rows}
+
+    def checkpoint_sections(self, article_task_id, sections_content, section_names):
+        """Record which sections produced content; return the empty ones that can still be retried"""
+        now = time.time()
+        with self._lock, self.conn:
+            for name in section_names:
+                if name in sections_content:
+                    self.conn.execute(
+                        "UPDATE tasks SET status = 'done', result = ?, updated_at = ? "
+                        "WHERE parent_id = ? AND title = ? AND status != 'done'",
+                        (json.dumps(sections_content[name]), now, article_task_id, name)
+                    )
+                else:
+                    self.conn.execute(
+                        "UPDATE tasks SET status = 'failed', attempts = attempts + 1, "
+                        "last_error = 'No content extracted', updated_at = ? WHERE parent_id = ? AND title = ?",
+                        (now, article_task_id, name)
+                    )
+            rows = self.conn.execute(
+                "SELECT title FROM tasks WHERE parent_id = ? AND status = 'failed' AND attempts < ? ORDER BY position",
+                (article_task_id, self.max_attempts)
+            ).fetchall()
+        return [row['title'] for row in rows]
+
+    def complete_article(self, task_id, result):
+        self._execute(
+            "UPDATE tasks SET status = 'done', result = ?, last_error = NULL, updated_at = ? WHERE id = ?",
+            (json.dumps(result), time.time(), task_id)
+        )
+
+    def fail_task(self, task_id, error):
+        """Schedule a retry with exponential backoff; return False once attempts are exhausted"""
+        now = time.time()
+        with self._lock, self.conn:
+            attempts = self.conn.execute("SELECT attempts FROM tasks WHERE id = ?", (task_id,)).fetchone()[0] + 1
+            will_retry = attempts < self.max_attempts
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = ? WHERE id = ?",
+                (
+                    'pending' if will_retry else 'failed',
+                    attempts,
+                    now + self.backoff_seconds * (2 ** (attempts - 1)),
+                    str(error)[:500],
+                    now,
+                    task_id
+                )
+            )
+        return will_retry
+
+    def batch_results(self, batch_id):
+        """Results of completed article tasks in selection order"""
+        rows = self._execute(
+            "SELECT result FROM tasks WHERE batch_id = ? AND kind = 'article' AND status = 'done' ORDER BY position",
+            (batch_id,)
+        )
+        return [json.loads(row['result']) for row in rows]
+
+    def failed_articles(self, batch_id):
+        rows = self._execute(
+            "SELECT title, last_error FROM tasks WHERE batch_id = ? AND kind = 'article' AND status = 'failed' ORDER BY position",
+            (batch_id,)
+        )
+        return [dict(row) for row in rows]
+
+class BatchPipeline:
+    """Pipelined batch engine: scrape, parse and render stages joined by bounded queues"""
+
+    STAGES = ('scrape', 'parse', 'render')
+    _DONE = object()
+
+    def __init__(self, scraper, scrape_workers=2, queue_size=2, article_delay=0, job_queue=None, batch_id=None,
+                 output_dir="enhanced_pdfs"):
+        self.scraper = scraper
+        self.output_dir = output_dir
+        self.job_queue = job_queue
+        self.batch_id = batch_id
+        self.scrape_workers = scrape_workers
+        self.queue_size = queue_size
+        self.article_delay = article_delay
+        self.stage_stats = {stage: {'items': 0, 'failures': 0, 'busy_seconds': 0.0} for stage in self.STAGES}
+        self.start_time = None
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+
+    def _scrape(self, article, _):
+        if self.job_queue is None:
+            return self.scraper.fetch_article_pages(article['url'])
+        
+        # Sections checkpointed by an earlier run are not fetched again
+        completed_sections = self.job_queue.completed_sections(article['task_id'])
+        pages = self.scraper.fetch_article_pages(article['url'], skip_sections=set(completed_sections))
+        if pages:
+            self.job_queue.register_sections(article['task_id'], pages['sections'])
+            pages['completed_sections'] = completed_sections
+        return pages
+
+    def _parse(self, article, pages):
+        article_data = self.scraper.parse_article_pages(pages, completed_sections=pages.get('completed_sections'))
+        if self.job_queue is not None:
+            retryable = self.job_queue.checkpoint_sections(
+                article['task_id'],
+                article_data['sections'],
+                [page['name'] for page in pages['sections']]
+            )
+            # Keep the article open until its sections run out of attempts; the
+            # retry fetches only those, and the last attempt renders what exists
+            if retryable:
+                raise RuntimeError(f"No content extracted from {len(retryable)} sections: {', '.join(retryable)}")
+        return article_data if article_data['sections'] else None
+
+    def _render(self, article, article_data):
+        pdf_path = self.scraper.create_enhanced_pdf(article_data, self.output_dir, cancel_event=self._cancelled)
+        if not pdf_path:
+            return None
+        result = {
+            'title': article_data['title'],
+            'url': article_data['url'],
+            'article_id': article_data.get('article_id'),
+            'path': pdf_path,
+            'size': os.path.getsize(pdf_path),
+            'sections': len(article_data['sections']),
+            'content_blocks': article_data['total_content_blocks']
+        }
+        if self.job_queue is not None:
+            self.job_queue.complete_article(article['task_id'], result)
+        return result
+
+    def _put(self, target_queue, item):
+        """Put with back-pressure, giving up if the batch was cancelled"""
+        while not self._cancelled.is_set():
+            try:
+                target_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _feed(self, articles, inbox):
+        if self.job_queue is not None:
+            articles = self._claimed_articles()
+        for index, article in enumerate(articles):
+            if index and self.article_delay:
+                time.sleep(self.article_delay)
+            position = article.get('position', index)
+            if not self._put(inbox, (position, article, None)):
+                return
+        for _ in range(self.scrape_workers):
+            self._put(inbox, self._DONE)
+
+    def _claimed_articles(self):
+        """Yield due article tasks until the batch has no pending or running work"""
+        self.job_queue.reset_stale(self.batch_id)
+        while not self._cancelled.is_set():
+            claimed = self.job_queue.claim_due_articles(self.batch_id)
+            if claimed:
+                yield from claimed
+            elif self.job_queue.has_open_tasks(self.batch_id):
+                time.sleep(1)  # In flight or waiting for a retry backoff
+            else:
+                return
+
+    def _stage_worker(self, stage, work, inbox, outbox, events, workers_left, next_stage=None):
+        while True:
+            try:
+                item = inbox.get(timeout=0.5)
+            except queue.Empty:
+                if self._cancelled.is_set():
+                    return
+                continue
+            
+            if item is self._DONE:
+                with self._lock:
+                    workers_left[stage] -= 1
+                    last_worker = workers_left[stage] == 0
+                if last_worker:
+                    # One sentinel per downstream worker; the final stage closes the event stream
+                    if outbox is None:
+                        self._put(events, self._DONE)
+                    else:
+                        for _ in range(workers_left[next_stage]):
+                            self._put(outbox, self._DONE)
+                return
+            
+            if self._cancelled.is_set():
+                continue
+            
+            index, article, payload = item
+            started = time.monotonic()
+            try:
+                with self.scraper.tracer.span(f"batch.{stage}", trace_key=article['url'], title=article['title']):
+                    result = work(article, payload)
+                error = None if result else "No content produced"
+            except Exception as e:
+                logger.error(f"Batch {stage} error: {e}", exc_info=True)
+                result, error = None, str(e)
+            elapsed = time.monotonic() - started
+            
+            with self._lock:
+                stats = self.stage_stats[stage]
+                stats['busy_seconds'] += elapsed
+                if error:
+                    stats['failures'] += 1
+                else:
+                    stats['items'] += 1
+            
+            event = {'stage': stage, 'index': index, 'title': article['title'], 'seconds': elapsed}
+            if error:
+                will_retry = self.job_queue is not None and self.job_queue.fail_task(article['task_id'], error)
+                events.put(dict(event, type='retry' if will_retry else 'failed', error=error))
+            elif outbox is not None:
+                events.put(dict(event, type='stage'))
+                self._put(outbox, (index, article, result))
+            else:
+                events.put(dict(event, type='done', result=result))
+
+    def run(self, articles=()):
+        """Process articles (or the job queue batch) and yield progress events; call from the UI thread"""
+        scrape_queue = queue.Queue(maxsize=self.queue_size)
+        parse_queue = queue.Queue(maxsize=self.queue_size)
+        render_queue = queue.Queue(maxsize=self.queue_size)
+        events = queue.Queue()
+        # Renders run in parallel when a process pool is attached to the scraper
+        render_workers = self.scraper.pdf_renderer.workers if self.scraper.pdf_renderer is not None else 1
+        workers_left = {'scrape': self.scrape_workers, 'parse': 1, 'render': render_workers}
+        stages = [
+            ('scrape', self._scrape, scrape_queue, parse_queue, 'parse'),
+            ('parse', self._parse, parse_queue, render_queue, 'render'),
+            ('render', self._render, render_queue, None, None)
+        ]
+        
+        self._cancelled.clear()
+        self.start_time = time.monotonic()
+        with make_thread_pool(sum(workers_left.values()) + 1, self.scraper.context_factory) as executor:
+            executor.submit(self._feed, articles, scrape_queue)
+            for stage, work, inbox, outbox, next_stage in stages:
+                for _ in range(workers_left[stage]):
+                    executor.submit(self._stage_worker, stage, work, inbox, outbox, events, workers_left, next_stage)
+            
+            try:
+                while True:
+                    event = events.get()
+                    if event is self._DONE:
+                        break
+                    yield event
+            finally:
+                # Let the workers wind down if the caller stopped listening early
+                self._cancelled.set()
+
+    def get_stage_stats(self):
+        """Per-stage throughput for the progress display"""
+        wall_seconds = max(time.monotonic() - self.start_time, 1e-6) if self.start_time else 0
+        with self._lock:
+            return {
+                stage: {
+                    'items': stats['items'],
+                    'failures': stats['failures'],
+                    'avg_seconds': stats['busy_seconds'] / max(stats['items'] + stats['failures'], 1),
+                    'items_per_minute': (stats['items'] / wall_seconds * 60) if wall_seconds else 0
+                }
+                for stage, stats in self.stage_stats.items()
+            }
+
+def temp_path_beside(path):
+    """Create a uniquely named empty file in path's directory and return its name
+    
+    Writers fill it and os.replace it onto path; being in the same directory
+    keeps the replace atomic, and the unique name keeps concurrent writers of
+    the same path from clobbering each other's partial output.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    os.close(fd)
+    return tmp_path
+
+# Formats whose contents are already compressed; deflating them again only costs CPU
+STORED_EXTENSIONS = {'.pdf', '.zip', '.gz', '.zst', '.parquet', '.png', '.jpg', '.jpeg'}
+
+def create_zip_file(pdf_paths, zip_filename="medscape_articles.zip", compresslevel=6):
+    """Write a ZIP of the given files to zip_filename and return its path
+
+    Members are streamed from disk into the archive file, so memory stays flat
+    however many PDFs there are. PDFs are stored as-is; other files are deflated.
+    """
+    tmp_path = temp_path_beside(zip_filename)
+    try:
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as zip_file:
+            names = set()
+            for pdf_path in pdf_paths:
+                stem, extension = os.path.splitext(os.path.basename(pdf_path))
+                pdf_name, copy = stem + extension, 1
+                while pdf_name in names:
+                    copy += 1
+                    pdf_name = f"{stem} ({copy}){extension}"
+                names.add(pdf_name)
+                
+                compress_type = zipfile.ZIP_STORED if extension.lower() in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+                zip_file.write(pdf_path, pdf_name, compress_type=compress_type)
+        os.replace(tmp_path, zip_filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    
+    return zip_filename
+
+class StreamingPdfMerger:
+    """Concatenates PDFs into one file on disk, one source document at a time
+
+    Each source's pages and everything they reference are renumbered and
+    written out as the source is read, so memory holds a single source plus
+    the cross-reference offsets rather than every merged document. Objects
+    without streams that serialise identically after renumbering (the font
+    and resource dictionaries every ReportLab PDF carries) are written once
+    and shared. Source outlines are carried over, so each article keeps its
+    title and section bookmarks.
+    """
+
+    # Page attributes a page may inherit from its page tree ancestors
+    INHERITED_PAGE_KEYS = ('/Resources', '/MediaBox', '/CropBox', '/Rotate')
+
+    def __init__(self, path, title=None):
+        self.path = path
+        self.title = title
+        self.file = open(path, 'wb')
+        self.file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self.offsets = [None]  # Byte offset per object number; object 0 heads the free list
+        self.page_numbers = []
+        self.outline = []
+        self.shared = {}
+        self.shared_hits = 0
+        self.sources = 0
+        self.pages_number = self._allocate()
+
+    def _allocate(self):
+        self.offsets.append(None)
+        return len(self.offsets) - 1
+
+    def _write(self, number, data):
+        self.offsets[number] = self.file.tell()
+        self.file.write(b"%d 0 obj\n%s\nendobj\n" % (number, data))
+
+    def _serialize(self, obj):
+        buffer = BytesIO()
+        obj.write_to_stream(buffer, None)
+        return buffer.getvalue()
+
+    def _rewrite(self, obj, numbers, pending):
+        """Copy of a source object with its references pointing at output objects"""
+        from PyPDF2.generic import ArrayObject, DictionaryObject, IndirectObject
+        if isinstance(obj, IndirectObject):
+            return IndirectObject(self._copy_object(obj, numbers, pending), 0, None)
+        if isinstance(obj, DictionaryObject):
+            return DictionaryObject({key: self._rewrite(value, numbers, pending) for key, value in obj.items()})
+        if isinstance(obj, ArrayObject):
+            return ArrayObject(self._rewrite(value, numbers, pending) for value in obj)
+        return obj
+
+    def _copy_object(self, reference, numbers, pending):
+        """Output number for a source object, writing it (and what it references) on first use"""
+        from PyPDF2.generic import DictionaryObject, NameObject, NumberObject, StreamObject
+        if reference.idnum in numbers:
+            return numbers[reference.idnum]
+        if reference.idnum in pending:
+            # A reference cycle: the object keeps the number handed out here
+            if pending[reference.idnum] is None:
+                pending[reference.idnum] = self._allocate()
+            return pending[reference.idnum]
+        
+        pending[reference.idnum] = None
+        source = reference.get_object()
+        if isinstance(source, StreamObject):
+            # The length may be an indirect object; it is rewritten inline instead
+            copy = self._rewrite(DictionaryObject({key: value for key, value in source.items() if key != '/Length'}),
+                                 numbers, pending)
+            data = source._data  # Still encoded, so streams are copied without recompressing
+            copy[NameObject('/Length')] = NumberObject(len(data))
+            serialized = self._serialize(copy) + b"\nstream\n" + data + b"\nendstream"
+        else:
+            serialized = self._serialize(self._rewrite(source, numbers, pending))
+        
+        number = pending.pop(reference.idnum)
+        if number is None and not isinstance(source, StreamObject):
+            number = self.shared.get(serialized)
+            if number is not None:
+                self.shared_hits += 1
+                numbers[reference.idnum] = number
+                return number
+            number = self.shared[serialized] = self._allocate()
+        elif number is None:
+            number = self._allocate()
+        self._write(number, serialized)
+        numbers[reference.idnum] = number
+        return number
+
+    def _outline_tree(self, reader, items, first_page):
+        tree = []
+        for item in items:
+            if isinstance(item, list):
+                if tree:
+                    tree[-1]['children'] = self._outline_tree(reader, item, first_page)
+                continue
+            page = reader.get_destination_page_number(item)
+            if page is not None and page >= 0:
+                tree.append({'title': str(item.title), 'page': first_page + page, 'children': []})
+        return tree
+
+    def append(self, pdf_path, title=None):
+        """Copy every page of a PDF; title is the outline entry used if the PDF has no outline"""
+        from PyPDF2 import PdfReader
+        from PyPDF2.generic import DictionaryObject, IndirectObject, NameObject
+        reader = PdfReader(pdf_path)
+        numbers, pending = {}, {}
+        first_page = len(self.page_numbers)
+        page_numbers = []
+        
+        for page in reader.pages:
+            # Pages are numbered first since annotations may point back at them
+            number = numbers[page.indirect_reference.idnum] = self._allocate()
+            inherited = {}
+            node = page
+            while '/Parent' in node:
+                node = node['/Parent'].get_object()
+                for key in self.INHERITED_PAGE_KEYS:
+                    if key not in page and key in node:
+                        inherited.setdefault(key, node[key])
+            
+            page_dict = DictionaryObject(inherited)
+            page_dict.update((key, value) for key, value in page.items() if key != '/Parent')
+            copy = self._rewrite(page_dict, numbers, pending)
+            copy[NameObject('/Parent')] = IndirectObject(self.pages_number, 0, None)
+            self._write(number, self._serialize(copy))
+            page_numbers.append(number)
+        
+        outline = self._outline_tree(reader, reader.outline, first_page)
+        if not outline and page_numbers:
+            metadata_title = reader.metadata.title if reader.metadata else None
+            outline = [{'title': title or metadata_title or os.path.basename(pdf_path), 'page': first_page, 'children': []}]
+        
+        # Only a fully copied source joins the page tree; a failed one leaves unreferenced objects
+        self.page_numbers.extend(page_numbers)
+        self.outline.extend(outline)
+        self.sources += 1
+
+    def _write_outline_items(self, items, parent):
+        from PyPDF2.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject,
+                                    TextStringObject)
+        numbers = [self._allocate() for _ in items]
+        visible = len(items)
+        for position, (item, number) in enumerate(zip(items, numbers)):
+            entry = DictionaryObject({
+                NameObject('/Title'): TextStringObject(item['title']),
+                NameObject('/Parent'): IndirectObject(parent, 0, None),
+                NameObject('/Dest'): ArrayObject([IndirectObject(self.page_numbers[item['page']], 0, None),
+                                                  NameObject('/Fit')])
+            })
+            if position:
+                entry[NameObject('/Prev')] = IndirectObject(numbers[position - 1], 0, None)
+            if position < len(items) - 1:
+                entry[NameObject('/Next')] = IndirectObject(numbers[position + 1], 0, None)
+            if item['children']:
+                first, last, _ = self._write_outline_items(item['children'], number)
+                entry[NameObject('/First')] = IndirectObject(first, 0, None)
+                entry[NameObject('/Last')] = IndirectObject(last, 0, None)
+                # Negative: articles start collapsed so long batches stay navigable
+                entry[NameObject('/Count')] = NumberObject(-len(item['children']))
+            self._write(number, self._serialize(entry))
+        return numbers[0], numbers[-1], visible
+
+    def close(self):
+        """Write the page tree, outline, catalog and cross-reference table"""
+        from PyPDF2.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject,
+                                    TextStringObject)
+        self._write(self.pages_number, self._serialize(DictionaryObject({
+            NameObject('/Type'): NameObject('/Pages'),
+            NameObject('/Kids'): ArrayObject(IndirectObject(number, 0, None) for number in self.page_numbers),
+            NameObject('/Count'): NumberObject(len(self.page_numbers))
+        })))
+        
+        catalog = DictionaryObject({
+            NameObject('/Type'): NameObject('/Catalog'),
+            NameObject('/Pages'): IndirectObject(self.pages_number, 0, None)
+        })
+        if self.outline:
+            outlines_number = self._allocate()
+            first, last, count = self._write_outline_items(self.outline, outlines_number)
+            self._write(outlines_number, self._serialize(DictionaryObject({
+                NameObject('/Type'): NameObject('/Outlines'),
+                NameObject('/First'): IndirectObject(first, 0, None),
+                NameObject('/Last'): IndirectObject(last, 0, None),
+                NameObject('/Count'): NumberObject(count)
+            })))
+            catalog[NameObject('/Outlines')] = IndirectObject(outlines_number, 0, None)
+            catalog[NameObject('/PageMode')] = NameObject('/UseOutlines')
+        catalog_number = self._allocate()
+        self._write(catalog_number, self._serialize(catalog))
+        
+        info = DictionaryObject({NameObject('/Producer'): TextStringObject("Medscape Article Scraper")})
+        if self.title:
+            info[NameObject('/Title')] = TextStringObject(self.title)
+        info_number = self._allocate()
+        self._write(info_number, self._serialize(info))
+        
+        xref_offset = self.file.tell()
+        self.file.write(b"xref\n0 %d\n0000000000 65535 f \n" % len(self.offsets))
+        for offset in self.offsets[1:]:
+            # Numbers handed out for a source that failed midway are left free
+            self.file.write(b"%010d 00000 n \n" % offset if offset is not None else b"0000000000 00000 f \n")
+        self.file.write(b"trailer\n<< /Size %d /Root %d 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                        % (len(self.offsets), catalog_number, info_number, xref_offset))
+        self.file.close()
+
+def create_combined_pdf(pdf_paths, output_filename="combined_articles.pdf", reporter=None):
+    """Merge PDFs into one bookmarked PDF at output_filename; returns its path, pages, size and build time"""
+    reporter = reporter or EventReporter()
+    started = time.perf_counter()
+    tmp_path = temp_path_beside(output_filename)
+    
+    merger = StreamingPdfMerger(tmp_path, title="Combined Medscape Articles")
+    try:
+        for pdf_path in pdf_paths:
+            try:
+                merger.append(pdf_path)
+            except Exception as e:
+                reporter.emit('warning', f"⚠️ Could not merge {os.path.basename(pdf_path)}: {e}")
+        merger.close()
+        os.replace(tmp_path, output_filename)
+    except BaseException:
+        merger.file.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    
+    result = {
+        'path': output_filename,
+        'articles': merger.sources,
+        'pages': len(merger.page_numbers),
+        'shared_objects': merger.shared_hits,
+        'size': os.path.getsize(output_filename),
+        'seconds': time.perf_counter() - started
+    }
+    reporter.emit('success', f"📑 Combined {result['articles']} PDFs into {result['pages']} pages "
+                             f"({result['size'] / (1024 * 1024):.1f} MB) in {result['seconds']:.1f}s")
+    return result
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m medscape_engine",
+        description="Scrape Medscape articles into PDFs without the web UI"
+    )
+    parser.add_argument('urls', nargs='*', help="article URLs to scrape")
+    parser.add_argument('--index', metavar='URL', help="also scrape every article linked from this specialty page")
+    parser.add_argument('--crawl', action='append', default=[], metavar='URL',
+                        help="crawl this index page with its pagination and sub-indexes (repeatable)")
+    parser.add_argument('--crawl-depth', type=int, default=2, help="sub-index levels followed below each --crawl page")
+    parser.add_argument('--refresh-hours', type=float, metavar='HOURS', help="re-crawl index pages older than this")
+    parser.add_argument('--discovery-db', default="discovery.sqlite3", help="crawl frontier and article catalog database")
+    parser.add_argument('--catalog', metavar='PATH', help="write the article catalog (.csv or .json) and exit")
+    parser.add_argument('--limit', type=int, help="maximum number of articles taken from --index or --crawl")
+    parser.add_argument('-o', '--output-dir', default="enhanced_pdfs", help="where PDFs are written")
+    parser.add_argument('--rate', type=float, default=1.0, help="requests per second per host")
+    parser.add_argument('--parallel', type=int, default=4, help="parallel requests per host")
+    parser.add_argument('--delay', type=float, default=0, help="seconds between starting articles")
+    parser.add_argument('--no-cache', action='store_true', help="bypass the on-disk HTTP cache")
+    parser.add_argument('--incremental', action='store_true', help="only rebuild PDFs whose content changed")
+    parser.add_argument('--resume', type=int, metavar='BATCH_ID', help="resume an unfinished batch from the job queue")
+    parser.add_argument('--jobs-db', default="batch_jobs.sqlite3", help="job queue database")
+    parser.add_argument('--cache-dir', default="http_cache", help="on-disk HTTP cache directory")
+    parser.add_argument('--article-store', default="article_store", help="article store used by --incremental")
+    parser.add_argument('--structured-store', default="structured_store", help="structured article store directory")
+    parser.add_argument('--search-db', default="search_index.sqlite3", help="full-text search index database")
+    parser.add_argument('--render-workers', type=int, default=0,
+                        help="render PDFs in this many worker processes (0 renders in-process)")
+    parser.add_argument('--export', metavar='PATH',
+                        help="export the structured article store when done (.jsonl documents, .parquet or .csv blocks)")
+    parser.add_argument('--metrics-port', type=int, help="serve /metrics (Prometheus) and /v1/traces (OTLP JSON) on this port")
+    parser.add_argument('--trace-out', metavar='PATH', help="write the run's spans as OTLP JSON when done")
+    parser.add_argument('-v', '--verbose', action='store_true', help="log debug events")
+    return parser
+
+def run_incremental(scraper, urls, output_dir):
+    """Refresh each article in turn, rebuilding only the PDFs that changed"""
+    failures = 0
+    for url in urls:
+        refresh = scraper.refresh_article(url, output_dir)
+        if refresh:
+            print(f"{refresh['status']:9} {refresh['pdf_path']}")
+        else:
+            print(f"{'failed':9} {url}")
+            failures += 1
+    return failures
+
+def run_batch(scraper, job_queue, batch_id, output_dir, delay=0):
+    """Run (or resume) a persisted batch, printing one line per finished article"""
+    pipeline = BatchPipeline(scraper, article_delay=delay, job_queue=job_queue, batch_id=batch_id,
+                             output_dir=output_dir)
+    for event in pipeline.run():
+        if event['type'] == 'done':
+            print(f"{'done':9} {event['result']['path']}")
+        elif event['type'] == 'retry':
+            print(f"{'retry':9} {event['title']}: {event['error'][:80]}")
+        elif event['type'] == 'failed':
+            print(f"{'failed':9} {event['title']}: {event['error'][:80]}")
+    
+    progress = job_queue.batch_progress(batch_id)
+    print(f"Batch #{batch_id}: {progress['done']} of {progress['total']} articles done, {progress['failed']} failed")
+    return progress['failed']
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s")
+    
+    scraper = AdvancedMedscapeScraper(use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                                      article_store_dir=args.article_store, structured_store_dir=args.structured_store,
+                                      search_index_path=args.search_db)
+    scraper.rate_limiter.configure(args.rate, args.parallel)
+    if args.render_workers:
+        scraper.pdf_renderer = PdfRenderService(args.render_workers)
+    if args.metrics_port:
+        start_metrics_server(scraper.tracer, args.metrics_port)
+        logger.info(f"Metrics at http://127.0.0.1:{args.metrics_port}/metrics")
+    
+    try:
+        status = run_cli(scraper, args)
+        if args.export:
+            count = scraper.structured_store.export(args.export)
+            logger.info(f"Exported {count} records from {len(scraper.structured_store)} stored articles to {args.export}")
+        return status
+    finally:
+        if scraper.pdf_renderer is not None:
+            scraper.pdf_renderer.shutdown()
+        if args.trace_out:
+            with open(args.trace_out, 'w') as f:
+                json.dump(scraper.tracer.to_otlp_json(), f)
+        for name, entry in scraper.tracer.summary().items():
+            logger.debug(f"{name:18} {entry['count']:6} spans {entry['total_seconds']:9.2f}s total")
+
+def run_cli(scraper, args):
+    """Resolve the article list, then refresh it incrementally or run it as a batch"""
+    articles = [{'url': url, 'title': url} for url in args.urls]
+    if args.index:
+        response = scraper.make_request(args.index)
+        if not response:
+            logger.error(f"Failed to fetch index page {args.index}")
+            return 1
+        articles.extend(scraper.extract_article_links(response.text)[:args.limit])
+    
+    if args.crawl or args.catalog or args.refresh_hours is not None:
+        crawler = DiscoveryCrawler(scraper, args.discovery_db, max_depth=args.crawl_depth)
+        if args.refresh_hours is not None:
+            logger.info(f"Re-crawling {crawler.refresh(args.refresh_hours)} index pages")
+        for event in crawler.crawl(args.crawl):
+            if event['type'] == 'failed':
+                logger.warning(f"Failed to crawl {event['url']}: {event['error']}")
+            else:
+                logger.info(f"Crawled {event['url']}: {event['articles']} articles ({event['new_articles']} new)")
+        progress = crawler.progress()
+        logger.info(f"Catalog: {progress['articles']} articles from {progress['done']} index pages "
+                    f"({progress['pending']} pending, {progress['failed']} failed)")
+        if args.catalog:
+            logger.info(f"Wrote {crawler.write_catalog(args.catalog, args.crawl or None)} catalog entries to {args.catalog}")
+            return 1 if progress['failed'] else 0
+        # A --crawl run takes the articles under its own seeds, not everything crawled before
+        articles.extend(crawler.catalog(args.crawl or None)[:args.limit])
+    
+    if args.incremental:
+        if not articles:
+            logger.error("No articles to refresh")
+            return 2
+        return 1 if run_incremental(scraper, [article['url'] for article in articles], args.output_dir) else 0
+    
+    job_queue = BatchJobQueue(args.jobs_db)
+    if args.resume is not None:
+        batch_id = args.resume
+    elif articles:
+        batch_id = job_queue.create_batch(articles, label=f"CLI: {len(articles)} articles")
+    else:
+        logger.error("Nothing to do: pass article URLs, --index, --crawl or --resume")
+        return 2
+    
+    return 1 if run_batch(scraper, job_queue, batch_id, args.output_dir, args.delay) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
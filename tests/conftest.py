@@ -0,0 +1,37 @@
+"""Shared fixtures for the extraction tests
+
+tests/corpus holds saved pages laid out like the site
+(``article/300157-overview.html`` for /article/300157-overview), so the
+same directory also works as ``benchmarks/standin_server.py --corpus-dir``.
+The pages keep Medscape's markup (section nav, content-area classes, author
+and date blocks, topic sections, page chrome) with trimmed text.
+"""
+import glob
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import medscape_engine
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+CORPUS_PAGES = sorted(
+    os.path.relpath(path, CORPUS_DIR) for path in glob.glob(os.path.join(CORPUS_DIR, '**', '*.html'), recursive=True)
+)
+
+def page_url(page):
+    """The URL a corpus page was saved from"""
+    return "https://emedicine.medscape.com/" + page[:-len('.html')].replace(os.sep, '/')
+
+def read_page(page):
+    with open(os.path.join(CORPUS_DIR, page), 'rb') as f:
+        return f.read()
+
+@pytest.fixture(scope='session')
+def scrapers():
+    """One scraper per installed parser backend"""
+    installed = [backend for backend in medscape_engine.PARSER_BACKENDS
+                 if medscape_engine.resolve_parser_backend(backend) == backend]
+    return {backend: medscape_engine.AdvancedMedscapeScraper(use_cache=False, parser=backend) for backend in installed}
@@ -0,0 +1,36 @@
+"""The async transport's connection pool gets the settings the scraper asks for"""
+import asyncio
+import importlib.util
+
+import pytest
+
+import medscape_engine
+
+httpx = pytest.importorskip('httpx')
+
+def pool_settings():
+    scraper = medscape_engine.AdvancedMedscapeScraper(use_cache=False, transport='async')
+
+    async def inspect_pool():
+        # httpcore's pool is the only place the effective settings are visible
+        pool = scraper._get_async_client()._transport._pool
+        settings = {
+            'http2': pool._http2,
+            'max_connections': pool._max_connections,
+            'max_keepalive_connections': pool._max_keepalive_connections,
+            'retries': pool._retries,
+            'verify': pool._ssl_context.check_hostname
+        }
+        await scraper.aclose()
+        return settings
+
+    return asyncio.run(inspect_pool())
+
+def test_pool_settings_take_effect():
+    settings = pool_settings()
+    assert settings['max_connections'] == 10
+    assert settings['max_keepalive_connections'] == 10
+    assert settings['http2'] == (importlib.util.find_spec('h2') is not None)
+    # RetryPolicy is the only retry layer
+    assert settings['retries'] == 0
+    assert settings['verify'] is False
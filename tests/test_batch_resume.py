@@ -0,0 +1,79 @@
+"""A batch article whose sections came back empty is retried for those sections before it completes"""
+import pytest
+import requests
+
+import medscape_engine
+from benchmarks.standin_server import FIRST_ARTICLE_ID, StandInSite
+
+BASE_URL = "https://emedicine.medscape.com"
+ARTICLE_URL = f"{BASE_URL}/article/{FIRST_ARTICLE_ID}-overview"
+FLAKY_SECTION = f"/article/{FIRST_ARTICLE_ID}-etiology"
+
+@pytest.fixture
+def scraper(tmp_path):
+    pytest.importorskip('reportlab')
+    site = StandInSite(articles=1, sections=4, paragraphs=2, table_rows=0)
+    scraper = medscape_engine.AdvancedMedscapeScraper(
+        use_cache=False, article_store_dir=str(tmp_path / 'articles'),
+        structured_store_dir=str(tmp_path / 'structured'), search_index_path=str(tmp_path / 'search.sqlite3')
+    )
+    scraper.failures = {}
+    scraper.requested = []
+
+    def make_request(url, **kwargs):
+        path = url[len(BASE_URL):]
+        scraper.requested.append(path)
+        if scraper.failures.get(path):
+            scraper.failures[path] -= 1
+            return None
+        response = requests.Response()
+        response.status_code = 200
+        response._content = site.page(path)
+        response.encoding = 'utf-8'
+        return response
+
+    scraper.make_request = make_request
+    return scraper
+
+def run_batch(scraper, job_queue, batch_id, tmp_path):
+    pipeline = medscape_engine.BatchPipeline(scraper, scrape_workers=1, job_queue=job_queue, batch_id=batch_id,
+                                             output_dir=str(tmp_path / 'pdfs'))
+    return [event['type'] for event in pipeline.run() if event['type'] != 'stage']
+
+def section_statuses(job_queue):
+    return dict(job_queue.conn.execute("SELECT title, status FROM tasks WHERE kind = 'section'").fetchall())
+
+def test_empty_sections_are_refetched_until_they_succeed(scraper, tmp_path):
+    job_queue = medscape_engine.BatchJobQueue(str(tmp_path / 'jobs.sqlite3'), backoff_seconds=0)
+    batch_id = job_queue.create_batch([{'url': ARTICLE_URL, 'title': "Stand-in"}])
+    scraper.failures[FLAKY_SECTION] = 1
+
+    assert run_batch(scraper, job_queue, batch_id, tmp_path) == ['retry', 'done']
+    # Only the failed section is fetched again on the retry
+    assert scraper.requested.count(FLAKY_SECTION) == 2
+    assert scraper.requested.count(f"/article/{FIRST_ARTICLE_ID}-background") == 1
+    assert set(section_statuses(job_queue).values()) == {'done'}
+    assert job_queue.batch_results(batch_id)[0]['sections'] == 4
+
+def test_an_article_is_rendered_without_sections_that_never_succeed(scraper, tmp_path):
+    job_queue = medscape_engine.BatchJobQueue(str(tmp_path / 'jobs.sqlite3'), max_attempts=2, backoff_seconds=0)
+    batch_id = job_queue.create_batch([{'url': ARTICLE_URL, 'title': "Stand-in"}])
+    scraper.failures[FLAKY_SECTION] = 5
+
+    assert run_batch(scraper, job_queue, batch_id, tmp_path) == ['retry', 'done']
+    assert section_statuses(job_queue)['Etiology'] == 'failed'
+    assert job_queue.batch_results(batch_id)[0]['sections'] == 3
+
+def test_resume_reopens_articles_finished_with_retryable_sections(scraper, tmp_path):
+    job_queue = medscape_engine.BatchJobQueue(str(tmp_path / 'jobs.sqlite3'), backoff_seconds=0)
+    batch_id = job_queue.create_batch([{'url': ARTICLE_URL, 'title': "Stand-in"}])
+    assert run_batch(scraper, job_queue, batch_id, tmp_path) == ['done']
+    # A batch left by an older run: done, with a section that failed once
+    job_queue.conn.execute("UPDATE tasks SET status = 'failed', attempts = 1 WHERE title = 'Etiology'")
+    job_queue.conn.commit()
+    del scraper.requested[:]
+
+    assert run_batch(scraper, job_queue, batch_id, tmp_path) == ['done']
+    assert FLAKY_SECTION in scraper.requested
+    assert f"/article/{FIRST_ARTICLE_ID}-background" not in scraper.requested
+    assert set(section_statuses(job_queue).values()) == {'done'}
@@ -0,0 +1,49 @@
+"""The content-area-only streaming extractor matches a full-document parse on the saved pages"""
+import inspect
+
+import pytest
+from bs4 import BeautifulSoup
+
+from conftest import CORPUS_PAGES, page_url, read_page
+
+@pytest.mark.parametrize('page', CORPUS_PAGES)
+def test_streaming_matches_full_parse(scrapers, page):
+    markup = read_page(page)
+    for backend, scraper in scrapers.items():
+        full_soup = BeautifulSoup(markup, backend)
+        expected = scraper.scrape_section_content(page_url(page), "Section", soup=full_soup)
+        streamed = scraper.scrape_section_content(page_url(page), "Section", markup=markup)
+        assert streamed == expected, backend
+
+@pytest.mark.parametrize('page', CORPUS_PAGES)
+def test_streamed_blocks_match_full_parse_blocks(scrapers, page):
+    markup = read_page(page)
+    for backend, scraper in scrapers.items():
+        full_area = scraper.find_content_area(BeautifulSoup(markup, backend))
+        filtered_area = scraper.parse_content_area(markup)
+        if full_area is None:
+            assert filtered_area is None, backend
+            continue
+        blocks = scraper.iter_content_blocks(filtered_area)
+        assert inspect.isgenerator(blocks)
+        assert list(blocks) == list(scraper.iter_content_blocks(full_area)), backend
+
+def test_filtered_parse_drops_page_chrome(scrapers):
+    markup = read_page('article/300157-overview.html')
+    for backend, scraper in scrapers.items():
+        content_area = scraper.parse_content_area(markup)
+        assert content_area['class'] == ['drugdbsectioncontent']
+        # Navigation, scripts and footer are never built into the tree
+        root = content_area
+        while root.parent is not None:
+            root = root.parent
+        assert root.find('script') is None and root.find(id='footer') is None, backend
+        assert root.select_one('div.sections-nav') is None, backend
+
+def test_content_area_priority(scrapers):
+    # The section body wins over the generic wrapper and the article element around it
+    markup = read_page('article/300157-treatment.html')
+    for backend, scraper in scrapers.items():
+        headings = [block['heading'] for block in scraper.scrape_section_content(
+            page_url('article/300157-treatment.html'), "Treatment", markup=markup)]
+        assert headings == ['Approach Considerations', 'Outpatient regimens', 'Inpatient regimens', 'Duration'], backend
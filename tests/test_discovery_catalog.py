@@ -0,0 +1,63 @@
+"""The discovery catalog of a crawl holds the articles under its own seeds, in discovery order"""
+import pytest
+import requests
+
+import medscape_engine
+
+BASE_URL = "https://emedicine.medscape.com"
+
+def index_page(links, extra=""):
+    items = "".join(f'<li><a href="/article/{article_id}-overview">Condition {article_id} overview</a></li>'
+                    for article_id in links)
+    return f'<html><body><div class="topic-section"><h2 class="topic-head">Topic</h2><ul>{items}</ul></div>{extra}</body></html>'
+
+SITE = {
+    '/pulmonology': index_page(
+        [300003, 300001],
+        '<a rel="next" href="/pulmonology?page=2">Next</a><a href="/pulmonology/asthma">Asthma</a>'
+    ),
+    '/pulmonology?page=2': index_page([300002]),
+    '/pulmonology/asthma': index_page([300005]),
+    '/cardiology': index_page([400001, 300001]),
+}
+
+@pytest.fixture
+def crawler(tmp_path):
+    scraper = medscape_engine.AdvancedMedscapeScraper(use_cache=False)
+    requested = []
+
+    def make_request(url, **kwargs):
+        path = url[len(BASE_URL):]
+        requested.append(path)
+        response = requests.Response()
+        response.status_code = 200
+        response._content = SITE[path].encode()
+        response.encoding = 'utf-8'
+        return response
+
+    scraper.make_request = make_request
+    crawler = medscape_engine.DiscoveryCrawler(scraper, str(tmp_path / 'discovery.sqlite3'), workers=1)
+    crawler.requested = requested
+    return crawler
+
+def article_ids(entries):
+    return [entry['article_id'] for entry in entries]
+
+def crawl(crawler, path):
+    return list(crawler.crawl([BASE_URL + path]))
+
+def test_catalog_is_limited_to_the_seeds_in_discovery_order(crawler):
+    crawl(crawler, '/pulmonology')
+    crawl(crawler, '/cardiology')
+    assert article_ids(crawler.catalog([BASE_URL + '/pulmonology'])) == [300003, 300001, 300002, 300005]
+    assert article_ids(crawler.catalog([BASE_URL + '/cardiology'])) == [400001, 300001]
+    assert sorted(article_ids(crawler.catalog())) == [300001, 300002, 300003, 300005, 400001]
+
+def test_recrawling_a_fresh_seed_still_returns_its_articles(crawler):
+    crawl(crawler, '/pulmonology')
+    crawl(crawler, '/cardiology')
+    del crawler.requested[:]
+    # Already crawled and not refreshed: nothing is fetched, but the seed keeps its catalog
+    assert crawl(crawler, '/cardiology') == []
+    assert crawler.requested == []
+    assert article_ids(crawler.catalog([BASE_URL + '/cardiology'])[:1]) == [400001]
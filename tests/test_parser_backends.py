@@ -0,0 +1,49 @@
+"""Every parser backend extracts the same data from the saved pages"""
+import pytest
+
+from conftest import CORPUS_PAGES, page_url, read_page
+
+def extract(scraper, page):
+    """Everything the scraper takes from one page: metadata, sections, content and article links"""
+    markup = read_page(page)
+    url = page_url(page)
+    soup = scraper.parse_html(markup)
+    return {
+        'title': scraper._extract_title(soup),
+        'authors': scraper._extract_authors(soup),
+        'last_updated': scraper._extract_updated_date(soup),
+        'sections': scraper.get_all_article_sections(url, soup=soup),
+        'content': scraper.scrape_section_content(url, "Overview", soup=soup),
+        'links': scraper.extract_article_links(markup, soup=soup)
+    }
+
+def test_corpus_covers_both_backends(scrapers):
+    assert CORPUS_PAGES
+    if len(scrapers) < 2:
+        pytest.skip("lxml is not installed")
+    assert set(scrapers) == {'lxml', 'html.parser'}
+
+@pytest.mark.parametrize('page', CORPUS_PAGES)
+def test_backends_extract_identical_data(scrapers, page):
+    if len(scrapers) < 2:
+        pytest.skip("lxml is not installed")
+    extracted = {backend: extract(scraper, page) for backend, scraper in scrapers.items()}
+    assert extracted['lxml'] == extracted['html.parser']
+
+def test_overview_extraction(scrapers):
+    # Guards against the comparison passing on pages nothing is extracted from
+    data = extract(scrapers['html.parser'], 'article/300157-overview.html')
+    assert data['title'] == "Community-Acquired Pneumonia (CAP)"
+    assert data['last_updated'] == "Mar 14, 2024"
+    assert list(data['sections']) == ['Overview', 'Presentation', 'DDx', 'Workup', 'Treatment', 'Medication']
+    assert [block['heading'] for block in data['content']] == [
+        'Practice Essentials', 'Signs and symptoms', 'Diagnosis', 'Background'
+    ]
+
+def test_index_page_links(scrapers):
+    data = extract(scrapers['html.parser'], 'pulmonology.html')
+    assert [link['url'].rsplit('/', 1)[-1] for link in data['links']] == [
+        '300157-overview', '234240-overview', '296301-overview', '1000997-overview', '297664-overview',
+        '297864-overview?src=specialty', '300912-overview'
+    ]
+    assert {link['category'] for link in data['links']} == {'Pneumonia', 'Obstructive Lung Disease', 'Asthma', 'Unknown'}